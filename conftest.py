@@ -0,0 +1,50 @@
+# conftest.py
+"""
+Shared pytest fixtures: a small synthetic warehouse loaded through the real
+clean -> enrich -> load -> refresh_aggregates steps.
+"""
+import os
+import sys
+import sqlite3
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from data_warehousing.etl import transform
+from data_warehousing.etl.load import WarehouseLoader, record_load, reset_schema
+from data_warehousing.etl.synthetic import iter_synthetic
+from data_warehousing.olap.aggregates import refresh_aggregates
+
+WAREHOUSE_SCALE = 0.01     # ~5k raw rows over the full 13-month calendar
+
+
+def build_warehouse(db_path, scale=WAREHOUSE_SCALE):
+    conn = sqlite3.connect(db_path)
+    try:
+        reset_schema(conn)
+        loader = WarehouseLoader(conn)
+        duplicates = transform.DuplicateTracker()
+        for chunk in iter_synthetic(scale):
+            chunk, _ = transform.clean(chunk, duplicates)
+            loader.load_chunk(transform.enrich(chunk))
+        record_load(conn, "full", loader.fact_rows, None)
+        conn.commit()
+        refresh_aggregates(conn)
+    finally:
+        conn.close()
+
+
+@pytest.fixture(scope="session")
+def warehouse_path(tmp_path_factory):
+    """Path of a warehouse shared by the whole session; tests must not modify it."""
+    path = str(tmp_path_factory.mktemp("warehouse") / "retail_dw.db")
+    build_warehouse(path)
+    return path
+
+
+@pytest.fixture
+def warehouse(warehouse_path):
+    conn = sqlite3.connect(warehouse_path)
+    yield conn
+    conn.close()
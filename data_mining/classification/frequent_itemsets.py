@@ -0,0 +1,257 @@
+# data_mining/classification/frequent_itemsets.py
+"""
+Frequent itemsets (vertical bitset Eclat) and association rules.
+
+Transactions are held as a sparse transactions x items boolean matrix
+(``encode_transactions``, or any scipy.sparse / dense 0-1 matrix, e.g. the
+invoice matrix built from SalesFact).  Mining works on the vertical layout:
+
+  - items below the support threshold are dropped, and every remaining item
+    becomes a bitset over the transactions, packed into uint64 words (20k
+    invoices = 313 words = 2.5 KB per item),
+  - Eclat walks the itemsets depth first.  Items are ordered by ascending
+    support, and the extensions of a prefix form one class: a single matrix
+    of bitsets.  Joining one member with the rest of its class is one
+    vectorised AND plus a popcount.  Only the frequent joins are kept and
+    recursed into, so no candidate is generated that cannot be frequent,
+  - live memory is the classes along the current path plus the itemsets
+    found so far; it is checked against ``max_memory_mb`` before every new
+    class, and exceeding it raises MemoryError instead of swapping (raise
+    min_support or set max_len).
+
+``association_rules`` derives every rule X -> Y from the frequent itemsets
+with support, confidence, lift, leverage and conviction; the column names
+follow mlxtend's so the rule tables stay readable by the reports.
+``rank_rules`` orders them by lift with deterministic tie-breaks.
+"""
+from array import array
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+MAX_MEMORY_MB = 512
+ITEMSET_BYTES = 300              # one found itemset, including its frozenset row in the result
+RULE_BYTES = 120                 # one rule row (the itemset frozensets are shared)
+PACK_BLOCK_MB = 16               # dense bits unpacked at a time while building the bitsets
+JOIN_BLOCK_MB = 8                # scratch for counting the joins of one class member
+RULE_COLUMNS = ['antecedents', 'consequents', 'antecedent support', 'consequent support', 'support',
+                'confidence', 'lift', 'leverage', 'conviction']
+
+
+if hasattr(np, "bitwise_count"):
+    def popcount_rows(words):
+        """Set bits per row of a 2-D uint64 array."""
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+else:   # numpy < 2.0
+    _BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount_rows(words):
+        """Set bits per row of a 2-D uint64 array."""
+        return _BYTE_COUNTS[words.view(np.uint8)].sum(axis=1, dtype=np.int64)
+
+
+def encode_transactions(transactions):
+    """
+    Sparse one-hot matrix of a list of transactions (iterables of items).
+
+    Returns (CSR matrix of shape transactions x items, item labels); repeated
+    items within a transaction count once.
+    """
+    lengths = np.fromiter((len(t) for t in transactions), dtype=np.int64, count=len(transactions))
+    flat = pd.Series([item for t in transactions for item in t], dtype=object)
+    codes, items = pd.factorize(flat, sort=True)
+    rows = np.repeat(np.arange(len(transactions)), lengths)
+    matrix = sparse.csr_matrix((np.ones(len(codes), dtype=bool), (rows, codes)),
+                               shape=(len(transactions), len(items)))
+    matrix.sum_duplicates()
+    return matrix, np.asarray(items, dtype=object)
+
+
+def as_sparse(matrix):
+    """CSC boolean view of a sparse matrix, DataFrame or array of 0/1 values."""
+    if isinstance(matrix, pd.DataFrame):
+        matrix = matrix.to_numpy()
+    matrix = sparse.csc_matrix(matrix, dtype=bool)
+    matrix.eliminate_zeros()
+    return matrix
+
+
+def pack_columns(matrix, columns):
+    """(len(columns), words) uint64 bitsets of the given columns of a CSC matrix."""
+    n_rows = matrix.shape[0]
+    n_words = max(1, -(-n_rows // 64))
+    bits = np.zeros((len(columns), n_words), dtype=np.uint64)
+    step = max(1, PACK_BLOCK_MB * 2**20 // max(n_rows, 1))
+    for start in range(0, len(columns), step):
+        block = matrix[:, columns[start:start + step]].T.toarray()
+        packed = np.packbits(block, axis=1, bitorder="little")
+        padded = np.zeros((len(block), n_words * 8), dtype=np.uint8)
+        padded[:, :packed.shape[1]] = packed
+        bits[start:start + len(block)] = padded.view(np.uint64)
+    return bits
+
+
+class EclatMiner:
+    """
+    Depth-first vertical miner over packed item bitsets, bounded by ``max_memory_mb``.
+
+    Found itemsets are stored as a prefix tree in flat arrays (parent node,
+    last item, count), 16 bytes each; the budget also charges every itemset
+    for its row in the final DataFrame.
+    """
+
+    def __init__(self, min_count, max_len=None, max_memory_mb=MAX_MEMORY_MB):
+        self.min_count = min_count
+        self.max_len = max_len
+        self.budget = max_memory_mb * 2**20
+        self.live_bytes = 0
+        self.parent = array('i')
+        self.item = array('i')
+        self.count = array('q')
+
+    def _reserve(self, nbytes):
+        if self.live_bytes + nbytes > self.budget:
+            raise MemoryError(
+                f"frequent itemset mining needs more than {self.budget / 2**20:g} MB "
+                f"({len(self.item):,} itemsets so far); raise min_support or set max_len")
+        self.live_bytes += nbytes
+
+    def mine(self, items, bits, counts):
+        """Mine the class (items, bits, counts); returns the (parent, item, count) arrays of the itemsets."""
+        self._reserve(bits.nbytes)
+        self._extend(-1, 1, items, bits, counts)
+        self.live_bytes -= bits.nbytes
+        return np.frombuffer(self.parent, dtype=np.int32), np.frombuffer(self.item, dtype=np.int32), \
+            np.frombuffer(self.count, dtype=np.int64)
+
+    def _join_counts(self, bits, i):
+        """Support of member ``i`` joined with each later member of its class."""
+        step = max(1, JOIN_BLOCK_MB * 2**20 // max(bits[0].nbytes, 1))
+        return np.concatenate([popcount_rows(bits[start:start + step] & bits[i])
+                               for start in range(i + 1, len(bits), step)])
+
+    def _extend(self, parent, depth, items, bits, counts):
+        for i in range(len(items)):
+            self._reserve(ITEMSET_BYTES)
+            node = len(self.item)
+            self.parent.append(parent)
+            self.item.append(int(items[i]))
+            self.count.append(int(counts[i]))
+            if i + 1 == len(items) or (self.max_len is not None and depth >= self.max_len):
+                continue
+            # Count first (in bounded blocks), then materialise only the joins that are frequent
+            joined_counts = self._join_counts(bits, i)
+            keep = np.flatnonzero(joined_counts >= self.min_count)
+            if len(keep) == 0:
+                continue
+            child = bits[i + 1 + keep] & bits[i]
+            self._reserve(child.nbytes)
+            self._extend(node, depth + 1, items[i + 1 + keep], child, joined_counts[keep])
+            self.live_bytes -= child.nbytes
+            del child
+
+
+def frequent_itemsets(matrix, items=None, min_support=0.01, max_len=None, max_memory_mb=MAX_MEMORY_MB):
+    """
+    Frequent itemsets of a transactions x items 0/1 matrix.
+
+    ``items`` labels the columns (a DataFrame's columns are used by
+    default).  Returns a DataFrame with ``support`` (fraction of
+    transactions), ``count`` and ``itemsets`` (frozensets of labels),
+    ordered by descending support.
+    """
+    if items is None:
+        items = matrix.columns if isinstance(matrix, pd.DataFrame) else np.arange(matrix.shape[1])
+    items = np.asarray(items, dtype=object)
+    matrix = as_sparse(matrix)
+    n_transactions = matrix.shape[0]
+    if n_transactions == 0:
+        return pd.DataFrame(columns=['support', 'count', 'itemsets'])
+    min_count = max(1, int(np.ceil(min_support * n_transactions)))
+
+    item_counts = np.diff(matrix.indptr)
+    # Least frequent first keeps the equivalence classes small
+    frequent = np.flatnonzero(item_counts >= min_count)
+    frequent = frequent[np.argsort(item_counts[frequent], kind="stable")]
+    bits = pack_columns(matrix, frequent)
+
+    miner = EclatMiner(min_count, max_len, max_memory_mb)
+    parent, item, counts = miner.mine(frequent, bits, item_counts[frequent])
+    del bits
+    # Parents precede their children, so each itemset extends an already built one
+    sets = []
+    for p, label in zip(parent.tolist(), items[item].tolist()):
+        sets.append(sets[p] | {label} if p >= 0 else frozenset((label,)))
+    result = pd.DataFrame({'support': counts / n_transactions, 'count': counts, 'itemsets': sets})
+    return result.sort_values('support', ascending=False, kind="stable", ignore_index=True)
+
+
+def association_rules(itemsets, min_confidence=0.5, min_lift=None, max_memory_mb=MAX_MEMORY_MB):
+    """
+    Rules X -> Y from the output of ``frequent_itemsets``.
+
+    Both sides of a rule are frequent themselves (downward closure), so all
+    supports come from the same table, and the rule frames share the
+    table's frozensets instead of copying them.  Consequents of each
+    itemset grow level by level from the ones that passed
+    ``min_confidence`` only: moving an item from the antecedent to the
+    consequent can only lower the confidence.  Exceeding ``max_memory_mb``
+    raises MemoryError.
+    """
+    support = dict(zip(itemsets['itemsets'], itemsets['support']))
+    canonical = {s: s for s in support}
+    budget = max_memory_mb * 2**20
+    columns = ([], [], [], [], [])     # antecedents, consequents and their supports, rule support
+    for itemset, s in support.items():
+        # Sorted candidates keep the rule order independent of set iteration (PYTHONHASHSEED)
+        consequents = [frozenset((item,)) for item in sorted(itemset)]
+        size = 1
+        while consequents and size < len(itemset):
+            passed = []
+            for consequent in consequents:
+                antecedent = itemset - consequent
+                s_a = support[antecedent]
+                if s / s_a < min_confidence:
+                    continue
+                passed.append(consequent)
+                for column, value in zip(columns, (canonical[antecedent], canonical[consequent], s_a,
+                                                   support[consequent], s)):
+                    column.append(value)
+            if len(columns[0]) * RULE_BYTES > budget:
+                raise MemoryError(f"association rules need more than {max_memory_mb:g} MB "
+                                  f"({len(columns[0]):,} rules); raise min_confidence or min_support")
+            size += 1
+            passed_set = set(passed)
+            consequents = sorted({a | b for a, b in combinations(passed, 2) if len(a | b) == size}, key=sorted)
+            consequents = [c for c in consequents if all(c - {item} in passed_set for item in c)]
+
+    rules = pd.DataFrame(dict(zip(RULE_COLUMNS[:5], columns)), columns=RULE_COLUMNS[:5])
+    rules['confidence'] = rules['support'] / rules['antecedent support']
+    rules['lift'] = rules['confidence'] / rules['consequent support']
+    rules['leverage'] = rules['support'] - rules['antecedent support'] * rules['consequent support']
+    with np.errstate(divide="ignore"):
+        rules['conviction'] = np.where(rules['confidence'] < 1,
+                                       (1 - rules['consequent support']) / (1 - rules['confidence']), np.inf)
+    if min_lift is not None:
+        rules = rules[rules['lift'] >= min_lift]
+    return rules.reset_index(drop=True)
+
+
+def rank_rules(rules, by='lift'):
+    """
+    Rules by descending ``by``, ties broken deterministically.
+
+    Equal values fall back to confidence and support (descending), then to
+    the sorted antecedent and consequent items, so top-n tables are the same
+    on every run.
+    """
+    items = pd.DataFrame({'_antecedents': rules['antecedents'].map(lambda s: tuple(sorted(s))),
+                          '_consequents': rules['consequents'].map(lambda s: tuple(sorted(s)))},
+                         index=rules.index)
+    keys = list(dict.fromkeys([by, 'confidence', 'support']))
+    ranked = pd.concat([rules, items], axis=1).sort_values(
+        keys + ['_antecedents', '_consequents'], ascending=[False] * len(keys) + [True, True], kind="stable")
+    return ranked.drop(columns=['_antecedents', '_consequents'])
+
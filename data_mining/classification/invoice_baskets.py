@@ -0,0 +1,241 @@
+# data_mining/classification/invoice_baskets.py
+"""
+Invoice baskets from the retail_dw.db warehouse as a sparse transaction matrix.
+
+``build_baskets`` streams the (InvoiceNo, StockCode) lines of SalesFact in
+invoice order and groups them into transactions on the fly:
+
+  - every invoice has a single date, so it lives in exactly one month
+    partition; partitions are read one at a time (pruned by the date range,
+    as in the OLAP router), each ordered by InvoiceNo, in batches of
+    BATCH_ROWS lines,
+  - stock codes become integer item codes as they are first seen, and each
+    line only appends its code to a flat int32 column-index buffer; invoice
+    boundaries give the row pointers.  The result is a CSR matrix
+    (invoices x items, boolean), so memory is O(lines), never
+    invoices x items,
+  - optional filters: countries (CustomerDim), a YYYYMMDD DateKey range and
+    categories, so rules can be mined per market.
+
+Results are cached on disk (BASKET_CACHE_DIR) keyed by the filters and the
+latest ETL load (EtlLoadLog), so repeated mining runs reuse the matrix until
+the warehouse is reloaded.
+
+Run from the repository root (mines rules with frequent_itemsets.py):
+    python data_mining/classification/invoice_baskets.py [--country NAME ...] [--start YYYYMMDD] [--end YYYYMMDD]
+                                                        [--category NAME ...] [--min-support 0.01]
+                                                        [--min-confidence 0.3] [--max-len N] [--top 20]
+                                                        [--db PATH] [--no-cache]
+"""
+import os
+import sys
+import logging
+import argparse
+import sqlite3
+from array import array
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from instrumentation import StageRecorder
+from data_warehousing.etl.load import DB_FILE_PATH
+from data_warehousing.olap.aggregates import fact_tables
+from data_warehousing.olap.build_cache import fingerprint
+from data_warehousing.olap.query_cache import load_generation
+from data_mining.classification.frequent_itemsets import association_rules, frequent_itemsets, rank_rules
+
+# ------------------------
+# Setup logging
+# ------------------------
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+# ------------------------
+# Config
+# ------------------------
+BASKET_CACHE_DIR = "data_mining/classification/.basket_cache"
+OUTPUT_DIR = "data_mining/classification/task3_output"
+RULES_CSV_PATH = os.path.join(OUTPUT_DIR, "invoice_association_rules.csv")
+BATCH_ROWS = 50_000
+MIN_SUPPORT = 0.01
+MIN_CONFIDENCE = 0.3
+TOP_RULES = 20
+
+
+def _as_list(value):
+    if value is None:
+        return None
+    return [value] if isinstance(value, str) else sorted(value)
+
+
+def basket_sql(fact, countries=None, date_range=None, categories=None):
+    """Lines of one fact table in invoice order, with the filters as parameters."""
+    sql = f"SELECT f.InvoiceNo, f.StockCode FROM {fact} f"
+    where, params = [], []
+    if countries:
+        sql += " JOIN CustomerDim c ON f.CustomerKey = c.CustomerKey"
+        where.append(f"c.Country IN ({', '.join('?' * len(countries))})")
+        params += countries
+    if date_range is not None:
+        where.append("f.DateKey BETWEEN ? AND ?")
+        params += list(date_range)
+    if categories:
+        where.append(f"f.Category IN ({', '.join('?' * len(categories))})")
+        params += categories
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + " ORDER BY f.InvoiceNo", params
+
+
+class BasketBuilder:
+    """Accumulates invoice-ordered line batches into CSR row pointers and integer item codes."""
+
+    def __init__(self):
+        self.item_codes = {}
+        self.indices = array('i')
+        self.indptr = array('q')         # start of each transaction in ``indices``
+        self.invoices = []
+        self.last_invoice = None
+
+    def add(self, invoice_nos, stock_codes):
+        invoice_nos = np.asarray(invoice_nos, dtype=object)
+        # Only the batch's distinct stock codes go through the Python dict
+        batch_codes, uniques = pd.factorize(np.asarray(stock_codes, dtype=object))
+        lookup = np.fromiter((self.item_codes.setdefault(code, len(self.item_codes)) for code in uniques),
+                             dtype=np.int32, count=len(uniques))
+        self.indices.frombytes(lookup[batch_codes].tobytes())
+
+        # A new transaction starts wherever the invoice number changes (also across batches)
+        previous = np.empty(len(invoice_nos), dtype=object)
+        previous[0] = self.last_invoice
+        previous[1:] = invoice_nos[:-1]
+        starts = np.flatnonzero(invoice_nos != previous)
+        offset = len(self.indices) - len(invoice_nos)
+        self.indptr.extend((offset + starts).tolist())
+        self.invoices.extend(invoice_nos[starts].tolist())
+        self.last_invoice = invoice_nos[-1]
+
+    def matrix(self):
+        """(CSR invoices x items, invoice numbers, stock codes by item code)."""
+        indptr = np.append(np.frombuffer(self.indptr, dtype=np.int64), len(self.indices))
+        indices = np.frombuffer(self.indices, dtype=np.int32)
+        matrix = sparse.csr_matrix((np.ones(len(indices), dtype=bool), indices, indptr),
+                                   shape=(len(indptr) - 1, len(self.item_codes)))
+        matrix.sum_duplicates()   # a stock code on several lines of one invoice counts once
+        items = np.array(list(self.item_codes), dtype=str) if self.item_codes else np.array([], dtype=str)
+        return matrix, np.array(self.invoices, dtype=str), items
+
+
+def cache_path(conn, countries=None, date_range=None, categories=None, cache_dir=BASKET_CACHE_DIR):
+    """<load generation>_<filters>.npz; the prefix changes with every ETL load."""
+    generation = fingerprint(load_generation(conn))[:12]
+    filters = fingerprint(countries, list(date_range) if date_range else None, categories)[:20]
+    return os.path.join(cache_dir, f"{generation}_{filters}.npz")
+
+
+def save_baskets(path, matrix, invoices, items):
+    """Write one cache entry and drop the entries of older warehouse loads."""
+    cache_dir = os.path.dirname(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    generation = os.path.basename(path).split("_")[0]
+    for name in os.listdir(cache_dir):
+        if name.endswith(".npz") and not name.startswith(generation + "_"):
+            os.remove(os.path.join(cache_dir, name))
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, data=matrix.data, indices=matrix.indices, indptr=matrix.indptr,
+             shape=np.array(matrix.shape), invoices=invoices, items=items)
+    os.replace(tmp_path, path)
+
+
+def load_baskets(path):
+    with np.load(path, allow_pickle=False) as npz:
+        matrix = sparse.csr_matrix((npz['data'], npz['indices'], npz['indptr']), shape=tuple(npz['shape']))
+        return matrix, npz['invoices'], npz['items']
+
+
+def build_baskets(conn, countries=None, date_range=None, categories=None, batch_rows=BATCH_ROWS,
+                  use_cache=True, cache_dir=BASKET_CACHE_DIR):
+    """
+    Invoice baskets of SalesFact as (CSR invoices x items, invoice numbers, stock codes).
+
+    ``countries`` and ``categories`` take a name or a list of names;
+    ``date_range`` is an inclusive (start, end) pair of YYYYMMDD DateKeys.
+    Column j of the matrix is stock code ``items[j]``.
+    """
+    countries, categories = _as_list(countries), _as_list(categories)
+    path = cache_path(conn, countries, date_range, categories, cache_dir) if use_cache else None
+    if path is not None and os.path.exists(path):
+        logging.info(f"Baskets loaded from cache {path}")
+        return load_baskets(path)
+
+    builder = BasketBuilder()
+    for fact in fact_tables(conn, date_range):
+        sql, params = basket_sql(fact, countries, date_range, categories)
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_rows)
+            if not rows:
+                break
+            invoice_nos, stock_codes = zip(*rows)
+            builder.add(invoice_nos, stock_codes)
+    matrix, invoices, items = builder.matrix()
+    if path is not None:
+        save_baskets(path, matrix, invoices, items)
+        logging.info(f"Baskets cached at {path}")
+    return matrix, invoices, items
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Association rules over the warehouse's invoice baskets")
+    parser.add_argument("--country", nargs="+", help="only invoices of customers in these countries")
+    parser.add_argument("--start", type=int, help="first DateKey (YYYYMMDD)")
+    parser.add_argument("--end", type=int, help="last DateKey (YYYYMMDD)")
+    parser.add_argument("--category", nargs="+", help="only lines of these product categories")
+    parser.add_argument("--min-support", type=float, default=MIN_SUPPORT)
+    parser.add_argument("--min-confidence", type=float, default=MIN_CONFIDENCE)
+    parser.add_argument("--max-len", type=int, help="largest itemset size")
+    parser.add_argument("--top", type=int, default=TOP_RULES, help="rules (by lift) written to the CSV")
+    parser.add_argument("--out", default=RULES_CSV_PATH)
+    parser.add_argument("--db", default=DB_FILE_PATH)
+    parser.add_argument("--no-cache", action="store_true", help="rebuild the baskets from SalesFact")
+    args = parser.parse_args(argv)
+    date_range = None
+    if args.start is not None or args.end is not None:
+        date_range = (args.start or 0, args.end or 99991231)
+
+    stages = StageRecorder("invoice_baskets")
+    stages.annotate(countries=args.country, date_range=date_range, categories=args.category,
+                    min_support=args.min_support)
+    conn = sqlite3.connect(args.db)
+    try:
+        with stages.stage("baskets") as stage:
+            matrix, invoices, items = build_baskets(conn, args.country, date_range, args.category,
+                                                    use_cache=not args.no_cache)
+            stage.add_rows(rows_out=matrix.shape[0])
+    finally:
+        conn.close()
+    logging.info(f"{matrix.shape[0]:,} invoices x {matrix.shape[1]:,} stock codes ({matrix.nnz:,} lines)")
+
+    with stages.stage("itemsets", rows_in=matrix.shape[0]) as stage:
+        itemsets = frequent_itemsets(matrix, items, min_support=args.min_support, max_len=args.max_len)
+        stage.add_rows(rows_out=len(itemsets))
+    with stages.stage("rules", rows_in=len(itemsets)) as stage:
+        rules = association_rules(itemsets, min_confidence=args.min_confidence)
+        stage.add_rows(rows_out=len(rules))
+    stages.close()
+
+    top = rank_rules(rules).head(args.top)
+    if os.path.dirname(args.out):
+        os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    top.to_csv(args.out, index=False)
+    logging.info(f"{len(itemsets):,} frequent itemsets, {len(rules):,} rules; top {len(top)} by lift "
+                 f"saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
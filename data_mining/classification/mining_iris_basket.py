@@ -1,5 +1,6 @@
 # data_mining/classification/mining_iris_basket.py
 import os
+import sys
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
@@ -9,12 +10,11 @@ from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_sc
 import matplotlib.pyplot as plt
 import random
 
-# Apriori
-try:
-    from mlxtend.frequent_patterns import apriori, association_rules
-except ImportError:
-    apriori = None
-    association_rules = None
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from instrumentation import StageRecorder
+from data_mining.classification.frequent_itemsets import (association_rules, encode_transactions, frequent_itemsets,
+                                                        rank_rules)
 
 # ------------------------
 # Config
@@ -23,23 +23,29 @@ OUTPUT_DIR = "task3_output"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 TASK1_OUTPUT = os.path.join("data_mining/task1_output") 
 SCALED_CSV = os.path.join(TASK1_OUTPUT, "iris_scaled.csv")
+MIN_SUPPORT = 0.2
+MIN_CONFIDENCE = 0.5
+STAGES = StageRecorder("mining_iris_basket")
 
 # ------------------------
 # Load preprocessed data
 # ------------------------
-df = pd.read_csv(SCALED_CSV)
-X = df.drop(columns=["species"])
-y = df["species"]
+with STAGES.stage("load") as stage:
+    df = pd.read_csv(SCALED_CSV)
+    X = df.drop(columns=["species"])
+    y = df["species"]
 
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    stage.add_rows(rows_out=len(df))
 
 # ------------------------
 # Part A: Classification
 # ------------------------
 # 1. Decision Tree
-dt = DecisionTreeClassifier(random_state=42)
-dt.fit(X_train, y_train)
-y_pred_dt = dt.predict(X_test)
+with STAGES.stage("decision_tree", rows_in=len(X_train)):
+    dt = DecisionTreeClassifier(random_state=42)
+    dt.fit(X_train, y_train)
+    y_pred_dt = dt.predict(X_test)
 
 metrics_dt = {
     "accuracy": accuracy_score(y_test, y_pred_dt),
@@ -49,16 +55,18 @@ metrics_dt = {
 }
 
 # Visualize tree
-plt.figure(figsize=(12,8))
-plot_tree(dt, feature_names=X.columns, class_names=y.unique(), filled=True)
-plt.title("Decision Tree on Iris Dataset")
-plt.savefig(os.path.join(OUTPUT_DIR, "decision_tree.png"))
-plt.close()
+with STAGES.stage("plots"):
+    plt.figure(figsize=(12,8))
+    plot_tree(dt, feature_names=X.columns, class_names=y.unique(), filled=True)
+    plt.title("Decision Tree on Iris Dataset")
+    plt.savefig(os.path.join(OUTPUT_DIR, "decision_tree.png"))
+    plt.close()
 
 # 2. KNN Classifier
-knn = KNeighborsClassifier(n_neighbors=5)
-knn.fit(X_train, y_train)
-y_pred_knn = knn.predict(X_test)
+with STAGES.stage("knn", rows_in=len(X_train)):
+    knn = KNeighborsClassifier(n_neighbors=5)
+    knn.fit(X_train, y_train)
+    y_pred_knn = knn.predict(X_test)
 
 metrics_knn = {
     "accuracy": accuracy_score(y_test, y_pred_knn),
@@ -78,23 +86,24 @@ items_pool = ['milk', 'bread', 'beer', 'diapers', 'eggs', 'cheese', 'cola', 'chi
               'ham', 'cereal', 'coffee', 'tea', 'cookies', 'juice', 'nuts', 'fruit', 'vegetables', 'soda']
 
 num_transactions = 30
-transactions = [random.choices(items_pool, k=random.randint(3,8)) for _ in range(num_transactions)]
-df_trans = pd.DataFrame({"transaction": transactions})
-
-# Convert to one-hot encoding for Apriori
-all_items = sorted(set(item for trans in transactions for item in trans))
-onehot = pd.DataFrame([{item: (item in t) for item in all_items} for t in transactions])
-
-# Apply Apriori
-if apriori is not None:
-    freq_items = apriori(onehot, min_support=0.2, use_colnames=True)
-    rules = association_rules(freq_items, metric="confidence", min_threshold=0.5)
-    rules = rules.sort_values("lift", ascending=False).head(5)
+with STAGES.stage("baskets") as stage:
+    transactions = [random.choices(items_pool, k=random.randint(3,8)) for _ in range(num_transactions)]
+    df_trans = pd.DataFrame({"transaction": transactions})
+
+    # Sparse transactions x items matrix for the itemset miner
+    basket_matrix, all_items = encode_transactions(transactions)
+    stage.add_rows(rows_out=basket_matrix.shape[0])
+
+# Frequent itemsets (bitset Eclat) and rules
+with STAGES.stage("itemsets", rows_in=basket_matrix.shape[0]) as stage:
+    freq_items = frequent_itemsets(basket_matrix, all_items, min_support=MIN_SUPPORT)
+    rules = association_rules(freq_items, min_confidence=MIN_CONFIDENCE)
+    stage.add_rows(rows_out=len(rules))
+    rules = rank_rules(rules).head(5)
     rules.to_csv(os.path.join(OUTPUT_DIR, "top5_association_rules.csv"), index=False)
-else:
-    rules = None
 
 # Save synthetic transactions
 df_trans.to_csv(os.path.join(OUTPUT_DIR, "synthetic_transactions.csv"), index=False)
+STAGES.close()
 
 print("[INFO] Task 3 complete. Outputs in:", OUTPUT_DIR)
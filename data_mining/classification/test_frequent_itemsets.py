@@ -0,0 +1,128 @@
+# data_mining/classification/test_frequent_itemsets.py
+"""
+Eclat itemsets and association rules against a brute-force enumeration.
+
+Run from the repository root:
+    python -m pytest data_mining/classification/test_frequent_itemsets.py
+"""
+import os
+import sys
+import subprocess
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_mining.classification.frequent_itemsets import (
+    association_rules, encode_transactions, frequent_itemsets, rank_rules,
+)
+
+ITEMS = list("ABCDEFGH")
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def random_transactions(n=300, seed=7):
+    rng = np.random.default_rng(seed)
+    # Skewed item popularity plus a correlated pair, so there are itemsets of several sizes
+    popularity = np.linspace(0.7, 0.1, len(ITEMS))
+    baskets = []
+    for _ in range(n):
+        basket = {item for item, p in zip(ITEMS, popularity) if rng.random() < p}
+        if 'A' in basket and rng.random() < 0.6:
+            basket.add('G')
+        baskets.append(sorted(basket))
+    return baskets
+
+
+def brute_force_itemsets(transactions, min_count, max_len=None):
+    sets = [frozenset(t) for t in transactions]
+    found = {}
+    for size in range(1, (max_len or len(ITEMS)) + 1):
+        for candidate in map(frozenset, combinations(ITEMS, size)):
+            count = sum(candidate <= t for t in sets)
+            if count >= min_count:
+                found[candidate] = count
+    return found
+
+
+def brute_force_rules(itemsets, n, min_confidence):
+    rules = {}
+    for itemset, count in itemsets.items():
+        for size in range(1, len(itemset)):
+            for antecedent in map(frozenset, combinations(itemset, size)):
+                confidence = count / itemsets[antecedent]
+                if confidence >= min_confidence:
+                    consequent = itemset - antecedent
+                    rules[antecedent, consequent] = (confidence, confidence / (itemsets[consequent] / n))
+    return rules
+
+
+@pytest.mark.parametrize("min_support, max_len", [(0.05, None), (0.1, None), (0.05, 2)])
+def test_itemsets_and_rules_match_brute_force(min_support, max_len):
+    transactions = random_transactions()
+    matrix, items = encode_transactions(transactions)
+    itemsets = frequent_itemsets(matrix, items, min_support=min_support, max_len=max_len)
+    min_count = int(np.ceil(min_support * len(transactions)))
+    expected = brute_force_itemsets(transactions, min_count, max_len)
+    assert dict(zip(itemsets['itemsets'], itemsets['count'])) == expected
+    assert itemsets['support'].is_monotonic_decreasing
+
+    for min_confidence in (0.3, 0.6):
+        rules = association_rules(itemsets, min_confidence=min_confidence)
+        found = {(a, c): (conf, lift) for a, c, conf, lift in
+                 zip(rules['antecedents'], rules['consequents'], rules['confidence'], rules['lift'])}
+        wanted = brute_force_rules(expected, len(transactions), min_confidence)
+        assert found.keys() == wanted.keys()
+        for key, values in wanted.items():
+            assert found[key] == pytest.approx(values)
+
+
+def test_dataframe_input_and_min_lift():
+    transactions = random_transactions(120)
+    matrix, items = encode_transactions(transactions)
+    frame = pd.DataFrame(matrix.toarray(), columns=items)
+    itemsets = frequent_itemsets(frame, min_support=0.1)
+    assert set(itemsets['itemsets']) == set(frequent_itemsets(matrix, items, min_support=0.1)['itemsets'])
+    rules = association_rules(itemsets, min_confidence=0.0, min_lift=1.2)
+    assert len(rules) and (rules['lift'] >= 1.2).all()
+
+
+def test_memory_ceilings_raise():
+    matrix, items = encode_transactions(random_transactions())
+    with pytest.raises(MemoryError, match="raise min_support or set max_len"):
+        frequent_itemsets(matrix, items, min_support=0.01, max_memory_mb=0.001)
+    itemsets = frequent_itemsets(matrix, items, min_support=0.01)
+    with pytest.raises(MemoryError, match="association rules need more than"):
+        association_rules(itemsets, min_confidence=0.0, max_memory_mb=0.0001)
+
+
+RULE_ORDER_SCRIPT = """
+from data_mining.classification import test_frequent_itemsets as t
+from data_mining.classification.frequent_itemsets import association_rules, frequent_itemsets, rank_rules
+matrix, items = t.encode_transactions(t.random_transactions())
+rules = association_rules(frequent_itemsets(matrix, items, min_support=0.05), min_confidence=0.2)
+for frame in (rules, rank_rules(rules)):
+    print([(sorted(a), sorted(c)) for a, c in zip(frame['antecedents'], frame['consequents'])])
+"""
+
+
+def test_rule_order_does_not_depend_on_the_hash_seed():
+    outputs = set()
+    for seed in ("1", "2", "3"):
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        outputs.add(subprocess.run([sys.executable, "-c", RULE_ORDER_SCRIPT], cwd=REPO_ROOT, env=env,
+                                   capture_output=True, text=True, check=True).stdout)
+    assert len(outputs) == 1
+
+
+def test_rank_rules_breaks_lift_ties_deterministically():
+    rules = association_rules(frequent_itemsets(*encode_transactions(random_transactions()), min_support=0.05),
+                              min_confidence=0.2)
+    ranked = rank_rules(rules)
+    assert ranked['lift'].is_monotonic_decreasing
+    shuffled = rank_rules(rules.sample(frac=1.0, random_state=3))
+    pd.testing.assert_frame_equal(ranked, shuffled)
+
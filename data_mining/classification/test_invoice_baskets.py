@@ -0,0 +1,75 @@
+# data_mining/classification/test_invoice_baskets.py
+"""
+Invoice baskets streamed from SalesFact against a pandas groupby of the same lines.
+
+Run from the repository root:
+    python -m pytest data_mining/classification/test_invoice_baskets.py
+"""
+import os
+import sys
+import sqlite3
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_mining.classification.invoice_baskets import build_baskets
+
+LINES_SQL = """
+SELECT f.InvoiceNo, f.StockCode, c.Country, f.DateKey, f.Category
+FROM SalesFact f JOIN CustomerDim c ON f.CustomerKey = c.CustomerKey
+"""
+
+
+def as_baskets(matrix, invoices, items):
+    """{invoice: set of stock codes} of a basket matrix."""
+    return {invoice: set(items[matrix.indices[matrix.indptr[i]:matrix.indptr[i + 1]]])
+            for i, invoice in enumerate(invoices)}
+
+
+def groupby_baskets(lines):
+    return {invoice: set(codes) for invoice, codes in lines.groupby('InvoiceNo')['StockCode']}
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {'countries': 'United Kingdom'},
+    {'countries': ['France', 'Germany'], 'categories': ['Electronics', 'Toys']},
+    {'date_range': (20110315, 20110620)},
+])
+def test_baskets_match_a_pandas_groupby(warehouse, filters):
+    lines = pd.read_sql_query(LINES_SQL, warehouse)
+    if 'countries' in filters:
+        countries = filters['countries']
+        lines = lines[lines['Country'].isin([countries] if isinstance(countries, str) else countries)]
+    if 'categories' in filters:
+        lines = lines[lines['Category'].isin(filters['categories'])]
+    if 'date_range' in filters:
+        lines = lines[lines['DateKey'].between(*filters['date_range'])]
+
+    # Small batches, so invoices are split across fetches
+    matrix, invoices, items = build_baskets(warehouse, batch_rows=97, use_cache=False, **filters)
+    assert matrix.shape == (lines['InvoiceNo'].nunique(), len(items))
+    assert len(set(invoices)) == len(invoices) and len(set(items)) == len(items)
+    assert as_baskets(matrix, invoices, items) == groupby_baskets(lines)
+    assert matrix.nnz == len(lines.drop_duplicates(['InvoiceNo', 'StockCode']))
+
+
+def test_cache_round_trip_and_eviction(warehouse_path, warehouse, tmp_path):
+    cache_dir = str(tmp_path / "baskets")
+    built = build_baskets(warehouse, countries='France', cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+    cached = build_baskets(warehouse, countries='France', cache_dir=cache_dir)
+    assert (cached[0] != built[0]).nnz == 0
+    assert list(cached[1]) == list(built[1]) and list(cached[2]) == list(built[2])
+
+    # A new ETL load on a copy of the warehouse evicts the entries of the old one
+    copy_path = str(tmp_path / "copy.db")
+    warehouse.execute(f"VACUUM INTO '{copy_path}'")
+    copy = sqlite3.connect(copy_path)
+    copy.execute("INSERT INTO EtlLoadLog (Mode, FinishedAt, RowsLoaded) VALUES ('incremental', 'now', 0)")
+    copy.commit()
+    build_baskets(copy, countries='France', cache_dir=cache_dir)
+    copy.close()
+    assert len(os.listdir(cache_dir)) == 1
@@ -1,11 +1,31 @@
 # data_mining/clustering/clustering_iris.py
+"""
+K-Means sweep over k on the preprocessed Iris data (Task 2).
+
+Fitting and plotting are separate phases: the sweep (kmeans_sweep.py) fits
+every k in parallel and streams its metrics into kmeans_results.csv.partial
+as each k finishes (kmeans_results.csv is written, sorted by k, at the end);
+the scatter plots, elbow curve and silhouette curve are rendered
+afterwards from the sweep results.
+
+Run from the repository root:
+    python data_mining/clustering/clustering_iris.py [--k-min 2] [--k-max 30] [--workers N]
+                                                     [--seed 42] [--silhouette {auto,exact,sample}]
+                                                     [--no-plots]
+"""
 import os
+import sys
 import logging
+import argparse
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.cluster import KMeans
-from sklearn.metrics import adjusted_rand_score, silhouette_score
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from instrumentation import StageRecorder
+from data_mining.clustering.kmeans_sweep import MAX_WORKERS, sweep
+from data_mining.clustering.silhouette import MODES
 
 # ------------------------
 # Setup logging
@@ -20,41 +40,19 @@ logging.basicConfig(
 # ------------------------
 DATASET_PATH = os.path.join("data_mining/task1_output/iris_scaled.csv")  # Task1 preprocessed data
 OUTPUT_DIR = "data_mining/clustering/task2_output"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+RESULTS_CSV_PATH = os.path.join(OUTPUT_DIR, "kmeans_results.csv")
 FEATURES = ['sepal length (cm)', 'sepal width (cm)', 'petal length (cm)', 'petal width (cm)']
+K_MIN, K_MAX = 2, 30
+SCATTER_KS = [2, 3, 4]   # scatter plots referenced by the Task 2 report
+SEED = 42
 
-# ------------------------
-# Load preprocessed data
-# ------------------------
-df = pd.read_csv(DATASET_PATH)
-X = df[FEATURES].values
-y_true = df['species'].values
-logging.info(f"Loaded preprocessed data from {DATASET_PATH} with shape {X.shape}")
 
 # ------------------------
-# K-Means Clustering
+# Plots (run after the sweep)
 # ------------------------
-k_values = [2, 3, 4]
-results = []
-
-for k in k_values:
-    kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-    labels = kmeans.fit_predict(X)
-    centroids = kmeans.cluster_centers_
-    
-    # Metrics
-    ari = adjusted_rand_score(y_true, labels)
-    sil = silhouette_score(X, labels)
-    inertia = kmeans.inertia_
-    
-    results.append({
-        'k': k,
-        'ARI': ari,
-        'Silhouette': sil,
-        'Inertia': inertia
-    })
-    
-    # Scatter plot (petal length vs width) with clusters
+def plot_scatter(X, model, k):
+    """Petal length vs width coloured by cluster, centroids marked."""
+    labels, centroids = model.labels_, model.cluster_centers_
     plt.figure(figsize=(6, 4))
     sns.scatterplot(x=X[:,2], y=X[:,3], hue=labels, palette='Set1', s=60)
     # annotate centroids
@@ -71,27 +69,75 @@ for k in k_values:
     plt.close()
     logging.info(f"Saved scatter plot for k={k} at {scatter_path}")
 
-# ------------------------
-# Elbow curve
-# ------------------------
-inertia_vals = [r['Inertia'] for r in results]
-plt.figure(figsize=(6, 4))
-plt.plot(k_values, inertia_vals, 'o-', color='blue')
-plt.xlabel("Number of Clusters (k)")
-plt.ylabel("Inertia")
-plt.title("Elbow Curve for K-Means")
-plt.grid(True)
-elbow_path = os.path.join(OUTPUT_DIR, "kmeans_elbow.png")
-plt.savefig(elbow_path)
-plt.close()
-logging.info(f"Saved elbow curve at {elbow_path}")
 
-# ------------------------
-# Save results table
-# ------------------------
-results_df = pd.DataFrame(results)
-results_csv_path = os.path.join(OUTPUT_DIR, "kmeans_results.csv")
-results_df.to_csv(results_csv_path, index=False)
-logging.info(f"Saved K-Means metrics table at {results_csv_path}")
+def plot_curve(results, column, ylabel, title, path, color):
+    plt.figure(figsize=(6, 4))
+    plt.plot(results['k'], results[column], 'o-', color=color)
+    plt.xlabel("Number of Clusters (k)")
+    plt.ylabel(ylabel)
+    plt.title(title)
+    plt.grid(True)
+    plt.savefig(path)
+    plt.close()
+    logging.info(f"Saved {column.lower()} curve at {path}")
+
+
+def render_plots(X, results, models):
+    for k in SCATTER_KS:
+        if k in models:
+            plot_scatter(X, models[k], k)
+    plot_curve(results, 'Inertia', "Inertia", "Elbow Curve for K-Means",
+               os.path.join(OUTPUT_DIR, "kmeans_elbow.png"), 'blue')
+    plot_curve(results, 'Silhouette', "Silhouette score", "Silhouette by k",
+               os.path.join(OUTPUT_DIR, "kmeans_silhouette.png"), 'green')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="K-Means sweep on the preprocessed Iris data")
+    parser.add_argument("--k-min", type=int, default=K_MIN)
+    parser.add_argument("--k-max", type=int, default=K_MAX)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="parallel fitting threads")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--silhouette", choices=MODES, default="auto",
+                        help="exact (blocked) or stratified-sample silhouette; auto picks by dataset size")
+    parser.add_argument("--no-plots", action="store_true", help="only fit and write kmeans_results.csv")
+    args = parser.parse_args(argv)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    stages = StageRecorder("clustering_iris")
+    stages.annotate(k_min=args.k_min, k_max=args.k_max, workers=args.workers)
+
+    # ------------------------
+    # Load preprocessed data
+    # ------------------------
+    with stages.stage("load") as stage:
+        df = pd.read_csv(DATASET_PATH)
+        X = df[FEATURES].values
+        y_true = df['species'].values
+        stage.add_rows(rows_out=len(df))
+    logging.info(f"Loaded preprocessed data from {DATASET_PATH} with shape {X.shape}")
+
+    # ------------------------
+    # K-Means sweep (metrics stream into the .partial CSV as each k finishes)
+    # ------------------------
+    def log_result(row):
+        logging.info(f"k={row['k']}: silhouette {row['Silhouette']:.4f} ({row['SilhouetteMode']}), "
+                     f"inertia {row['Inertia']:.2f}, ARI {row['ARI']:.4f} ({row['Init']}, {row['Seconds']:.2f}s)")
+
+    with stages.stage("sweep", rows_in=len(X)) as stage:
+        results, models = sweep(X, range(args.k_min, args.k_max + 1), seed=args.seed, y_true=y_true,
+                                max_workers=args.workers, results_path=RESULTS_CSV_PATH, on_result=log_result,
+                                silhouette_mode=args.silhouette)
+        stage.add_rows(rows_out=len(results))
+    logging.info(f"Saved K-Means metrics table at {RESULTS_CSV_PATH}")
+
+    if not args.no_plots:
+        with stages.stage("plots"):
+            render_plots(X, results, models)
+    stages.close()
+
+    print("[INFO] Clustering complete. Outputs saved in 'task2_output/'")
+
 
-print("[INFO] Clustering complete. Outputs saved in 'task2_output/'")
+if __name__ == "__main__":
+    main()
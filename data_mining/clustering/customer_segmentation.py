@@ -0,0 +1,255 @@
+# data_mining/clustering/customer_segmentation.py
+"""
+Out-of-core RFM customer segmentation over the retail_dw.db warehouse.
+
+Every customer with sales gets Recency (days from the last purchase to the
+latest sale in the warehouse), Frequency (distinct invoices) and Monetary
+(total sales) from a single streaming aggregate over SalesFact, read in
+batches of --batch-size customers; nothing holds all customers in memory.
+The aggregate runs per month partition and the partial rows are combined
+(an invoice has one date, so it is never counted in two partitions):
+
+  1. rfm_aggregate  the per-customer RFM rows are spilled to a temporary
+                    memory-mapped file while a StandardScaler is fitted
+                    incrementally (partial_fit) on log1p(R, F, M),
+  2. fit            MiniBatchKMeans.partial_fit runs --epochs passes over the
+                    spilled batches, in a seeded shuffled order each pass,
+  3. assign         every customer is labelled and the segments are
+                    renumbered by value (scaled F + M - R of the centre), so
+                    Segment 0 is always the best customers,
+  4. write          CustomerSegment (CustomerKey -> Segment plus its RFM
+                    values) and SegmentDim (per-segment means) are replaced in
+                    one transaction.
+
+Memory is O(batch size x k) however many transactions the warehouse holds.
+CustomerSegment links to CustomerDim, and QueryRouter (olap/aggregates.py)
+accepts 'Segment' as a dimension, e.g.
+``router.query(['Segment', 'Country'])``.  A full ETL reload reassigns
+CustomerKeys and clears the segments, so re-run this after it.
+
+Run from the repository root:
+    python data_mining/clustering/customer_segmentation.py [--k 5] [--batch-size 4096] [--epochs 5]
+                                                           [--seed 42] [--db PATH]
+"""
+import os
+import sys
+import logging
+import argparse
+import sqlite3
+import tempfile
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from instrumentation import StageRecorder
+from data_warehousing.etl.load import DB_FILE_PATH, ensure_schema
+from data_warehousing.etl.partitions import FACT_VIEW, list_partitions, partition_table
+from data_warehousing.olap.aggregates import fact_tables
+from data_warehousing.olap.query_cache import CACHE_DIR, QueryCache
+
+# ------------------------
+# Setup logging
+# ------------------------
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+# ------------------------
+# Config
+# ------------------------
+N_SEGMENTS = 5
+BATCH_SIZE = 4096
+EPOCHS = 5
+SEED = 42
+RFM_COLUMNS = ['RecencyDays', 'Frequency', 'Monetary']
+SEGMENT_TABLES = ['CustomerSegment', 'SegmentDim']
+
+# Per-partition RFM rows, combined into one row per customer in CustomerKey order
+RFM_PARTITION_SQL = """
+SELECT CustomerKey, MAX(DateKey) AS LastDateKey, COUNT(DISTINCT InvoiceNo) AS Frequency,
+       SUM(TotalSales) AS Monetary
+FROM {fact}
+GROUP BY CustomerKey
+"""
+RFM_SQL = """
+SELECT CustomerKey, MAX(LastDateKey), SUM(Frequency), SUM(Monetary)
+FROM ({partitions})
+GROUP BY CustomerKey
+ORDER BY CustomerKey
+"""
+
+
+def rfm_sql(conn):
+    """One pass over the fact partitions (or the SalesFact table of an unpartitioned warehouse)."""
+    partitions = " UNION ALL ".join(RFM_PARTITION_SQL.format(fact=fact) for fact in fact_tables(conn))
+    return RFM_SQL.format(partitions=partitions)
+
+
+def datekey_to_date(datekeys):
+    return pd.to_datetime(np.asarray(datekeys, dtype=np.int64).astype(str), format="%Y%m%d")
+
+
+def reference_date(conn):
+    """Date of the latest sale: the newest month partition (or the whole view) holds it."""
+    months = list_partitions(conn)
+    table = partition_table(months[-1]) if months else FACT_VIEW
+    latest = conn.execute(f"SELECT MAX(DateKey) FROM {table}").fetchone()[0]
+    if latest is None:
+        raise RuntimeError("SalesFact is empty; run the ETL first")
+    return datekey_to_date([latest])[0]
+
+
+def features(rfm):
+    """log1p(R, F, M) of an (n, 3) block of raw RFM values."""
+    return np.log1p(np.clip(rfm, 0, None))
+
+
+def spill_rfm(conn, spill_path, batch_size, reference, scaler):
+    """
+    Stream the RFM aggregate into a memory-mapped (n, 5) spill file.
+
+    Columns are CustomerKey, RecencyDays, Frequency, Monetary and a slot for
+    the segment label.  The scaler is partial_fit on each batch as it
+    arrives.  Returns (spill, number of customers).
+    """
+    capacity = conn.execute("SELECT COUNT(*) FROM CustomerDim").fetchone()[0]
+    spill = np.lib.format.open_memmap(spill_path, mode="w+", dtype=np.float64, shape=(max(capacity, 1), 5))
+    cursor = conn.execute(rfm_sql(conn))
+    n = 0
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        block = np.array(rows, dtype=np.float64)
+        recency = (reference - datekey_to_date(block[:, 1])).days.to_numpy()
+        spill[n:n + len(block), 0] = block[:, 0]
+        spill[n:n + len(block), 1] = recency
+        spill[n:n + len(block), 2:4] = block[:, 2:4]
+        scaler.partial_fit(features(spill[n:n + len(block), 1:4]))
+        n += len(block)
+    spill.flush()
+    return spill, n
+
+
+def batch_starts(n, batch_size):
+    return np.arange(0, n, batch_size)
+
+
+def fit_segments(spill, n, scaler, k, batch_size, epochs, seed):
+    """MiniBatchKMeans over the spilled batches, ``epochs`` shuffled passes."""
+    model = MiniBatchKMeans(n_clusters=k, batch_size=batch_size, n_init=3, random_state=seed)
+    rng = np.random.default_rng(seed)
+    starts = batch_starts(n, batch_size)
+    # partial_fit initialises the centres from the first batch it sees, so that one must hold >= k rows
+    first = starts[np.argmax(np.minimum(n - starts, batch_size) >= k)]
+    for epoch in range(epochs):
+        order = rng.permutation(starts)
+        if epoch == 0:
+            order = np.concatenate([[first], order[order != first]])
+        for start in order:
+            block = spill[start:start + batch_size, 1:4]
+            model.partial_fit(scaler.transform(features(block)))
+    return model
+
+
+def value_order(model):
+    """Old label -> segment number, most valuable centre (F + M - R, scaled) first."""
+    centers = model.cluster_centers_
+    score = centers[:, 1] + centers[:, 2] - centers[:, 0]
+    remap = np.empty(len(centers), dtype=np.int64)
+    remap[np.argsort(-score, kind="stable")] = np.arange(len(centers))
+    return remap
+
+
+def assign_segments(spill, n, scaler, model, batch_size):
+    """Label every spilled customer; returns the SegmentDim frame."""
+    k = model.n_clusters
+    remap = value_order(model)
+    counts = np.zeros(k, dtype=np.int64)
+    sums = np.zeros((k, 3))
+    for start in batch_starts(n, batch_size):
+        rfm = spill[start:start + batch_size, 1:4]
+        labels = remap[model.predict(scaler.transform(features(rfm)))]
+        spill[start:start + batch_size, 4] = labels
+        counts += np.bincount(labels, minlength=k)
+        np.add.at(sums, labels, rfm)
+    means = sums / np.maximum(counts, 1)[:, None]
+    return pd.DataFrame({'Segment': np.arange(k), 'Customers': counts,
+                         **{col: means[:, i] for i, col in enumerate(RFM_COLUMNS)}})
+
+
+def write_segments(conn, spill, n, segments, batch_size):
+    """Replace SegmentDim and CustomerSegment in one transaction."""
+    with conn:
+        conn.execute("DELETE FROM CustomerSegment")
+        conn.execute("DELETE FROM SegmentDim")
+        conn.executemany("INSERT INTO SegmentDim (Segment, Customers, RecencyDays, Frequency, Monetary) "
+                         "VALUES (?, ?, ?, ?, ?)",
+                         segments.itertuples(index=False, name=None))
+        for start in batch_starts(n, batch_size):
+            block = spill[start:start + batch_size]
+            conn.executemany(
+                "INSERT INTO CustomerSegment (CustomerKey, Segment, RecencyDays, Frequency, Monetary) "
+                "VALUES (?, ?, ?, ?, ?)",
+                zip(block[:, 0].astype(np.int64).tolist(), block[:, 4].astype(np.int64).tolist(),
+                    block[:, 1].astype(np.int64).tolist(), block[:, 2].astype(np.int64).tolist(),
+                    block[:, 3].tolist()))
+
+
+def run(db_path=DB_FILE_PATH, k=N_SEGMENTS, batch_size=BATCH_SIZE, epochs=EPOCHS, seed=SEED, recorder=None):
+    """Segment the warehouse's customers and write the segments back; returns the SegmentDim frame."""
+    batch_size = max(batch_size, k)
+    stages = recorder or StageRecorder("customer_segmentation")
+    stages.annotate(k=k, batch_size=batch_size, epochs=epochs)
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_schema(conn)   # creates the segment tables in warehouses that predate them
+        with tempfile.TemporaryDirectory(prefix="rfm_") as tmp_dir:
+            with stages.stage("rfm_aggregate") as stage:
+                reference = reference_date(conn)
+                scaler = StandardScaler()
+                spill, n = spill_rfm(conn, os.path.join(tmp_dir, "rfm.npy"), batch_size, reference, scaler)
+                stage.add_rows(rows_out=n)
+            if n < k:
+                raise RuntimeError(f"{n} customers with sales; need at least k={k}")
+            logging.info(f"RFM aggregated for {n:,} customers (reference date {reference.date()})")
+
+            with stages.stage("fit", rows_in=n * epochs):
+                model = fit_segments(spill, n, scaler, k, batch_size, epochs, seed)
+            with stages.stage("assign", rows_in=n) as stage:
+                segments = assign_segments(spill, n, scaler, model, batch_size)
+                stage.add_rows(rows_out=n)
+            with stages.stage("write", rows_in=n):
+                write_segments(conn, spill, n, segments, batch_size)
+            del spill
+    finally:
+        conn.close()
+    # Cached results are keyed to ETL loads, not to segment runs: drop only the ones reading segments
+    if os.path.isdir(CACHE_DIR):
+        QueryCache(CACHE_DIR).evict_tables(SEGMENT_TABLES)
+    if recorder is None:
+        stages.close()
+
+    logging.info("Segments (0 = highest value):\n" + segments.round(2).to_string(index=False))
+    return segments
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Out-of-core RFM customer segmentation of retail_dw.db")
+    parser.add_argument("--k", type=int, default=N_SEGMENTS, help="number of segments")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="customers per batch")
+    parser.add_argument("--epochs", type=int, default=EPOCHS, help="MiniBatchKMeans passes over the customers")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--db", default=DB_FILE_PATH)
+    args = parser.parse_args(argv)
+    run(args.db, args.k, args.batch_size, args.epochs, args.seed)
+    print(f"[INFO] Customer segments written to CustomerSegment / SegmentDim in {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,10 @@ def generate_clustering_report():
         f.write("- **Target labels:** species (setosa, versicolor, virginica).\n\n")
 
         f.write("## K-Means Clustering Experiments\n")
-        f.write("We applied K-Means clustering with different values of k (2, 3, 4) and evaluated cluster quality.\n\n")
+        f.write(
+            "We swept K-Means over k = 2..30 (the clustering_iris.py default) and evaluated cluster quality "
+            "for every k; scatter plots are shown for k = 2, 3, 4.\n\n"
+        )
 
         f.write("### Results Table\n")
         f.write("The table below shows metrics for each k:\n\n")
@@ -0,0 +1,188 @@
+# data_mining/clustering/kmeans_sweep.py
+"""
+Parallel, warm-started K-means sweep over a range of k.
+
+  - The k values are cut into fixed chains of consecutive k (CHAIN_LENGTH),
+    and chains run on a bounded thread pool.  K-means fits and the distance
+    matmuls release the GIL, so chains use separate cores; BLAS/OpenMP are
+    pinned to one thread per fit to avoid oversubscription.
+  - Within a chain each k is warm-started from the previous k's centres plus
+    one new centre drawn by a k-means++ step, and compared against a couple of
+    cold k-means++ restarts; the first k of a chain gets the full N_INIT cold
+    restarts.  Every fit is seeded from (seed, k), and the chain split does
+    not depend on the worker count, so results are identical for any --workers.
+  - Silhouette and inertia come from one SilhouetteEvaluator (silhouette.py)
+    shared by all k: exact and blocked -- with the distance matrix computed
+    once for every k while it fits in memory, and the silhouette and inertia
+    reduced from the same distance blocks -- or, for large data, a
+    stratified-sample estimate with a confidence interval.  The mode is
+    recorded in the results.
+  - Each finished k is appended to <results CSV>.partial straight away
+    (completion order); the CSV itself is written sorted by k when the sweep
+    ends, and the partial file is removed even if a fit raises.
+
+Plots are not drawn here: callers render them from the returned results once
+fitting is done.
+"""
+import os
+import csv
+import contextlib
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.metrics import adjusted_rand_score, pairwise_distances
+from threadpoolctl import threadpool_limits
+
+from data_mining.clustering.silhouette import SilhouetteEvaluator
+
+N_INIT = 10          # cold k-means++ restarts for the first k of a chain
+N_INIT_WARM = 2      # cold restarts that compete with a warm start
+CHAIN_LENGTH = 4     # consecutive k values per warm-start chain
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+RESULT_COLUMNS = ['k', 'ARI', 'Silhouette', 'Inertia', 'SilhouetteMode', 'SilhouetteLow', 'SilhouetteHigh',
+                  'SilhouetteSample', 'Init', 'Iterations', 'Seconds']
+
+
+def task_seed(seed, k):
+    """Deterministic per-k random_state derived from the sweep seed."""
+    return int(np.random.SeedSequence([seed, k]).generate_state(1)[0])
+
+
+def grow_centers(X, centers, k, rng):
+    """Add k-means++ style centres (drawn proportional to D^2) until there are ``k``."""
+    centers = np.asarray(centers, dtype=np.float64)
+    while len(centers) < k:
+        d2 = pairwise_distances(X, centers, metric="sqeuclidean").min(axis=1)
+        total = d2.sum()
+        idx = rng.choice(len(X), p=d2 / total) if total > 0 else rng.integers(len(X))
+        centers = np.vstack([centers, X[idx]])
+    return centers
+
+
+def fit_k(X, k, seed, warm_centers=None):
+    """Best KMeans for ``k``: warm start (if given) against cold k-means++ restarts; returns (model, init)."""
+    random_state = task_seed(seed, k)
+    if warm_centers is None:
+        return KMeans(n_clusters=k, n_init=N_INIT, random_state=random_state).fit(X), "k-means++"
+    init = grow_centers(X, warm_centers, k, np.random.default_rng(random_state))
+    warm = KMeans(n_clusters=k, init=init, n_init=1, random_state=random_state).fit(X)
+    cold = KMeans(n_clusters=k, n_init=N_INIT_WARM, random_state=random_state).fit(X)
+    return (warm, "warm") if warm.inertia_ <= cold.inertia_ else (cold, "k-means++")
+
+
+class ResultWriter:
+    """
+    Thread-safe CSV that receives one row per finished k.
+
+    Rows are streamed to ``<path>.partial``; ``finalize`` writes the sorted
+    results to ``path`` and removes it.  Used as a context manager, the file
+    is always closed, and a sweep that raises leaves no partial CSV behind
+    (an earlier complete ``path`` is kept).
+    """
+
+    def __init__(self, path, columns=RESULT_COLUMNS):
+        self.path = path
+        self.partial_path = path + ".partial"
+        self.columns = columns
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(self.partial_path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=columns, extrasaction="ignore")
+        self.writer.writeheader()
+        self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+        return False
+
+    def write(self, row):
+        with self.lock:
+            self.writer.writerow(row)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+    def finalize(self, results):
+        """Replace the streamed file with the rows sorted by k."""
+        self.close()
+        tmp_path = self.path + ".tmp"
+        results.to_csv(tmp_path, index=False, columns=[c for c in self.columns if c in results])
+        os.replace(tmp_path, self.path)
+        os.remove(self.partial_path)
+
+
+def run_chain(X, ks, seed, evaluator, y_true=None, on_result=None):
+    """Fit the consecutive ``ks`` in order, warm-starting each from the previous centres."""
+    rows, models = [], {}
+    warm = None
+    # OpenMP thread counts are per calling thread, so the limit is set inside the worker
+    with threadpool_limits(limits=1, user_api="openmp"):
+        for k in ks:
+            start = time.perf_counter()
+            model, init = fit_k(X, k, seed, warm)
+            row = {
+                'k': k,
+                'ARI': adjusted_rand_score(y_true, model.labels_) if y_true is not None else None,
+                **evaluator.evaluate(model.labels_, k),
+                'Init': init,
+                'Iterations': int(model.n_iter_),
+                'Seconds': round(time.perf_counter() - start, 4),
+            }
+            rows.append(row)
+            models[k] = model
+            if on_result is not None:
+                on_result(row)
+            warm = model.cluster_centers_
+    return rows, models
+
+
+def sweep(X, k_values, seed=42, y_true=None, max_workers=MAX_WORKERS, results_path=None, on_result=None,
+          silhouette_mode="auto"):
+    """
+    Fit every k in ``k_values`` and return (results DataFrame sorted by k, {k: fitted KMeans}).
+
+    With ``results_path`` each row is streamed to ``<results_path>.partial``
+    as its k finishes, and the sorted results are written to ``results_path``.
+    ``silhouette_mode`` is "auto" (by dataset size), "exact" or "sample".
+    """
+    X = np.asarray(X, dtype=np.float64)
+    k_values = sorted(set(int(k) for k in k_values if 1 < k < len(X)))
+    chains = [k_values[i:i + CHAIN_LENGTH] for i in range(0, len(k_values), CHAIN_LENGTH)]
+    evaluator = SilhouetteEvaluator(X, mode=silhouette_mode, seed=seed)
+
+    def finished(row):
+        if writer is not None:
+            writer.write(row)
+        if on_result is not None:
+            on_result(row)
+
+    rows, models = [], {}
+    with ResultWriter(results_path) if results_path else contextlib.nullcontext() as writer:
+        # Larger k costs more, so the last chains are submitted first
+        with threadpool_limits(limits=1, user_api="blas"), \
+                ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            futures = [pool.submit(run_chain, X, chain, seed, evaluator, y_true, finished)
+                       for chain in reversed(chains)]
+            for future in as_completed(futures):
+                chain_rows, chain_models = future.result()
+                rows += chain_rows
+                models.update(chain_models)
+
+        results = pd.DataFrame(rows, columns=RESULT_COLUMNS).sort_values('k', ignore_index=True)
+        if y_true is None:
+            results = results.drop(columns='ARI')
+        if writer is not None:
+            writer.finalize(results)
+    return results, models
@@ -0,0 +1,64 @@
+# data_mining/clustering/test_customer_segmentation.py
+"""
+Out-of-core RFM segmentation: RFM values against pandas, SegmentDim and cache eviction.
+
+Run from the repository root:
+    python -m pytest data_mining/clustering/test_customer_segmentation.py
+"""
+import os
+import sys
+import shutil
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from instrumentation import StageRecorder
+from data_mining.clustering import customer_segmentation
+from data_warehousing.olap.aggregates import QueryRouter
+from data_warehousing.olap.query_cache import CACHE_DIR, QueryCache
+
+
+def expected_rfm(conn):
+    lines = pd.read_sql_query("SELECT CustomerKey, InvoiceNo, DateKey, TotalSales FROM SalesFact", conn)
+    dates = pd.to_datetime(lines['DateKey'].astype(str), format="%Y%m%d")
+    per_customer = lines.assign(Date=dates).groupby('CustomerKey').agg(
+        Last=('Date', 'max'), Frequency=('InvoiceNo', 'nunique'), Monetary=('TotalSales', 'sum'))
+    per_customer['RecencyDays'] = (dates.max() - per_customer['Last']).dt.days
+    return per_customer[['RecencyDays', 'Frequency', 'Monetary']]
+
+
+def test_segments_rfm_and_cache(warehouse_path, tmp_path, monkeypatch):
+    db_path = str(tmp_path / "retail_dw.db")
+    shutil.copyfile(warehouse_path, db_path)
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect(db_path)
+    cache = QueryCache(CACHE_DIR)
+    router = QueryRouter(conn, cache=cache)
+    router.query(['Country'])
+    router.query(['Segment'])
+
+    recorder = StageRecorder("test_customer_segmentation", path=str(tmp_path / "stage_metrics.jsonl"))
+    segments = customer_segmentation.run(db_path, k=4, batch_size=256, epochs=2, recorder=recorder)
+
+    written = pd.read_sql_query("SELECT * FROM CustomerSegment", conn, index_col='CustomerKey').sort_index()
+    expected = expected_rfm(conn)
+    assert written.index.tolist() == expected.index.tolist()
+    assert np.array_equal(written['RecencyDays'], expected['RecencyDays'])
+    assert np.array_equal(written['Frequency'], expected['Frequency'])
+    assert np.allclose(written['Monetary'], expected['Monetary'])
+
+    # SegmentDim matches the assignments
+    assert segments['Segment'].tolist() == [0, 1, 2, 3]
+    assert segments['Customers'].sum() == len(written)
+    counts = written['Segment'].value_counts().sort_index()
+    assert counts.tolist() == segments.set_index('Segment').loc[counts.index, 'Customers'].tolist()
+
+    # Only the cached result that reads the segments was evicted
+    cache = QueryCache(CACHE_DIR)
+    assert [e["tables"] for e in cache._index["entries"].values()] == [['AggSales_Country']]
+    router = QueryRouter(conn, cache=cache)
+    assert router.query(['Segment'])['Segment'].notna().all()
+    conn.close()
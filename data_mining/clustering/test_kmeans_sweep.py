@@ -0,0 +1,51 @@
+# data_mining/clustering/test_kmeans_sweep.py
+"""
+K-means sweep results CSV: sorted on success, no partial file when a fit raises.
+
+Run from the repository root:
+    python -m pytest data_mining/clustering/test_kmeans_sweep.py
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+from sklearn.datasets import make_blobs
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_mining.clustering import kmeans_sweep
+from data_mining.clustering.kmeans_sweep import sweep
+
+K_VALUES = range(2, 8)
+
+
+@pytest.fixture
+def X():
+    return make_blobs(n_samples=200, centers=4, random_state=0)[0]
+
+
+def test_results_csv_is_written_sorted_by_k(tmp_path, X):
+    path = str(tmp_path / "out" / "sweep.csv")
+    results, _ = sweep(X, K_VALUES, max_workers=2, results_path=path)
+    assert pd.read_csv(path)['k'].tolist() == list(K_VALUES) == results['k'].tolist()
+    assert os.listdir(tmp_path / "out") == ["sweep.csv"]
+
+
+def test_failed_fit_leaves_no_partial_csv(tmp_path, X, monkeypatch):
+    path = str(tmp_path / "sweep.csv")
+    sweep(X, K_VALUES, max_workers=2, results_path=path)
+    previous = pd.read_csv(path)
+
+    fit_k = kmeans_sweep.fit_k
+
+    def failing_fit(X, k, seed, warm_centers=None):
+        if k == 7:
+            raise RuntimeError("fit failed")
+        return fit_k(X, k, seed, warm_centers)
+
+    monkeypatch.setattr(kmeans_sweep, "fit_k", failing_fit)
+    with pytest.raises(RuntimeError, match="fit failed"):
+        sweep(X, K_VALUES, max_workers=2, results_path=path)
+    assert os.listdir(tmp_path) == ["sweep.csv"]
+    pd.testing.assert_frame_equal(pd.read_csv(path), previous)
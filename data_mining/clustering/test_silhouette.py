@@ -0,0 +1,66 @@
+# data_mining/clustering/test_silhouette.py
+"""
+SilhouetteEvaluator against sklearn: exact mode to 1e-12, sample mode within its interval.
+
+Run from the repository root:
+    python -m pytest data_mining/clustering/test_silhouette.py
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+from sklearn.cluster import KMeans
+from sklearn.datasets import make_blobs
+from sklearn.metrics import silhouette_score
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_mining.clustering.silhouette import SilhouetteEvaluator
+
+
+def blobs(n, seed=0):
+    X, _ = make_blobs(n_samples=n, centers=4, cluster_std=1.5, random_state=seed)
+    return X
+
+
+@pytest.mark.parametrize("cache_mb", [256, 0])          # cached distance matrix, and blocks without it
+@pytest.mark.parametrize("k", [2, 3, 5])
+def test_exact_mode_matches_sklearn(k, cache_mb):
+    X = blobs(600)
+    model = KMeans(n_clusters=k, n_init=3, random_state=42).fit(X)
+    evaluator = SilhouetteEvaluator(X, mode="exact", cache_mb=cache_mb, block_mb=0.5)
+    assert (evaluator.D is None) == (cache_mb == 0) and evaluator.block_rows < len(X)
+    result = evaluator.evaluate(model.labels_, k)
+    assert result['SilhouetteMode'] == "exact" and result['SilhouetteSample'] == len(X)
+    assert abs(result['Silhouette'] - silhouette_score(X, model.labels_)) < 1e-12
+    assert result['Inertia'] == pytest.approx(model.inertia_, rel=1e-9)
+
+
+def test_exact_mode_scores_singletons_as_zero():
+    X = blobs(50)
+    labels = np.zeros(len(X), dtype=np.int64)
+    labels[0], labels[1:10] = 2, 1                       # cluster 2 is a single row
+    result = SilhouetteEvaluator(X, mode="exact").evaluate(labels, 3)
+    assert abs(result['Silhouette'] - silhouette_score(X, labels)) < 1e-12
+
+
+def test_sample_mode_interval_covers_the_exact_score():
+    X = blobs(6000)
+    labels = KMeans(n_clusters=4, n_init=3, random_state=42).fit_predict(X)
+    evaluator = SilhouetteEvaluator(X, mode="sample", sample_size=800)
+    result = evaluator.evaluate(labels, 4)
+    assert result['SilhouetteMode'] == "sample" and result['SilhouetteSample'] >= 800 - 4
+    assert result['SilhouetteLow'] <= silhouette_score(X, labels) <= result['SilhouetteHigh']
+
+    rows, strata = evaluator.stratified_sample(labels, 4)
+    assert len(np.unique(rows)) == len(rows)
+    assert all((labels[rows[members]] == c).all() for c, members in strata.items())
+
+
+def test_auto_mode_and_a_sample_larger_than_the_data():
+    X = blobs(100)
+    assert SilhouetteEvaluator(X).mode == "exact"
+    assert SilhouetteEvaluator(X, mode="sample", sample_size=100).mode == "exact"
+    with pytest.raises(ValueError, match="mode must be one of"):
+        SilhouetteEvaluator(X, mode="fast")
@@ -1,17 +1,29 @@
 # data_mining/main.py
+import os
+import sys
+
 import preprocessing
 import eda
 import report
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from instrumentation import StageRecorder
+
 def main():
-    # Step 1: Preprocess
-    df_raw, df_scaled = preprocessing.run()
+    with StageRecorder("data_exploration") as stages:
+        # Step 1: Preprocess
+        with stages.stage("preprocess") as stage:
+            df_raw, df_scaled = preprocessing.run()
+            stage.add_rows(rows_out=len(df_raw))
 
-    # Step 2: EDA
-    eda.run(df_raw, df_scaled)
+        # Step 2: EDA
+        with stages.stage("eda", rows_in=len(df_raw)):
+            eda.run(df_raw, df_scaled)
 
-    # Step 3: Generate Markdown report
-    report.generate_md_report()
+        # Step 3: Generate Markdown report
+        with stages.stage("report"):
+            report.generate_md_report()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,224 @@
+# data_warehousing/benchmark.py
+"""
+Reproducible ETL / OLAP benchmark on synthetic OnlineRetail data.
+
+For each scale (multiples of the real 541,909-row sheet, default 1 10 100)
+a fresh worker process, working inside its own directory under
+data_warehousing/benchmark_work/scale_<S>/ so the real warehouse is never
+touched:
+  1. generates the seeded synthetic rows (etl/synthetic.py) as the Parquet
+     extract cache,
+  2. runs the full ETL (extract, clean, enrich, load, aggregates, ...),
+  3. runs every statement of olap/olap_queries.sql against the warehouse
+     (on the month partitions, via aggregates.partition_sql),
+  4. answers the dashboard grains through QueryRouter and, unless
+     --skip-dashboard, rebuilds the static dashboard (etl_retail.py, needs
+     Kaleido).
+
+Every step is a StageRecorder stage (instrumentation.py), so each scale is
+measured in a clean process and its peak RSS is its own.  The stages of all
+scales are written to one CSV, one row per (scale, stage), with a stable
+column order and rounding so results of two versions can be diffed
+directly, or compared with --compare:
+
+    label,scale,seed,stage,calls,wall_s,cpu_s,rows_in,rows_out,rows_per_s,rss_peak_mb,rss_peak_delta_mb
+
+Run from the repository root:
+    python data_warehousing/benchmark.py [--scales 1 10 100] [--seed 42] [--label NAME]
+                                         [--skip-dashboard] [--keep]
+    python data_warehousing/benchmark.py --compare OLD.csv NEW.csv [--threshold 0.2]
+"""
+import os
+import re
+import sys
+import csv
+import json
+import shutil
+import logging
+import argparse
+import subprocess
+from datetime import datetime
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_ROOT)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+WORK_DIR = "data_warehousing/benchmark_work"
+RESULTS_DIR = "data_warehousing/benchmark_results"
+QUERIES_PATH = os.path.join(REPO_ROOT, "data_warehousing/olap/olap_queries.sql")
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_SEED = 42
+RESULT_COLUMNS = ["label", "scale", "seed", "stage", "calls", "wall_s", "cpu_s", "rows_in", "rows_out",
+                  "rows_per_s", "rss_peak_mb", "rss_peak_delta_mb"]
+# Directories the relative paths of the ETL / OLAP modules expect below the working directory
+WORKSPACE_DIRS = ["data_warehousing/data/raw", "data_warehousing/data/processed", "data_warehousing/data/cache",
+                  "data_warehousing/etl", "data_warehousing/olap", "data_warehousing/OLAP"]
+DASHBOARD_GRAINS = [['Country'], ['Country', 'Category'], ['Year', 'Month', 'Country']]
+
+
+def split_queries(path=QUERIES_PATH):
+    """(name, sql) per statement; the name comes from the '-- Label: ...' comment above it."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    queries = []
+    for i, block in enumerate(s for s in text.split(";") if s.strip()):
+        comment = re.search(r"--\s*([^:\n]+)", block)
+        slug = re.sub(r"[^a-z0-9]+", "_", comment.group(1).lower()).strip("_") if comment else "query"
+        queries.append((f"sql_{i + 1}_{slug}", block.strip()))
+    return queries
+
+
+def scale_name(scale):
+    return f"{scale:g}".replace(".", "_")
+
+
+# ---------- WORKER (one process per scale) ----------
+def run_scale(scale, seed, metrics_path, skip_dashboard=False):
+    """Generate, load and query one scale inside the current (workspace) directory."""
+    for d in WORKSPACE_DIRS:
+        os.makedirs(d, exist_ok=True)
+    # Imported here, after the chdir, so module-level relative paths (ETL log, caches) land in the workspace
+    import sqlite3
+    from instrumentation import StageRecorder
+    from data_warehousing.etl import extract, run_etl, synthetic
+    from data_warehousing.olap.aggregates import QueryRouter, partition_sql
+
+    stages = StageRecorder("benchmark", path=metrics_path)
+    stages.annotate(scale=scale, seed=seed)
+
+    with stages.stage("generate") as stage:
+        stage.add_rows(rows_out=synthetic.write_parquet(extract.CACHE_PATH, scale, seed))
+
+    run_etl.run(recorder=stages)
+
+    conn = sqlite3.connect(run_etl.DB_FILE_PATH)
+    for name, sql in split_queries():
+        with stages.stage(name) as stage:
+            stage.add_rows(rows_out=len(conn.execute(partition_sql(conn, sql)[0]).fetchall()))
+    with stages.stage("router_dashboard_grains") as stage:
+        frames = QueryRouter(conn).query_grains(DASHBOARD_GRAINS)
+        stage.add_rows(rows_out=sum(len(f) for f in frames))
+    conn.close()
+
+    if not skip_dashboard:
+        from data_warehousing.etl import etl_retail
+        etl_retail.main(force=True, recorder=stages)
+    stages.close()
+
+
+# ---------- DRIVER ----------
+def default_label():
+    """Short git revision of the tree being measured (with -dirty for local changes)."""
+    try:
+        out = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=REPO_ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return datetime.now().strftime("%Y%m%d-%H%M%S")
+
+
+def _fmt(value, digits):
+    return "" if value is None else f"{value:.{digits}f}"
+
+
+def result_rows(records, label, scale, seed):
+    rows = []
+    for rec in records:
+        rows.append({
+            "label": label, "scale": f"{scale:g}", "seed": seed, "stage": rec["stage"], "calls": rec["calls"],
+            "wall_s": _fmt(rec["wall_s"], 3), "cpu_s": _fmt(rec["cpu_s"], 3),
+            "rows_in": "" if rec["rows_in"] is None else rec["rows_in"],
+            "rows_out": "" if rec["rows_out"] is None else rec["rows_out"],
+            "rows_per_s": _fmt(rec["rows_per_s"], 0),
+            "rss_peak_mb": _fmt(rec["rss_peak_mb"], 1), "rss_peak_delta_mb": _fmt(rec["rss_peak_delta_mb"], 1),
+        })
+    return rows
+
+
+def run_benchmark(scales=DEFAULT_SCALES, seed=DEFAULT_SEED, label=None, skip_dashboard=False, keep=False,
+                  out_path=None):
+    label = label or default_label()
+    out_path = out_path or os.path.join(RESULTS_DIR, f"{label}.csv")
+    rows = []
+    for scale in scales:
+        workspace = os.path.abspath(os.path.join(WORK_DIR, f"scale_{scale_name(scale)}"))
+        shutil.rmtree(workspace, ignore_errors=True)
+        os.makedirs(workspace)
+        metrics_path = os.path.join(workspace, "stage_metrics.jsonl")
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", "--scales", f"{scale:g}",
+               "--seed", str(seed), "--metrics", metrics_path] + (["--skip-dashboard"] if skip_dashboard else [])
+        logging.info(f"Benchmarking scale {scale:g} in {workspace}")
+        subprocess.run(cmd, cwd=workspace, check=True)
+        with open(metrics_path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        rows += result_rows(records, label, scale, seed)
+        total = records[-1]
+        logging.info(f"Scale {scale:g}: {total['wall_s']:.1f}s wall, peak RSS {total['rss_peak_mb']:.0f} MB")
+        if not keep:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    logging.info(f"Benchmark results written to {out_path}")
+    return out_path
+
+
+def compare(old_path, new_path, threshold=0.2):
+    """Print wall-time and throughput ratios per (scale, stage); returns the stages slower than ``threshold``."""
+    def load(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            return {(r["scale"], r["stage"]): r for r in csv.DictReader(f)}
+
+    old, new = load(old_path), load(new_path)
+    regressions = []
+    print(f"{'scale':>6} {'stage':<40} {'old s':>9} {'new s':>9} {'ratio':>7} {'old MB':>8} {'new MB':>8}")
+    for key in [k for k in new if k in old]:
+        o, n = old[key], new[key]
+        o_wall, n_wall = float(o["wall_s"] or 0), float(n["wall_s"] or 0)
+        ratio = n_wall / o_wall if o_wall > 0 else float("nan")
+        flag = ""
+        # Sub-10ms stages are noise, not regressions
+        if o_wall > 0 and n_wall >= 0.01 and ratio > 1 + threshold:
+            regressions.append(key)
+            flag = "  <-- slower"
+        print(f"{key[0]:>6} {key[1]:<40} {o_wall:>9.3f} {n_wall:>9.3f} {ratio:>7.2f} "
+              f"{o['rss_peak_mb']:>8} {n['rss_peak_mb']:>8}{flag}")
+    for key in sorted(set(old) ^ set(new)):
+        print(f"{key[0]:>6} {key[1]:<40} only in {'old' if key in old else 'new'}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ETL / OLAP benchmark on seeded synthetic OnlineRetail data")
+    parser.add_argument("--scales", type=float, nargs="+", default=DEFAULT_SCALES,
+                        help="multiples of the real sheet's 541,909 rows")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--label", help="results name (default: git describe of the tree)")
+    parser.add_argument("--out", help="results CSV (default: benchmark_results/<label>.csv)")
+    parser.add_argument("--skip-dashboard", action="store_true", help="skip the Kaleido dashboard build")
+    parser.add_argument("--keep", action="store_true", help="keep each scale's workspace (warehouse, CSVs)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="diff two results CSVs")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="with --compare: relative slowdown reported as a regression")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--metrics", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        regressions = compare(*args.compare, threshold=args.threshold)
+        raise SystemExit(1 if regressions else 0)
+    if args.worker:
+        run_scale(args.scales[0], args.seed, args.metrics, skip_dashboard=args.skip_dashboard)
+        return
+    run_benchmark(args.scales, args.seed, args.label, args.skip_dashboard, args.keep, args.out)
+
+
+if __name__ == "__main__":
+    main()
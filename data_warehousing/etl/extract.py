@@ -0,0 +1,184 @@
+# data_warehousing/etl/extract.py
+"""
+Streaming extract of the OnlineRetail workbook.
+
+The raw sheet is never materialised as one DataFrame: rows are read with
+openpyxl in read-only mode and yielded in batches of ``chunk_size``.  On the
+first run the sheet is also written to a Parquet cache (one row group per
+batch) so later runs read columnar batches instead of parsing Excel.
+
+Incremental runs pass ``since=(InvoiceDate, InvoiceNo)``: cached row groups
+whose InvoiceDate statistics end before the watermark are skipped unread, and
+the remaining rows are filtered down to those strictly after it.
+"""
+import os
+import logging
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# ------------------------
+# Config
+# ------------------------
+RAW_XLSX_PATH = "data_warehousing/data/raw/OnlineRetail.xlsx"
+CACHE_PATH = "data_warehousing/data/cache/OnlineRetail.parquet"
+CHUNK_SIZE = 50_000
+
+COLUMNS = ['InvoiceNo', 'StockCode', 'Description', 'Quantity',
+           'InvoiceDate', 'UnitPrice', 'CustomerID', 'Country']
+
+
+def _coerce_types(df):
+    """Give a raw batch stable dtypes (mixed int/str codes become strings)."""
+    for col in ('InvoiceNo', 'StockCode', 'Description', 'Country'):
+        df[col] = df[col].astype('string')
+    df['Quantity'] = pd.to_numeric(df['Quantity'], errors='coerce')
+    df['UnitPrice'] = pd.to_numeric(df['UnitPrice'], errors='coerce').astype('float64')
+    df['CustomerID'] = pd.to_numeric(df['CustomerID'], errors='coerce').astype('float64')
+    df['InvoiceDate'] = pd.to_datetime(df['InvoiceDate'], errors='coerce')
+    return df
+
+
+def iter_excel_chunks(xlsx_path=RAW_XLSX_PATH, chunk_size=CHUNK_SIZE):
+    """Yield the first sheet of ``xlsx_path`` as DataFrames of at most ``chunk_size`` rows."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(h).strip() for h in next(rows)]
+        missing = set(COLUMNS) - set(header)
+        if missing:
+            raise ValueError(f"{xlsx_path} is missing columns: {sorted(missing)}")
+
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= chunk_size:
+                yield _coerce_types(pd.DataFrame(buffer, columns=header)[COLUMNS])
+                buffer = []
+        if buffer:
+            yield _coerce_types(pd.DataFrame(buffer, columns=header)[COLUMNS])
+    finally:
+        wb.close()
+
+
+def _arrow_schema():
+    return pa.schema([
+        ('InvoiceNo', pa.string()),
+        ('StockCode', pa.string()),
+        ('Description', pa.string()),
+        ('Quantity', pa.float64()),
+        ('InvoiceDate', pa.timestamp('ns')),
+        ('UnitPrice', pa.float64()),
+        ('CustomerID', pa.float64()),
+        ('Country', pa.string()),
+    ])
+
+
+def build_columnar_cache(xlsx_path=RAW_XLSX_PATH, cache_path=CACHE_PATH, chunk_size=CHUNK_SIZE):
+    """Convert the raw sheet to Parquet once, streaming one row group per chunk."""
+    if pq is None:
+        raise ImportError("pyarrow is required to build the columnar cache")
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    schema = _arrow_schema()
+    n_rows = 0
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for chunk in iter_excel_chunks(xlsx_path, chunk_size):
+            chunk['Quantity'] = chunk['Quantity'].astype('float64')
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            n_rows += len(chunk)
+    # Only publish a complete file, so an interrupted run never leaves a truncated cache behind
+    os.replace(tmp_path, cache_path)
+    logging.info(f"Columnar cache written to {cache_path} ({n_rows} rows)")
+    return cache_path
+
+
+def cache_is_fresh(xlsx_path=RAW_XLSX_PATH, cache_path=CACHE_PATH):
+    """True when the Parquet cache exists and is not older than the workbook."""
+    if not os.path.exists(cache_path):
+        return False
+    if not os.path.exists(xlsx_path):
+        return True
+    return os.path.getmtime(cache_path) >= os.path.getmtime(xlsx_path)
+
+
+def invoice_sequence(invoice_nos):
+    """
+    Numeric part of a Series of invoice numbers ('C536379' -> 536379).
+
+    Cancellations take their number from the same sequence as sales, so
+    invoices are ordered on this rather than on the strings, where every
+    'C...' number would sort after every plain one.
+    """
+    digits = invoice_nos.astype('string').str.extract(r'(\d+)', expand=False)
+    return pd.to_numeric(digits, errors='coerce')
+
+
+def after_watermark(df, since):
+    """Rows strictly after the (InvoiceDate, InvoiceNo) high-water mark."""
+    last_date, last_no = since
+    last_seq = invoice_sequence(pd.Series([last_no])).iloc[0]
+    newer = (df['InvoiceDate'] > last_date) | (
+        (df['InvoiceDate'] == last_date) & (invoice_sequence(df['InvoiceNo']) > last_seq))
+    return df[newer.fillna(False).to_numpy(dtype=bool)]
+
+
+def _row_groups_after(pf, since_date):
+    """Indices of row groups that may hold rows on/after ``since_date`` (by column statistics)."""
+    col = pf.schema_arrow.get_field_index('InvoiceDate')
+    keep = []
+    for i in range(pf.metadata.num_row_groups):
+        stats = pf.metadata.row_group(i).column(col).statistics
+        if stats is None or not stats.has_min_max or pd.Timestamp(stats.max) >= since_date:
+            keep.append(i)
+    return keep
+
+
+def iter_parquet_chunks(cache_path=CACHE_PATH, chunk_size=CHUNK_SIZE, since=None):
+    """Yield the cached sheet in batches of at most ``chunk_size`` rows."""
+    pf = pq.ParquetFile(cache_path)
+    row_groups = None
+    if since is not None:
+        row_groups = _row_groups_after(pf, since[0])
+        logging.info(f"Watermark pruning: reading {len(row_groups)} of "
+                     f"{pf.metadata.num_row_groups} cached row groups")
+        if not row_groups:
+            return
+    for batch in pf.iter_batches(batch_size=chunk_size, columns=COLUMNS, row_groups=row_groups):
+        df = batch.to_pandas()
+        for col in ('InvoiceNo', 'StockCode', 'Description', 'Country'):
+            df[col] = df[col].astype('string')
+        if since is not None:
+            df = after_watermark(df, since)
+        yield df
+
+
+def iter_chunks(xlsx_path=RAW_XLSX_PATH, cache_path=CACHE_PATH, chunk_size=CHUNK_SIZE,
+                use_cache=True, since=None):
+    """
+    Yield raw batches, preferring the columnar cache.
+
+    With ``use_cache`` the cache is built on first use (or when the workbook is
+    newer); without pyarrow or with ``use_cache=False`` Excel is streamed directly.
+    ``since`` restricts the output to rows after an incremental-load watermark.
+    """
+    if use_cache and pq is not None:
+        if not cache_is_fresh(xlsx_path, cache_path):
+            logging.info(f"Building columnar cache from {xlsx_path} (one-time conversion)")
+            build_columnar_cache(xlsx_path, cache_path, chunk_size)
+        else:
+            logging.info(f"Reading raw data from columnar cache {cache_path}")
+        yield from iter_parquet_chunks(cache_path, chunk_size, since=since)
+    else:
+        if use_cache:
+            logging.warning("pyarrow not installed; streaming directly from Excel")
+        for chunk in iter_excel_chunks(xlsx_path, chunk_size):
+            yield chunk if since is None else after_watermark(chunk, since)
@@ -0,0 +1,93 @@
+# data_warehousing/etl/keymap.py
+"""
+Natural-key -> surrogate-key maps for the dimension tables.
+
+A DimensionKeyMap is built once per dimension (from the existing table on
+incremental loads) and then resolves the keys of a whole batch with a single
+hash-index lookup, assigning new surrogate keys to unseen members in bulk.
+Because every natural key maps to exactly one surrogate key there is no join,
+and therefore no fan-out, when fact rows are assembled.
+"""
+import numpy as np
+import pandas as pd
+
+
+class DuplicateNaturalKeyError(ValueError):
+    """A dimension holds more than one surrogate key for the same natural key."""
+
+
+def _as_index(frame):
+    if frame.shape[1] == 1:
+        return pd.Index(frame.iloc[:, 0])
+    return pd.MultiIndex.from_frame(frame)
+
+
+class DimensionKeyMap:
+    """Hash map from natural-key columns to integer surrogate keys for one dimension."""
+
+    def __init__(self, name, natural_key):
+        self.name = name
+        self.natural_key = list(natural_key)
+        self._index = None
+        self._keys = np.empty(0, dtype=np.int64)
+        self.next_key = 1
+
+    def __len__(self):
+        return len(self._keys)
+
+    @classmethod
+    def from_frame(cls, name, frame, surrogate_key, natural_key):
+        """Build the map from existing dimension rows, failing on duplicate natural keys."""
+        keymap = cls(name, natural_key)
+        if not frame.empty:
+            keymap._add(frame[keymap.natural_key], frame[surrogate_key].to_numpy(dtype=np.int64))
+        return keymap
+
+    @classmethod
+    def from_table(cls, conn, table, surrogate_key, natural_key):
+        """Build the map from a dimension table in the warehouse."""
+        cols = ', '.join([surrogate_key] + list(natural_key))
+        frame = pd.read_sql_query(f"SELECT {cols} FROM {table}", conn)
+        return cls.from_frame(table, frame, surrogate_key, natural_key)
+
+    def _add(self, members, keys):
+        index = _as_index(members.reset_index(drop=True))
+        if self._index is not None:
+            index = self._index.append(index)
+            keys = np.concatenate([self._keys, keys])
+        dupes = index.duplicated()
+        if dupes.any():
+            examples = list(index[dupes][:5])
+            raise DuplicateNaturalKeyError(
+                f"{self.name}: {int(dupes.sum())} duplicate natural key(s) on "
+                f"{self.natural_key}, e.g. {examples}")
+        self._index = index
+        self._keys = keys
+        self.next_key = max(self.next_key, int(keys.max()) + 1 if len(keys) else 1)
+
+    def lookup(self, frame):
+        """Surrogate keys for each row of ``frame`` (-1 where the member is unknown)."""
+        if self._index is None:
+            return np.full(len(frame), -1, dtype=np.int64)
+        pos = self._index.get_indexer(_as_index(frame[self.natural_key]))
+        keys = np.where(pos >= 0, self._keys[pos], -1)
+        return keys
+
+    def resolve(self, frame):
+        """
+        Surrogate keys for every row of ``frame``, registering unseen members.
+
+        Returns ``(keys, new_members)`` where ``new_members`` holds the natural-key
+        columns of the members added by this call plus their assigned key in
+        column ``'_key'`` (empty when nothing was new).
+        """
+        keys = self.lookup(frame)
+        missing = keys < 0
+        if not missing.any():
+            return keys, frame.iloc[:0][self.natural_key].assign(_key=np.empty(0, dtype=np.int64))
+
+        new_members = frame.loc[missing, self.natural_key].drop_duplicates().reset_index(drop=True)
+        new_keys = np.arange(self.next_key, self.next_key + len(new_members), dtype=np.int64)
+        self._add(new_members, new_keys)
+        keys[missing] = self.lookup(frame.loc[missing])
+        return keys, new_members.assign(_key=new_keys)
@@ -0,0 +1,146 @@
+# data_warehousing/etl/partition_maint.py
+"""
+Maintenance of the SalesFact month partitions.
+
+  list     row count and DateKey range of every partition
+  compact  rewrite closed months in (DateKey, InvoiceNo) order in one
+           transaction, rebuild their indexes (advisor ones included) and VACUUM, so each month is stored densely after the
+           incremental loads that appended to it
+  archive  move months before --before YYYYMM into an archive database file
+           and drop them from retail_dw.db
+
+Archived months leave the SalesFact view (and any query that falls back to
+the fact table), but their rows stay in AggSales_* because incremental
+aggregate refreshes only recompute months from the load watermark onwards.
+A full ETL reload rebuilds everything from the source file.  The archive
+file holds the same SalesFact_YYYYMM tables and can be ATTACHed for ad-hoc
+queries.
+
+Run from the repository root:
+    python data_warehousing/etl/partition_maint.py list
+    python data_warehousing/etl/partition_maint.py compact [--months 201101 201102 ...]
+    python data_warehousing/etl/partition_maint.py archive --before 201106 [--archive PATH]
+"""
+import os
+import sys
+import logging
+import argparse
+import sqlite3
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_warehousing.etl.load import DB_FILE_PATH, FACT_COLUMNS, create_partition_indexes
+from data_warehousing.etl.partitions import create_partition, list_partitions, partition_table, rebuild_view
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+ARCHIVE_PATH = "data_warehousing/etl/retail_dw_archive.db"
+
+
+def partition_stats(conn):
+    """(month, rows, first DateKey, last DateKey) per partition."""
+    stats = []
+    for month in list_partitions(conn):
+        rows, first, last = conn.execute(
+            f"SELECT COUNT(*), MIN(DateKey), MAX(DateKey) FROM {partition_table(month)}").fetchone()
+        stats.append((month, rows, first, last))
+    return stats
+
+
+def compact_partitions(conn, months=None):
+    """Rewrite ``months`` (default: every month but the newest, which still receives loads)."""
+    existing = list_partitions(conn)
+    if months is None:
+        months = existing[:-1]
+    months = [m for m in months if m in existing]
+    cols = ", ".join(FACT_COLUMNS)
+    conn.commit()
+    try:
+        conn.execute("BEGIN")
+        # The view is dropped while tables are swapped so the renames do not have to rewrite it
+        conn.execute("DROP VIEW IF EXISTS SalesFact")
+        for month in months:
+            table = partition_table(month)
+            # Every index on the month (managed or idx_advisor_*) is recreated on the rewritten table
+            indexes = [row[0] for row in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                (table,))]
+            create_partition(conn, month, table=f"{table}_compact")
+            conn.execute(f"INSERT INTO {table}_compact ({cols}) "
+                         f"SELECT {cols} FROM {table} ORDER BY DateKey, InvoiceNo")
+            conn.execute(f"DROP TABLE {table}")
+            conn.execute(f"ALTER TABLE {table}_compact RENAME TO {table}")
+            for sql in indexes:
+                conn.execute(sql)
+            create_partition_indexes(conn, month)
+        rebuild_view(conn)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.execute("VACUUM")
+    logging.info(f"Compacted {len(months)} partition(s): {', '.join(map(str, months)) or '-'}")
+    return months
+
+
+def archive_partitions(conn, before, archive_path=ARCHIVE_PATH):
+    """Move every partition older than ``before`` (YYYYMM) to ``archive_path``."""
+    months = [m for m in list_partitions(conn) if m < before]
+    if not months:
+        logging.info(f"No partitions before {before} to archive")
+        return []
+    cols = ", ".join(FACT_COLUMNS)
+    conn.commit()
+    conn.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+    try:
+        archived = set(list_partitions(conn, schema="archive"))
+        conn.execute("BEGIN")
+        conn.execute("DROP VIEW IF EXISTS SalesFact")
+        for month in months:
+            table = partition_table(month)
+            if month in archived:
+                raise SystemExit(f"{table} already exists in {archive_path}; refusing to overwrite it")
+            create_partition(conn, month, schema="archive")
+            conn.execute(f"INSERT INTO archive.{table} ({cols}) SELECT {cols} FROM main.{table}")
+            conn.execute(f"DROP TABLE main.{table}")
+        rebuild_view(conn)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("DETACH DATABASE archive")
+    conn.execute("VACUUM")
+    logging.info(f"Archived {len(months)} partition(s) to {archive_path}: {', '.join(map(str, months))}")
+    return months
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the SalesFact month partitions of retail_dw.db")
+    parser.add_argument("command", choices=["list", "compact", "archive"])
+    parser.add_argument("--months", type=int, nargs="*", help="YYYYMM partitions to compact")
+    parser.add_argument("--before", type=int, help="archive partitions older than this YYYYMM month")
+    parser.add_argument("--archive", default=ARCHIVE_PATH, help="archive database file")
+    parser.add_argument("--db", default=DB_FILE_PATH)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        raise SystemExit(f"Database not found at {args.db}. Run ETL to create it first.")
+    conn = sqlite3.connect(args.db)
+    if args.command == "list":
+        for month, rows, first, last in partition_stats(conn):
+            print(f"{partition_table(month)}  {rows:>10,} rows  {first} .. {last}")
+    elif args.command == "compact":
+        compact_partitions(conn, args.months)
+    else:
+        if args.before is None:
+            parser.error("archive needs --before YYYYMM")
+        archive_partitions(conn, args.before, args.archive)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# data_warehousing/etl/partitions.py
+"""
+Month partitions of SalesFact.
+
+Fact rows live in one table per invoice month, ``SalesFact_YYYYMM``, whose
+DateKey range is enforced by a CHECK constraint.  ``SalesFact`` itself is a
+UNION ALL view over the partitions, so ad-hoc SQL keeps working.  SQLite
+materialises the view for aggregate queries, though, reading every
+partition without its indexes, so the query layer (olap/aggregates.py)
+reads only the partitions a time predicate can touch and aggregates each
+one separately -- QueryRouter for its own queries, partition_sql for
+hand-written ones such as olap_queries.sql.
+Loads write to the partitions of the months they contain -- for an
+incremental load normally just the newest one.  Closed months can be
+compacted or moved to an archive file with etl/partition_maint.py.
+"""
+import re
+
+FACT_VIEW = "SalesFact"
+PARTITION_PREFIX = "SalesFact_"
+_PARTITION_NAME = re.compile(r"^SalesFact_(\d{6})$")
+
+FACT_COLUMN_DDL = """
+    InvoiceNo   TEXT NOT NULL,
+    StockCode   TEXT NOT NULL,
+    CustomerKey INTEGER NOT NULL REFERENCES CustomerDim(CustomerKey),
+    DateKey     INTEGER NOT NULL REFERENCES TimeDim(DateKey),
+    Quantity    INTEGER NOT NULL,
+    UnitPrice   REAL NOT NULL,
+    TotalSales  REAL NOT NULL,
+    Category    TEXT NOT NULL"""
+
+# Column list of the view when there are no partitions yet (also an empty stand-in for a pruned-away range)
+EMPTY_FACT_SELECT = (
+    "SELECT CAST(NULL AS TEXT) AS InvoiceNo, CAST(NULL AS TEXT) AS StockCode, "
+    "CAST(NULL AS INTEGER) AS CustomerKey, CAST(NULL AS INTEGER) AS DateKey, "
+    "CAST(NULL AS INTEGER) AS Quantity, CAST(NULL AS REAL) AS UnitPrice, "
+    "CAST(NULL AS REAL) AS TotalSales, CAST(NULL AS TEXT) AS Category WHERE 0"
+)
+
+
+def partition_table(month):
+    """Table holding the fact rows of ``month`` (YYYYMM)."""
+    return f"{PARTITION_PREFIX}{int(month)}"
+
+
+def is_partition_table(name):
+    return bool(_PARTITION_NAME.match(name))
+
+
+def month_bounds(month):
+    """Inclusive DateKey range of a YYYYMM month."""
+    return int(month) * 100 + 1, int(month) * 100 + 31
+
+
+def list_partitions(conn, schema="main"):
+    """Months (YYYYMM ints) that have a partition table, oldest first."""
+    names = [row[0] for row in conn.execute(f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table'")]
+    return sorted(int(name[len(PARTITION_PREFIX):]) for name in names if is_partition_table(name))
+
+
+def is_partitioned(conn):
+    """True when SalesFact is the partition view (False for an older single-table warehouse)."""
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (FACT_VIEW,)).fetchone()
+    return row is not None and row[0] == 'view'
+
+
+def create_partition(conn, month, schema="main", table=None):
+    table = table or partition_table(month)
+    lo, hi = month_bounds(month)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {schema}.{table} ({FACT_COLUMN_DDL},\n"
+                 f"    CHECK (DateKey BETWEEN {lo} AND {hi})\n)")
+
+
+def rebuild_view(conn):
+    """(Re)create the SalesFact view over the current partitions."""
+    months = list_partitions(conn)
+    body = (" UNION ALL ".join(f"SELECT * FROM {partition_table(m)}" for m in months)
+            if months else EMPTY_FACT_SELECT)
+    conn.execute(f"DROP VIEW IF EXISTS {FACT_VIEW}")
+    conn.execute(f"CREATE VIEW {FACT_VIEW} AS {body}")
+
+
+def drop_all(conn):
+    """Drop the view and every partition (also an old single-table SalesFact)."""
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (FACT_VIEW,)).fetchone()
+    if row is not None:
+        conn.execute(f"DROP {row[0].upper()} {FACT_VIEW}")
+    for month in list_partitions(conn):
+        conn.execute(f"DROP TABLE {partition_table(month)}")
+
+
+def prune(months, date_range=None, month_range=None):
+    """Partitions that can hold rows for a DateKey range and/or YYYYMM range."""
+    lo, hi = float("-inf"), float("inf")
+    if date_range is not None:
+        lo, hi = max(lo, date_range[0] // 100), min(hi, date_range[1] // 100)
+    if month_range is not None:
+        lo, hi = max(lo, month_range[0]), min(hi, month_range[1])
+    return [m for m in months if lo <= m <= hi]
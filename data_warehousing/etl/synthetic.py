@@ -0,0 +1,196 @@
+# data_warehousing/etl/synthetic.py
+"""
+Seeded synthetic OnlineRetail data for benchmarks.
+
+Produces rows shaped like the UCI OnlineRetail sheet at any multiple of its
+size (scale 1 = 541,909 rows): invoices of ~21 lines on a business-hours
+calendar from 2010-12-01 to 2011-12-09, a catalogue of ~4,000 stock codes
+with Zipf-skewed popularity and category-bearing descriptions, customers
+pinned to countries with the real UK-heavy mix, heavy-tailed quantities and
+prices, plus the sheet's defects at roughly its rates (25% missing
+CustomerID, ~2% cancelled "C" invoices with negative quantities, a few
+missing descriptions / zero prices and ~1% exact duplicate lines).
+
+Output is generated invoice block by invoice block from ``(seed, block)``
+seeds, so a given scale and seed always yields the same rows regardless of
+how the output is chunked.  Large scales exceed Excel's row limit, so the
+default output is the Parquet cache that extract.py reads (write_parquet);
+write_xlsx is available for scales that fit in one sheet.
+
+Run from the repository root:
+    python data_warehousing/etl/synthetic.py --scale 10 [--seed 42] [--out PATH] [--xlsx]
+"""
+import os
+import sys
+import logging
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_warehousing.etl.extract import CACHE_PATH, COLUMNS, _arrow_schema, pa, pq
+
+BASE_ROWS = 541_909
+LINES_PER_INVOICE = 21
+INVOICES_PER_BLOCK = 2_000
+N_PRODUCTS = 4_070
+BASE_CUSTOMERS = 4_372
+FIRST_INVOICE = 536_365
+START = pd.Timestamp("2010-12-01 08:00")
+N_DAYS = 374
+EXCEL_MAX_ROWS = 1_048_575
+
+MISSING_CUSTOMER_RATE = 0.25
+CANCEL_RATE = 0.02
+MISSING_DESCRIPTION_RATE = 0.003
+DUPLICATE_RATE = 0.01
+WHOLESALE_RATE = 0.03
+
+# Share of customers per country, close to the real sheet (the rest are spread over smaller markets)
+COUNTRY_WEIGHTS = {
+    'United Kingdom': 0.885, 'Germany': 0.022, 'France': 0.020, 'EIRE': 0.008, 'Spain': 0.007,
+    'Belgium': 0.006, 'Switzerland': 0.006, 'Portugal': 0.005, 'Netherlands': 0.005,
+    'Norway': 0.004, 'Italy': 0.004, 'Channel Islands': 0.003, 'Finland': 0.003,
+    'Cyprus': 0.003, 'Sweden': 0.003, 'Australia': 0.003, 'Austria': 0.002, 'Denmark': 0.002,
+    'Japan': 0.002, 'Poland': 0.001, 'USA': 0.001, 'Israel': 0.001, 'Singapore': 0.001,
+    'Iceland': 0.001, 'Canada': 0.001, 'Greece': 0.001, 'Malta': 0.001, 'Brazil': 0.001,
+}
+
+_ADJECTIVES = ['WHITE', 'RED', 'PINK', 'BLUE', 'VINTAGE', 'REGENCY', 'JUMBO', 'SET OF 3', 'GLASS',
+               'HEART', 'RETROSPOT', 'PAISLEY', 'SPOTTY', 'WOODEN', 'ENAMEL', 'CHRISTMAS']
+_NOUNS = ['T-LIGHT HOLDER', 'LANTERN', 'CANDLE', 'MUG', 'TEA CUP', 'CAKE STAND', 'LUNCH BOX', 'JAR',
+          'GREETING CARD', 'NOTEBOOK', 'WRAP', 'PENCIL', 'TOY', 'JIGSAW', 'DOLL', 'BAG', 'PURSE',
+          'NECKLACE', 'UMBRELLA', 'HAIR CLIP', 'SIGN', 'CUSHION COVER', 'DOORMAT', 'CLOCK', 'FRAME']
+
+
+def catalogue(seed):
+    """(stock codes, descriptions, base unit prices, popularity weights) of the product range."""
+    rng = np.random.default_rng([seed, 0])
+    codes = np.array([str(c) for c in rng.choice(np.arange(20_000, 90_000), N_PRODUCTS, replace=False)],
+                     dtype=object)
+    adjectives = rng.integers(0, len(_ADJECTIVES), N_PRODUCTS)
+    nouns = rng.integers(0, len(_NOUNS), N_PRODUCTS)
+    descriptions = np.array([f"{_ADJECTIVES[a]} {_NOUNS[n]}" for a, n in zip(adjectives, nouns)], dtype=object)
+    prices = np.round(np.exp(rng.normal(0.8, 0.9, N_PRODUCTS)), 2).clip(0.06, 650.0)
+    popularity = 1.0 / np.arange(1, N_PRODUCTS + 1) ** 0.8     # Zipf-like: a few best sellers
+    popularity = rng.permutation(popularity)
+    return codes, descriptions, prices, popularity / popularity.sum()
+
+
+def customers(seed, scale):
+    """(CustomerIDs, countries) with the UK-heavy country mix; the range grows with the scale."""
+    rng = np.random.default_rng([seed, 1])
+    n = max(1, int(round(BASE_CUSTOMERS * scale)))
+    ids = 12_346 + np.arange(n, dtype=np.int64)
+    names = list(COUNTRY_WEIGHTS)
+    weights = np.array(list(COUNTRY_WEIGHTS.values()))
+    countries = np.array(names, dtype=object)[rng.choice(len(names), n, p=weights / weights.sum())]
+    return ids, countries
+
+
+def n_rows_for(scale):
+    return int(round(BASE_ROWS * scale))
+
+
+def iter_synthetic(scale=1.0, seed=42):
+    """Yield invoice-ordered raw batches (extract.py dtypes) totalling ``scale`` x the real sheet."""
+    codes, descriptions, prices, popularity = catalogue(seed)
+    cust_ids, cust_countries = customers(seed, scale)
+    n_invoices = max(1, n_rows_for(scale) // LINES_PER_INVOICE)
+    # Invoices spread evenly over the calendar, 08:00-18:00 on each day
+    seconds_per_invoice = N_DAYS * 10 * 3600 / n_invoices
+
+    for block, first in enumerate(range(0, n_invoices, INVOICES_PER_BLOCK)):
+        rng = np.random.default_rng([seed, 2, block])
+        n_inv = min(INVOICES_PER_BLOCK, n_invoices - first)
+        inv_index = first + np.arange(n_inv)
+        lines = rng.geometric(1.0 / LINES_PER_INVOICE, n_inv)
+        n = int(lines.sum())
+        row_inv = np.repeat(inv_index, lines)
+
+        busy = inv_index * seconds_per_invoice
+        day, second = np.divmod(busy, 10 * 3600)
+        inv_dates = START + pd.to_timedelta(day, unit="D") + pd.to_timedelta(second.astype(np.int64), unit="s")
+        inv_customer = rng.integers(0, len(cust_ids), n_inv)
+        inv_missing = rng.random(n_inv) < MISSING_CUSTOMER_RATE
+        inv_cancelled = rng.random(n_inv) < CANCEL_RATE
+        inv_no = np.char.add(np.where(inv_cancelled, "C", ""), (FIRST_INVOICE + inv_index).astype(str))
+
+        product = rng.choice(N_PRODUCTS, n, p=popularity)
+        # Mostly small packs, with a long tail of wholesale orders
+        quantity = rng.geometric(0.15, n) * np.where(rng.random(n) < WHOLESALE_RATE, rng.integers(10, 200, n), 1)
+        quantity = np.minimum(quantity, 80_000).astype(np.float64)
+        price = prices[product] * np.exp(rng.normal(0.0, 0.15, n))
+        missing_description = rng.random(n) < MISSING_DESCRIPTION_RATE
+        price = np.where(missing_description, 0.0, np.round(price, 2))
+
+        pos = np.searchsorted(inv_index, row_inv)
+        cancelled = inv_cancelled[pos]
+        customer_id = np.where(inv_missing[pos], np.nan, cust_ids[inv_customer[pos]].astype(np.float64))
+        df = pd.DataFrame({
+            'InvoiceNo': pd.array(inv_no[pos], dtype='string'),
+            'StockCode': pd.array(codes[product], dtype='string'),
+            'Description': pd.array(np.where(missing_description, None, descriptions[product]), dtype='string'),
+            'Quantity': np.where(cancelled, -quantity, quantity),
+            'InvoiceDate': inv_dates[pos],
+            'UnitPrice': price,
+            'CustomerID': customer_id,
+            'Country': pd.array(cust_countries[inv_customer[pos]], dtype='string'),
+        })
+        duplicated = np.flatnonzero(rng.random(n) < DUPLICATE_RATE)
+        if len(duplicated):
+            # Repeat the line right after the original, as in the real sheet
+            order = np.sort(np.concatenate([np.arange(n), duplicated]), kind="stable")
+            df = df.take(order).reset_index(drop=True)
+        yield df[COLUMNS]
+
+
+def write_parquet(out_path=CACHE_PATH, scale=1.0, seed=42):
+    """Write the synthetic rows in extract.py's Parquet cache format; returns the row count."""
+    if pq is None:
+        raise ImportError("pyarrow is required to write the synthetic Parquet file")
+    if os.path.dirname(out_path):
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    schema = _arrow_schema()
+    n_rows = 0
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for chunk in iter_synthetic(scale, seed):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            n_rows += len(chunk)
+    os.replace(tmp_path, out_path)
+    logging.info(f"Synthetic data written to {out_path} ({n_rows:,} rows, scale {scale:g}, seed {seed})")
+    return n_rows
+
+
+def write_xlsx(out_path, scale=1.0, seed=42):
+    """Write the synthetic rows as an OnlineRetail-style workbook (one sheet, so scale must fit)."""
+    if n_rows_for(scale) * 1.05 > EXCEL_MAX_ROWS:
+        raise ValueError(f"scale {scale:g} does not fit in one Excel sheet; use write_parquet")
+    df = pd.concat(iter_synthetic(scale, seed), ignore_index=True)
+    if os.path.dirname(out_path):
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    df.to_excel(out_path, index=False)
+    logging.info(f"Synthetic workbook written to {out_path} ({len(df):,} rows, scale {scale:g}, seed {seed})")
+    return len(df)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic OnlineRetail data")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiple of the real sheet's 541,909 rows")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="output path (default: the extract Parquet cache, or the raw xlsx with --xlsx)")
+    parser.add_argument("--xlsx", action="store_true", help="write an Excel workbook instead of Parquet")
+    args = parser.parse_args(argv)
+    if args.xlsx:
+        from data_warehousing.etl.extract import RAW_XLSX_PATH
+        write_xlsx(args.out or RAW_XLSX_PATH, args.scale, args.seed)
+    else:
+        write_parquet(args.out or CACHE_PATH, args.scale, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# data_warehousing/etl/test_keymap.py
+"""
+DimensionKeyMap: one surrogate key per natural key, new members in bulk.
+
+Run from the repository root:
+    python -m pytest data_warehousing/etl/test_keymap.py
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_warehousing.etl.keymap import DimensionKeyMap, DuplicateNaturalKeyError
+
+NATURAL_KEY = ['CustomerID', 'Country']
+
+
+def customers(*members):
+    return pd.DataFrame(members, columns=NATURAL_KEY)
+
+
+def test_resolve_assigns_one_key_per_member():
+    keymap = DimensionKeyMap('CustomerDim', NATURAL_KEY)
+    batch = customers((17850, 'United Kingdom'), (12583, 'France'), (17850, 'United Kingdom'))
+    keys, new = keymap.resolve(batch)
+    assert keys.tolist() == [1, 2, 1]
+    assert new.to_dict('records') == [
+        {'CustomerID': 17850, 'Country': 'United Kingdom', '_key': 1},
+        {'CustomerID': 12583, 'Country': 'France', '_key': 2},
+    ]
+
+    # The same customer in another country is another member; known ones are not re-added
+    keys, new = keymap.resolve(customers((12583, 'France'), (17850, 'EIRE')))
+    assert keys.tolist() == [2, 3]
+    assert new[NATURAL_KEY + ['_key']].values.tolist() == [[17850, 'EIRE', 3]]
+    assert len(keymap) == 3
+
+
+def test_resume_from_existing_rows_continues_the_key_sequence():
+    existing = customers((17850, 'United Kingdom'), (12583, 'France')).assign(CustomerKey=[4, 9])
+    keymap = DimensionKeyMap.from_frame('CustomerDim', existing, 'CustomerKey', NATURAL_KEY)
+    assert keymap.lookup(customers((12583, 'France'), (1, 'Spain'))).tolist() == [9, -1]
+    keys, _ = keymap.resolve(customers((1, 'Spain'), (17850, 'United Kingdom')))
+    assert keys.tolist() == [10, 4]
+
+
+def test_duplicate_natural_keys_are_rejected():
+    existing = customers((17850, 'United Kingdom'), (17850, 'United Kingdom')).assign(CustomerKey=[1, 2])
+    with pytest.raises(DuplicateNaturalKeyError, match="CustomerDim: 1 duplicate"):
+        DimensionKeyMap.from_frame('CustomerDim', existing, 'CustomerKey', NATURAL_KEY)
+
+
+def test_single_column_key_on_an_empty_map():
+    keymap = DimensionKeyMap('ProductDim', ['StockCode'])
+    frame = pd.DataFrame({'StockCode': ['85123A', '71053']})
+    assert np.array_equal(keymap.lookup(frame), [-1, -1])
+    keys, new = keymap.resolve(frame)
+    assert keys.tolist() == [1, 2] and new['_key'].tolist() == [1, 2]
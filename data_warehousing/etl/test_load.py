@@ -0,0 +1,67 @@
+# data_warehousing/etl/test_load.py
+"""
+Loaders: the bulk, basic and to_sql paths build the same warehouse.
+
+Run from the repository root:
+    python -m pytest data_warehousing/etl/test_load.py
+"""
+import os
+import sys
+import sqlite3
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_warehousing.etl import run_etl, transform
+from data_warehousing.etl.bulk_load import BulkLoader
+from data_warehousing.etl.load import ToSqlLoader, WarehouseLoader, reset_schema
+from data_warehousing.etl.partitions import list_partitions
+from data_warehousing.etl.synthetic import iter_synthetic
+
+SCALE = 0.005
+
+
+@pytest.fixture(scope="module")
+def chunks():
+    duplicates = transform.DuplicateTracker()
+    return [transform.enrich(transform.clean(chunk, duplicates)[0]) for chunk in iter_synthetic(SCALE)]
+
+
+def load(db_path, kind, chunks):
+    conn = sqlite3.connect(db_path)
+    reset_schema(conn)
+    loader = run_etl.make_loader(conn, kind, False, batch_size=500)
+    for chunk in chunks:
+        loader.load_chunk(chunk)
+    loader.finalize()
+    conn.commit()
+    return conn, loader
+
+
+def facts(conn):
+    return pd.read_sql_query("SELECT * FROM SalesFact ORDER BY InvoiceNo, StockCode, DateKey, Quantity", conn)
+
+
+@pytest.mark.parametrize("kind, loader_class", [("bulk", BulkLoader), ("to_sql", ToSqlLoader)])
+def test_loaders_match_the_basic_loader(tmp_path, chunks, kind, loader_class):
+    basic, _ = load(str(tmp_path / "basic.db"), "basic", chunks)
+    other, loader = load(str(tmp_path / f"{kind}.db"), kind, chunks)
+    try:
+        assert type(loader) is loader_class
+        assert loader.fact_rows == sum(len(chunk) for chunk in chunks) and loader.rows_per_second() > 0
+        assert list_partitions(other) == list_partitions(basic)
+        pd.testing.assert_frame_equal(facts(other), facts(basic), check_dtype=False)
+    finally:
+        basic.close()
+        other.close()
+
+
+def test_incremental_to_sql_runs_use_the_basic_loader(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "retail_dw.db"))
+    try:
+        reset_schema(conn)
+        assert type(run_etl.make_loader(conn, "to_sql", True, batch_size=500)) is WarehouseLoader
+    finally:
+        conn.close()
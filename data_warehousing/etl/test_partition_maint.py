@@ -0,0 +1,63 @@
+# data_warehousing/etl/test_partition_maint.py
+"""
+Partition maintenance: compaction keeps rows and indexes, and is all-or-nothing.
+
+Run from the repository root:
+    python -m pytest data_warehousing/etl/test_partition_maint.py
+"""
+import os
+import sys
+import shutil
+import sqlite3
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_warehousing.etl import partition_maint
+from data_warehousing.etl.partition_maint import compact_partitions
+from data_warehousing.etl.partitions import list_partitions, partition_table
+
+ADVISOR_INDEX = "idx_advisor_salesfact_stockcode_totalsales_201102"
+
+
+@pytest.fixture
+def conn(warehouse_path, tmp_path):
+    db_path = str(tmp_path / "retail_dw.db")
+    shutil.copyfile(warehouse_path, db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE INDEX {ADVISOR_INDEX} ON {partition_table(201102)} (StockCode, TotalSales)")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def snapshot(conn):
+    facts = conn.execute("SELECT * FROM SalesFact ORDER BY InvoiceNo, StockCode, DateKey, Quantity").fetchall()
+    indexes = conn.execute("SELECT name, tbl_name FROM sqlite_master WHERE type = 'index' ORDER BY name").fetchall()
+    tables = conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view') ORDER BY name").fetchall()
+    return facts, indexes, tables
+
+
+def test_compaction_keeps_rows_and_every_index(conn):
+    before = snapshot(conn)
+    assert compact_partitions(conn, [201101, 201102]) == [201101, 201102]
+    assert snapshot(conn) == before
+    date_keys = [row[0] for row in conn.execute(f"SELECT DateKey FROM {partition_table(201102)}")]
+    assert date_keys == sorted(date_keys)
+
+
+def test_failed_compaction_rolls_back(conn, monkeypatch):
+    before = snapshot(conn)
+    create_partition_indexes = partition_maint.create_partition_indexes
+
+    def failing(conn, month):
+        if month == 201102:
+            raise sqlite3.OperationalError("disk I/O error")
+        create_partition_indexes(conn, month)
+
+    monkeypatch.setattr(partition_maint, "create_partition_indexes", failing)
+    with pytest.raises(sqlite3.OperationalError):
+        compact_partitions(conn, [201101, 201102, 201103])
+    assert snapshot(conn) == before
+    assert len(list_partitions(conn)) == 13
@@ -0,0 +1,57 @@
+# data_warehousing/etl/test_partitions.py
+"""
+Month partitions of SalesFact: pruning, the view and the DateKey CHECKs.
+
+Run from the repository root:
+    python -m pytest data_warehousing/etl/test_partitions.py
+"""
+import os
+import sys
+import sqlite3
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_warehousing.etl.partitions import (
+    create_partition, drop_all, is_partitioned, list_partitions, month_bounds, partition_table, prune,
+    rebuild_view,
+)
+
+MONTHS = [201012, 201101, 201102, 201103]
+
+
+def test_prune_by_date_and_month_range():
+    assert prune(MONTHS) == MONTHS
+    assert prune(MONTHS, date_range=(20110115, 20110220)) == [201101, 201102]
+    assert prune(MONTHS, month_range=(201102, 201212)) == [201102, 201103]
+    assert prune(MONTHS, date_range=(20101201, 20110331), month_range=(201101, 201101)) == [201101]
+    assert prune(MONTHS, date_range=(20120101, 20121231)) == []
+    assert month_bounds(201102) == (20110201, 20110231)
+
+
+def fact_row(date_key):
+    return ('536365', '85123A', 1, date_key, 6, 2.55, 15.3, 'Electronics')
+
+
+def test_view_unions_the_partitions():
+    conn = sqlite3.connect(":memory:")
+    rebuild_view(conn)
+    assert is_partitioned(conn)
+    assert conn.execute("SELECT COUNT(*) FROM SalesFact").fetchone()[0] == 0
+
+    for month in (201101, 201012):
+        create_partition(conn, month)
+        conn.execute(f"INSERT INTO {partition_table(month)} VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     fact_row(month * 100 + 15))
+    rebuild_view(conn)
+    assert list_partitions(conn) == [201012, 201101]
+    assert [row[0] for row in conn.execute("SELECT DateKey FROM SalesFact ORDER BY DateKey")] == \
+        [20101215, 20110115]
+
+    # A row outside its partition's month is rejected
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO SalesFact_201101 VALUES (?, ?, ?, ?, ?, ?, ?, ?)", fact_row(20110201))
+
+    drop_all(conn)
+    assert list_partitions(conn) == [] and not is_partitioned(conn)
@@ -0,0 +1,80 @@
+# data_warehousing/etl/test_profiler.py
+"""
+Streaming profiler: sketches merged across batches against exact answers.
+
+Run from the repository root:
+    python -m pytest data_warehousing/etl/test_profiler.py
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_warehousing.etl.profiler import ColumnProfile, HeavyHitters, HyperLogLog, StreamingProfiler
+
+
+@pytest.mark.parametrize("cardinality", [1_000, 200_000])
+def test_distinct_count_within_the_error_bound(cardinality):
+    rng = np.random.default_rng(cardinality)
+    values = rng.permutation(cardinality)
+    sketch = HyperLogLog()
+    for batch in np.array_split(np.concatenate([values, values[:cardinality // 2]]), 7):
+        sketch.update(batch)                 # repeats across batches must not count twice
+    # 2**14 registers: ~0.8% standard error; 4 sigma
+    assert abs(sketch.count() - cardinality) <= 0.032 * cardinality
+
+
+def test_distinct_count_of_strings():
+    sketch = HyperLogLog()
+    codes = np.array([f"SKU{i:05d}" for i in range(5_000)], dtype=object)
+    sketch.update(codes[:3_000])
+    sketch.update(codes[2_000:])
+    assert abs(sketch.count() - 5_000) <= 0.032 * 5_000
+
+
+def test_heavy_hitter_above_n_over_k_is_kept():
+    rng = np.random.default_rng(0)
+    capacity, n = 10, 20_000
+    stream = rng.integers(100, 5_000, size=n)
+    heavy = {7: n // 8, 8: n // 9}           # both above n / capacity
+    stream[:sum(heavy.values())] = np.repeat(list(heavy), list(heavy.values()))
+    stream = rng.permutation(stream)
+
+    sketch = HeavyHitters(capacity=capacity)
+    for batch in np.array_split(stream, 13):
+        sketch.update(batch)
+    true = pd.Series(stream).value_counts()
+    assert set(sketch.top(2).index) == set(heavy)
+    for value, estimate in sketch.counts.items():
+        assert true[value] - sketch.error <= estimate <= true[value]
+    assert sketch.error <= n / (capacity + 1)
+
+
+def test_mean_and_variance_merge_like_numpy():
+    rng = np.random.default_rng(1)
+    first = rng.normal(1e6, 1.0, size=5_000)            # large offset, small spread
+    second = rng.normal(1e6 + 3.0, 2.0, size=1_234)
+    profile = ColumnProfile("x", np.float64)
+    profile.update(pd.Series(first))
+    profile.update(pd.Series(second))
+    both = np.concatenate([first, second])
+    assert profile.n == len(both)
+    assert profile.mean == pytest.approx(both.mean(), rel=1e-12)
+    assert profile.variance() == pytest.approx(both.var(ddof=1), rel=1e-9)
+
+
+def test_profiler_summaries_across_batches(tmp_path):
+    df = pd.DataFrame({'Quantity': [1, 2, None, 4, 4, 4], 'Country': ['UK', 'UK', 'France', None, 'UK', 'EIRE']})
+    profiler = StreamingProfiler()
+    profiler.update(df.iloc[:3])
+    profiler.update(df.iloc[3:])
+    quantity, country = profiler.summaries()
+    assert (quantity['rows'], quantity['nulls'], quantity['min'], quantity['max']) == (6, 1, 1, 4)
+    assert quantity['mean'] == pytest.approx(3.0) and quantity['distinct'] == 3
+    assert country['top'][0] == ('UK', 3) and country['mean'] is None and country['distinct'] == 3
+    profiler.write_html(str(tmp_path / "summary.html"))
+    assert "Quantity" in (tmp_path / "summary.html").read_text(encoding="utf-8")
@@ -0,0 +1,97 @@
+# data_warehousing/etl/test_run_etl.py
+"""
+Incremental ETL: watermark handling across repeated and late-arriving loads.
+
+Run from the repository root:
+    python -m pytest data_warehousing/etl/test_run_etl.py
+"""
+import os
+import sys
+import sqlite3
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from instrumentation import StageRecorder
+from data_warehousing.etl import run_etl
+from data_warehousing.etl.extract import after_watermark
+from data_warehousing.etl.load import max_watermark
+
+LAST_SECOND = pd.Timestamp("2011-01-31 17:05:00")
+
+
+def raw_rows(invoices):
+    """Raw sheet rows, one line per (InvoiceNo, InvoiceDate, CustomerID)."""
+    return pd.DataFrame({
+        'InvoiceNo': [no for no, _, _ in invoices],
+        'StockCode': ['85123A'] * len(invoices),
+        'Description': ['WHITE HANGING HEART T-LIGHT HOLDER'] * len(invoices),
+        'Quantity': [-2 if no.startswith('C') else 6 for no, _, _ in invoices],
+        'InvoiceDate': [date for _, date, _ in invoices],
+        'UnitPrice': [2.55] * len(invoices),
+        'CustomerID': [customer for _, _, customer in invoices],
+        'Country': ['United Kingdom'] * len(invoices),
+    })
+
+
+FIRST_LOAD = [
+    ('536365', pd.Timestamp("2011-01-04 08:26:00"), 17850),
+    ('536366', pd.Timestamp("2011-01-20 08:28:00"), 17850),
+    ('536380', LAST_SECOND, 13047),
+    ('C536381', LAST_SECOND, 13047),      # cancellation: the string max of the last second
+]
+LATE_ROWS = [
+    ('536382', LAST_SECOND, 12583),       # same second, next invoice number
+    ('536383', pd.Timestamp("2011-02-01 09:00:00"), 12583),
+]
+
+
+def test_watermark_orders_invoices_numerically():
+    df = raw_rows(FIRST_LOAD)
+    assert max_watermark(df) == (LAST_SECOND, 'C536381')
+    late = raw_rows(LATE_ROWS)
+    assert after_watermark(late, max_watermark(df))['InvoiceNo'].tolist() == ['536382', '536383']
+    assert after_watermark(df, max_watermark(df)).empty
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run the ETL's relative output paths inside tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data_warehousing/etl")
+    return tmp_path
+
+
+def run_incremental(xlsx_path, db_path, tmp_path):
+    recorder = StageRecorder("test_run_etl", path=str(tmp_path / "stage_metrics.jsonl"))
+    run_etl.run(incremental=True, use_cache=False, xlsx_path=str(xlsx_path), db_path=str(db_path),
+                recorder=recorder)
+
+
+def fact_invoices(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return sorted(row[0] for row in conn.execute("SELECT InvoiceNo FROM SalesFact"))
+    finally:
+        conn.close()
+
+
+def test_incremental_runs_load_late_rows_of_the_last_second(workdir):
+    xlsx_path, db_path = workdir / "OnlineRetail.xlsx", workdir / "retail_dw.db"
+    raw_rows(FIRST_LOAD).to_excel(xlsx_path, index=False)
+    run_incremental(xlsx_path, db_path, workdir)       # no watermark yet: full load
+    run_incremental(xlsx_path, db_path, workdir)       # nothing new
+    assert fact_invoices(db_path) == ['536365', '536366', '536380']
+
+    raw_rows(FIRST_LOAD + LATE_ROWS).to_excel(xlsx_path, index=False)
+    run_incremental(xlsx_path, db_path, workdir)
+    assert fact_invoices(db_path) == ['536365', '536366', '536380', '536382', '536383']
+
+    conn = sqlite3.connect(db_path)
+    try:
+        modes = [row[0] for row in conn.execute("SELECT Mode FROM EtlLoadLog ORDER BY LoadId")]
+    finally:
+        conn.close()
+    assert modes == ['full', 'incremental', 'incremental']
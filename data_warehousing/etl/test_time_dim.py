@@ -0,0 +1,51 @@
+# data_warehousing/etl/test_time_dim.py
+"""
+Day-grain TimeDim: DateKeys and the incremental calendar range.
+
+Run from the repository root:
+    python -m pytest data_warehousing/etl/test_time_dim.py
+"""
+import os
+import sys
+import sqlite3
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_warehousing.etl.load import ensure_schema
+from data_warehousing.etl.time_dim import CalendarDim, calendar_frame, date_key, key_to_date
+
+
+def test_date_key_round_trip():
+    dates = pd.Series(pd.to_datetime(["2010-12-01 08:26", "2011-02-28 23:59", "2011-12-09 12:50"]))
+    keys = date_key(dates)
+    assert keys.tolist() == [20101201, 20110228, 20111209]
+    assert [key_to_date(k) for k in keys] == list(dates.dt.normalize())
+
+
+def test_calendar_frame_has_one_row_per_day():
+    cal = calendar_frame("2011-12-30 10:00", "2012-01-02")
+    assert cal['DateKey'].tolist() == [20111230, 20111231, 20120101, 20120102]
+    assert cal[['Year', 'Quarter', 'Month', 'Day']].values.tolist()[1:3] == [[2011, 4, 12, 31], [2012, 1, 1, 1]]
+    assert cal['Weekday'].tolist() == [4, 5, 6, 0]
+    assert cal['WeekdayName'].tolist()[-1] == 'Monday'
+
+
+def time_dim_keys(conn):
+    return [row[0] for row in conn.execute("SELECT DateKey FROM TimeDim ORDER BY DateKey")]
+
+
+def test_cover_fills_only_the_missing_days():
+    conn = sqlite3.connect(":memory:")
+    ensure_schema(conn)
+    calendar = CalendarDim(conn)
+    keys = calendar.cover(pd.Series(pd.to_datetime(["2011-01-05 09:00", "2011-01-03 17:30"])))
+    assert keys.tolist() == [20110105, 20110103]
+    assert time_dim_keys(conn) == [20110103, 20110104, 20110105]
+
+    # A resumed calendar extends the existing range on both sides, without gaps
+    resumed = CalendarDim(conn, resume=True)
+    assert (resumed.first, resumed.last) == (pd.Timestamp("2011-01-03"), pd.Timestamp("2011-01-05"))
+    resumed.cover(pd.Series(pd.to_datetime(["2011-01-08", "2011-01-01"])))
+    assert time_dim_keys(conn) == [20110101 + day for day in range(8)]
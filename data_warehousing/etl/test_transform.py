@@ -0,0 +1,82 @@
+# data_warehousing/etl/test_transform.py
+"""
+transform.clean / enrich: rejection reasons, cross-batch duplicates and categories.
+
+Run from the repository root:
+    python -m pytest data_warehousing/etl/test_transform.py
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_warehousing.etl import transform
+from data_warehousing.etl.extract import COLUMNS, _coerce_types
+from data_warehousing.etl.synthetic import iter_synthetic
+
+GOOD = dict(InvoiceNo='536365', StockCode='85123A', Description='WHITE HANGING HEART T-LIGHT HOLDER',
+            Quantity=6, InvoiceDate='2010-12-01 08:26', UnitPrice=2.55, CustomerID=17850,
+            Country='United Kingdom')
+
+
+def batch(*rows):
+    """A raw batch with extract.py dtypes."""
+    return _coerce_types(pd.DataFrame(list(rows), columns=COLUMNS))
+
+
+def with_(**changes):
+    return {**GOOD, **changes}
+
+
+def test_each_rule_and_its_priority():
+    df = batch(
+        GOOD,
+        with_(CustomerID=None, InvoiceNo='C536366'),     # missing customer wins over cancelled
+        with_(StockCode=None),
+        with_(InvoiceNo='C536367', Quantity=-6),        # cancelled wins over the negative quantity
+        with_(Quantity=0),
+        with_(UnitPrice=0.0),
+        GOOD,                                           # exact repeat of the first row
+    )
+    kept, rejected = transform.clean(df, transform.DuplicateTracker())
+    assert kept.index.tolist() == [0]
+    assert rejected[transform.REASON_COLUMN].tolist() == [
+        'MISSING_CUSTOMER', 'MISSING_FIELD', 'CANCELLED', 'NON_POSITIVE_QTY', 'NON_POSITIVE_PRICE', 'DUPLICATE']
+    assert rejected.drop(columns=transform.REASON_COLUMN).columns.tolist() == df.columns.tolist()
+
+    # Without a tracker, repeats are kept
+    kept, _ = transform.clean(df)
+    assert kept.index.tolist() == [0, 6]
+
+
+def test_duplicates_are_found_across_batches():
+    raw = pd.concat(list(iter_synthetic(0.005)), ignore_index=True)
+    tracker = transform.DuplicateTracker()
+    marked = np.concatenate([tracker.mark(raw.iloc[start:start + 97]) for start in range(0, len(raw), 97)])
+    expected = raw.duplicated().to_numpy()
+    assert expected.any()
+    assert np.array_equal(marked, expected)
+
+
+def test_enrich_adds_total_sales_and_category():
+    kept, _ = transform.clean(batch(
+        GOOD,
+        with_(Description='JUMBO BAG RED RETROSPOT', Quantity=10, UnitPrice=1.95),
+        with_(Description=None, Quantity=2),
+    ))
+    # A missing description is not critical; it falls into 'Other'
+    enriched = transform.enrich(kept)
+    assert enriched['Category'].tolist() == ['Lighting', 'Accessories', 'Other']
+    assert enriched['TotalSales'].tolist() == pytest.approx([15.3, 19.5, 5.1])
+    assert enriched['CustomerID'].dtype == np.int64
+
+
+def test_categories_keep_lighting_apart_from_electronics():
+    descriptions = pd.Series(['WHITE HANGING HEART T-LIGHT HOLDER', 'ALARM CLOCK BAKELIKE RED',
+                              'LED TEA LIGHTS', 'RETRO RADIO', 'CHILDRENS SLEDGE', 'SET OF 4 LED NIGHT CANDLES'])
+    assert transform.categorize(descriptions).tolist() == \
+        ['Lighting', 'Electronics', 'Lighting', 'Electronics', 'Other', 'Lighting']
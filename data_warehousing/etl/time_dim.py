@@ -0,0 +1,72 @@
+# data_warehousing/etl/time_dim.py
+"""
+Day-grain calendar dimension.
+
+TimeDim holds one row per calendar day over the loaded date range, keyed by
+the integer YYYYMMDD DateKey.  Fact rows compute that key directly from
+InvoiceDate, so no lookup is needed at load time and time filters can be
+written as integer ranges on SalesFact.DateKey (e.g. BETWEEN 20111001 AND 20111231).
+"""
+import pandas as pd
+
+TIME_DIM_COLUMNS = ['DateKey', 'Date', 'Year', 'Quarter', 'Month', 'Day', 'Weekday', 'WeekdayName']
+
+
+def date_key(values):
+    """Integer YYYYMMDD keys for a Series/Index of datetimes (vectorised)."""
+    ts = pd.DatetimeIndex(values)
+    return (ts.year * 10000 + ts.month * 100 + ts.day).to_numpy(dtype='int64')
+
+
+def key_to_date(key):
+    """Inverse of ``date_key`` for a single integer key."""
+    return pd.Timestamp(year=key // 10000, month=key // 100 % 100, day=key % 100)
+
+
+def calendar_frame(start, end):
+    """One TimeDim row per day from ``start`` to ``end`` inclusive (Weekday: 0 = Monday)."""
+    days = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq='D')
+    return pd.DataFrame({
+        'DateKey': date_key(days),
+        'Date': days.strftime('%Y-%m-%d'),
+        'Year': days.year,
+        'Quarter': days.quarter,
+        'Month': days.month,
+        'Day': days.day,
+        'Weekday': days.weekday,
+        'WeekdayName': days.day_name(),
+    })[TIME_DIM_COLUMNS]
+
+
+class CalendarDim:
+    """Tracks the day range already present in TimeDim and inserts only the missing days."""
+
+    def __init__(self, conn, resume=False):
+        self.conn = conn
+        self.first = self.last = None
+        if resume:
+            lo, hi = conn.execute("SELECT MIN(DateKey), MAX(DateKey) FROM TimeDim").fetchone()
+            if lo is not None:
+                self.first, self.last = key_to_date(lo), key_to_date(hi)
+
+    def _insert(self, start, end):
+        cal = calendar_frame(start, end)
+        self.conn.executemany(
+            f"INSERT OR IGNORE INTO TimeDim ({', '.join(TIME_DIM_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(TIME_DIM_COLUMNS))})",
+            zip(*(cal[col].tolist() for col in TIME_DIM_COLUMNS)))
+
+    def cover(self, invoice_dates):
+        """Extend TimeDim so it spans every day in ``invoice_dates``; returns their DateKeys."""
+        lo, hi = invoice_dates.min().normalize(), invoice_dates.max().normalize()
+        if self.first is None:
+            self._insert(lo, hi)
+            self.first, self.last = lo, hi
+        else:
+            if lo < self.first:
+                self._insert(lo, self.first - pd.Timedelta(days=1))
+                self.first = lo
+            if hi > self.last:
+                self._insert(self.last + pd.Timedelta(days=1), hi)
+                self.last = hi
+        return date_key(invoice_dates)
@@ -0,0 +1,109 @@
+# data_warehousing/etl/transform.py
+"""
+Cleaning and enrichment applied to each extracted batch.
+
+Cleaning evaluates every rejection rule as a boolean mask over the batch's
+columns and combines them into one reason code per row (0 = keep), so a
+batch is filtered with a single row selection instead of one copy per rule.
+Rejected rows are returned with their reason for the quarantine file.
+"""
+import numpy as np
+import pandas as pd
+
+CRITICAL_COLUMNS = ['InvoiceNo', 'StockCode', 'Quantity', 'InvoiceDate', 'UnitPrice', 'CustomerID', 'Country']
+
+# Rejection reasons in priority order: a row breaking several rules gets the first one
+REJECT_REASONS = ['MISSING_CUSTOMER', 'MISSING_FIELD', 'CANCELLED',
+                  'NON_POSITIVE_QTY', 'NON_POSITIVE_PRICE', 'DUPLICATE']
+REASON_COLUMN = 'RejectReason'
+
+# Synthetic product categories derived from the item description (first match wins)
+CATEGORY_KEYWORDS = {
+    'Lighting': r'LIGHT|LANTERN|CANDLE|T-LIGHT|LAMP',
+    'Electronics': r'CLOCK|RADIO|BATTERY|BATTERIES|TORCH|CALCULATOR|DOORBELL|\bLED\b',
+    'Kitchenware': r'MUG|CUP|PLATE|BOWL|KITCHEN|CAKE|TEA|JAR|BAKING|LUNCH BOX|CUTLERY',
+    'Stationery': r'CARD|PAPER|PENCIL|PEN |NOTEBOOK|WRAP|STICKER|ENVELOPE|CALENDAR',
+    'Toys': r'TOY|GAME|DOLL|PUZZLE|SPACEBOY|JIGSAW',
+    'Accessories': r'BAG|PURSE|NECKLACE|BRACELET|EARRINGS|HAIR|UMBRELLA|JEWEL',
+}
+
+
+class DuplicateTracker:
+    """
+    Hashes of every raw row seen so far, to reject exact repeats across batches.
+
+    Hashes are kept as sorted, disjoint runs whose sizes at least double from
+    newest to oldest (merged like a binary counter), so each batch costs a few
+    binary searches and the total merge work stays O(n log n).
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def mark(self, df):
+        """True for rows identical to an earlier row in this batch or in a previous one."""
+        hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        repeated = pd.Series(hashes).duplicated().to_numpy()
+        for run in self.runs:
+            pos = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            repeated = repeated | (run[pos] == hashes)
+        new = np.sort(hashes[~repeated])
+        while self.runs and len(self.runs[-1]) <= 2 * len(new):
+            new = np.sort(np.concatenate([self.runs.pop(), new]))
+        if len(new):
+            self.runs.append(new)
+        return repeated
+
+
+def reject_codes(df, duplicates=None):
+    """Per-row index into REJECT_REASONS plus one (0 = row is kept), all rules in one pass."""
+    missing = np.zeros(len(df), dtype=bool)
+    for col in CRITICAL_COLUMNS:
+        if col != 'CustomerID':
+            missing |= df[col].isna().to_numpy()
+    quantity = df['Quantity'].to_numpy(dtype=np.float64, na_value=np.nan)
+    price = df['UnitPrice'].to_numpy(dtype=np.float64, na_value=np.nan)
+    rules = [
+        df['CustomerID'].isna().to_numpy(),
+        missing,
+        df['InvoiceNo'].str.startswith('C').fillna(False).to_numpy(dtype=bool),
+        ~(quantity > 0),
+        ~(price > 0),
+        duplicates.mark(df) if duplicates is not None else np.zeros(len(df), dtype=bool),
+    ]
+    return np.select(rules, np.arange(1, len(rules) + 1, dtype=np.int8), default=0).astype(np.int8)
+
+
+def clean(df, duplicates=None):
+    """
+    Split a raw batch into (kept rows, rejected rows with a RejectReason column).
+
+    Rules: missing CustomerID, any other critical field missing, cancelled
+    ("C") invoice, non-positive Quantity, non-positive UnitPrice and -- with a
+    ``DuplicateTracker`` -- exact duplicate rows.
+    """
+    codes = reject_codes(df, duplicates)
+    keep = codes == 0
+    # take() returns fresh frames, so enrich() can add columns without another copy
+    kept = df.take(np.flatnonzero(keep))
+    rejected = df.take(np.flatnonzero(~keep))
+    rejected.insert(0, REASON_COLUMN, np.array(REJECT_REASONS, dtype=object)[codes[~keep] - 1])
+    return kept, rejected
+
+
+def categorize(descriptions):
+    """Map item descriptions to a synthetic category, defaulting to 'Other'."""
+    text = descriptions.fillna('').str.upper()
+    conditions = [text.str.contains(pattern, regex=True).to_numpy(dtype=bool)
+                  for pattern in CATEGORY_KEYWORDS.values()]
+    return pd.Series(np.select(conditions, list(CATEGORY_KEYWORDS), default='Other'),
+                     index=descriptions.index, dtype='string')
+
+
+def enrich(df):
+    """Add the derived columns used by the warehouse (TotalSales, Category), in place on a cleaned batch."""
+    df['Quantity'] = df['Quantity'].astype('int64')
+    df['CustomerID'] = df['CustomerID'].astype('int64')
+    df['TotalSales'] = df['Quantity'] * df['UnitPrice']
+    df['Category'] = categorize(df['Description'])
+    return df
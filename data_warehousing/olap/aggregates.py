@@ -0,0 +1,394 @@
+# data_warehousing/olap/aggregates.py
+"""
+Materialised summary tables over SalesFact and a router that answers OLAP
+queries from the smallest one that can.
+
+The ETL calls ``refresh_aggregates`` after every load.  The base cube is
+Country x Category x Year x Quarter x Month; the smaller roll-ups are built
+from the cube, not from the fact table.  ``QueryRouter.query`` takes the
+dimensions to group by and the equality/IN filters, picks the smallest
+aggregate containing all of them, and falls back to SalesFact (joined to its
+dimensions) only when no aggregate does, e.g. for day-level DateKey ranges
+or the customer Segment (CustomerSegment, written by the segmentation job).
+Month ranges (YYYYMM bounds) are answered from any aggregate with Year and Month.
+SalesFact is month-partitioned (etl/partitions.py): the cube is built one
+partition at a time, and fact-table fallbacks read only the partitions the
+DateKey / month range can touch, aggregating each one before combining them.
+``QueryRouter.query_grains`` answers several grains (GROUPING SETS-style)
+with one read at their common grain and rolls each one up in memory.
+``partition_sql`` gives hand-written star-join SQL over the SalesFact view
+(olap_queries.sql) the same per-partition treatment.
+"""
+import re
+import logging
+import pandas as pd
+
+from data_warehousing.etl.partitions import (
+    EMPTY_FACT_SELECT, FACT_VIEW, is_partitioned, list_partitions, partition_table, prune,
+)
+
+DIMENSIONS = ['Country', 'Category', 'Year', 'Quarter', 'Month']
+# Dimensions only the fact table can answer (not part of any aggregate)
+FACT_ONLY_DIMENSIONS = ['Segment']
+MEASURES = ['TotalSales', 'Quantity', 'FactRows']
+
+# Ordered smallest grain first; the router takes the first table that covers a query.
+AGGREGATES = {
+    'AggSales_Country': ['Country'],
+    'AggSales_Month': ['Year', 'Quarter', 'Month'],
+    'AggSales_CountryCategory': ['Country', 'Category'],
+    'AggSales_CountryMonth': ['Country', 'Year', 'Quarter', 'Month'],
+    'AggSales_CategoryMonth': ['Category', 'Year', 'Quarter', 'Month'],
+    'AggSales_Cube': DIMENSIONS,
+}
+BASE_CUBE = 'AggSales_Cube'
+
+# Column expressions when a query has to go to the fact table
+FACT_DIM_EXPR = {
+    'Country': 'c.Country',
+    'Category': 'f.Category',
+    'Year': 't.Year',
+    'Quarter': 't.Quarter',
+    'Month': 't.Month',
+    'Segment': 's.Segment',      # NULL for customers not yet segmented
+}
+FACT_MEASURE_EXPR = {
+    'TotalSales': 'SUM(f.TotalSales)',
+    'Quantity': 'SUM(f.Quantity)',
+    'FactRows': 'COUNT(*)',
+}
+
+_CUBE_SELECT = """
+SELECT c.Country, f.Category, t.Year, t.Quarter, t.Month,
+       SUM(f.TotalSales) AS TotalSales, SUM(f.Quantity) AS Quantity, COUNT(*) AS FactRows
+FROM {fact} f
+JOIN CustomerDim c ON f.CustomerKey = c.CustomerKey
+JOIN TimeDim t ON f.DateKey = t.DateKey
+{where}
+GROUP BY c.Country, f.Category, t.Year, t.Quarter, t.Month
+"""
+
+
+def fact_tables(conn, date_range=None, month_range=None):
+    """Tables holding the fact rows in range: the pruned partitions, or SalesFact if unpartitioned."""
+    if not is_partitioned(conn):
+        return [FACT_VIEW]
+    return [partition_table(m) for m in prune(list_partitions(conn), date_range, month_range)]
+
+
+# ------------------------
+# Raw SQL over the SalesFact view
+# ------------------------
+_VIEW_QUERY = re.compile(
+    r"^\s*SELECT\s+(?P<select>.+?)\s+FROM\s+SalesFact(?:\s+(?:AS\s+)?"
+    r"(?!(?:JOIN|LEFT|INNER|CROSS|WHERE|GROUP|ORDER|LIMIT)\b)(?P<alias>\w+))?\b"
+    r"(?P<body>.*?)(?:\s+ORDER\s+BY\s+(?P<order>.+?))?(?:\s+LIMIT\s+(?P<limit>\d+))?\s*;?\s*$",
+    re.IGNORECASE | re.DOTALL)
+_AGGREGATE = re.compile(r"^(SUM|TOTAL|COUNT|MIN|MAX)\s*\((?!\s*DISTINCT\b)", re.IGNORECASE)
+_ANY_AGGREGATE = re.compile(r"\b(?:SUM|TOTAL|COUNT|MIN|MAX|AVG|GROUP_CONCAT)\s*\(", re.IGNORECASE)
+# How per-partition partial results of each aggregate are combined
+_COMBINE = {'SUM': 'SUM', 'TOTAL': 'SUM', 'COUNT': 'SUM', 'MIN': 'MIN', 'MAX': 'MAX'}
+
+
+def _split_top_level(text):
+    """Split on commas outside parentheses."""
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        depth += (ch == '(') - (ch == ')')
+        if ch == ',' and depth == 0:
+            parts.append(text[start:i].strip())
+            start = i + 1
+    parts.append(text[start:].strip())
+    return parts
+
+
+def _normalize(expr):
+    return re.sub(r"\s+", " ", expr).strip().lower()
+
+
+def _single_aggregate(expr):
+    """
+    The function name if ``expr`` is exactly one combinable aggregate call.
+
+    ``SUM(a)`` qualifies; ``SUM(a) / COUNT(*)`` and ``MAX(a) - MIN(a)`` do
+    not: the call's closing parenthesis must end the expression.
+    """
+    m = _AGGREGATE.match(expr)
+    if m is None:
+        return None
+    depth = 0
+    for i in range(m.end() - 1, len(expr)):
+        depth += (expr[i] == '(') - (expr[i] == ')')
+        if depth == 0:
+            return m.group(1).upper() if i == len(expr) - 1 else None
+    return None
+
+
+def partition_sql(conn, sql):
+    """
+    Rewrite a star-join aggregate over the SalesFact view to read the partitions directly.
+
+    SQLite materialises the whole UNION ALL view for an aggregate query, so
+    hand-written SQL such as olap_queries.sql would scan every month
+    partition without using their indexes.  A statement of the form
+    ``SELECT <dims>, SUM/COUNT/MIN/MAX(...) [AS x] FROM SalesFact f <joins>
+    [WHERE ...] [GROUP BY ...] [ORDER BY ...] [LIMIT n]`` instead becomes one
+    branch per partition -- pruned by ``f.DateKey BETWEEN <lo> AND <hi>``
+    literals -- aggregated separately and combined, as in QueryRouter.build_sql.
+
+    Returns (sql, branches): the statement to run and the single-table
+    statement of each partition (for EXPLAIN).  The statement must aggregate,
+    every plain select column must be a GROUP BY key (and every key selected),
+    and every other item exactly one SUM/TOTAL/COUNT/MIN/MAX call.  Anything
+    else (detail SELECTs, expressions over aggregates such as
+    ``SUM(a) / COUNT(*)``, HAVING, DISTINCT or AVG aggregates, subqueries) is
+    returned unchanged.
+    """
+    m = _VIEW_QUERY.match(sql)
+    body = m and m.group('body')
+    if (m is None or re.search(r"\bHAVING\b|\bSalesFact\b(?!\.)|\(\s*SELECT\b", body, re.IGNORECASE)
+            or re.search(r"\(\s*SELECT\b", m.group('select'), re.IGNORECASE)):
+        logging.debug(f"partition_sql: not a decomposable SalesFact aggregate, left as is: {sql}")
+        return sql, [sql]
+    alias = m.group('alias') or FACT_VIEW
+
+    group = re.search(r"\s+GROUP\s+BY\s+(?P<keys>.+)$", body, re.IGNORECASE | re.DOTALL)
+    group_keys = {_normalize(key) for key in _split_top_level(group.group('keys'))} if group else set()
+
+    keys, outer, exprs = [], [], {}
+    for item in _split_top_level(m.group('select')):
+        named = re.match(r"^(?P<expr>.+?)\s+AS\s+(?P<name>\w+)$", item, re.IGNORECASE | re.DOTALL)
+        expr, name = (named.group('expr'), named.group('name')) if named else (item, item.split('.')[-1])
+        aggregate = _single_aggregate(expr)
+        if not re.fullmatch(r"\w+", name) or (not aggregate and _ANY_AGGREGATE.search(expr)):
+            logging.debug(f"partition_sql: cannot combine '{item}' across partitions, left as is: {sql}")
+            return sql, [sql]
+        if aggregate:
+            outer.append(f"{_COMBINE[aggregate]}({name}) AS {name}")
+        else:
+            keys.append(name)
+            outer.append(name)
+        exprs[_normalize(expr)] = exprs[name.lower()] = name
+
+    # Re-grouping the partial rows is only sound when the statement aggregates and
+    # its plain columns are exactly its GROUP BY keys: a detail SELECT would lose
+    # duplicate rows, and a key that is not selected would merge groups
+    key_forms = {name: {e for e, n in exprs.items() if n == name} for name in keys}
+    if ((group is None and len(keys) == len(outer))
+            or any(not forms & group_keys for forms in key_forms.values())
+            or not group_keys <= set().union(*key_forms.values())):
+        logging.debug(f"partition_sql: selected columns are not the GROUP BY keys, left as is: {sql}")
+        return sql, [sql]
+
+    order = []
+    for term in _split_top_level(m.group('order')) if m.group('order') else []:
+        term_m = re.match(r"^(?P<expr>.+?)(?P<dir>\s+(?:ASC|DESC))?$", term, re.IGNORECASE | re.DOTALL)
+        name = exprs.get(_normalize(term_m.group('expr')))
+        if name is None:
+            logging.debug(f"partition_sql: ORDER BY term '{term}' is not a selected column, left as is: {sql}")
+            return sql, [sql]
+        order.append(name + (term_m.group('dir') or ""))
+    suffix = (" ORDER BY " + ", ".join(order) if order else "") + \
+        (f" LIMIT {m.group('limit')}" if m.group('limit') else "")
+
+    date_range = None
+    bounds = re.search(rf"(?:\b{alias}\.|(?<![\w.]))DateKey\s+BETWEEN\s+(\d+)\s+AND\s+(\d+)", body, re.IGNORECASE)
+    if bounds:
+        date_range = (int(bounds.group(1)), int(bounds.group(2)))
+    # Nothing in range: an empty stand-in, not a scan of the whole view
+    sources = fact_tables(conn, date_range) or [f"({EMPTY_FACT_SELECT})"]
+    branches = [f"SELECT {m.group('select')} FROM {source} {alias}{body}" for source in sources]
+    if len(branches) == 1:
+        return branches[0] + suffix, branches
+    combined = f"SELECT {', '.join(outer)} FROM ({' UNION ALL '.join(branches)})"
+    if keys:
+        combined += " GROUP BY " + ", ".join(keys)
+    return combined + suffix, branches
+
+
+def _rollup_sql(table, dims):
+    cols = ', '.join(dims)
+    return (f"CREATE TABLE {table} AS "
+            f"SELECT {cols}, SUM(TotalSales) AS TotalSales, SUM(Quantity) AS Quantity, "
+            f"SUM(FactRows) AS FactRows FROM {BASE_CUBE} GROUP BY {cols}")
+
+
+def refresh_aggregates(conn, since_datekey=None):
+    """
+    Rebuild the summary tables.
+
+    With ``since_datekey`` (incremental loads) only the cube months from that
+    day's month onwards are recomputed, from those months' partitions; the
+    roll-ups are then rebuilt from the cube, which is a few thousand rows at most.
+    Partitions never share a month, so each one's cube rows are final.
+    """
+    cube_exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (BASE_CUBE,)).fetchone()
+    if since_datekey is None or not cube_exists:
+        conn.execute(f"DROP TABLE IF EXISTS {BASE_CUBE}")
+        conn.execute(f"CREATE TABLE {BASE_CUBE} AS " + _CUBE_SELECT.format(fact=FACT_VIEW, where="WHERE 0"))
+        sources = fact_tables(conn)
+        month_start = 0
+    else:
+        month_start = since_datekey // 100 * 100 + 1
+        conn.execute(f"DELETE FROM {BASE_CUBE} WHERE Year * 10000 + Month * 100 + 1 >= ?", (month_start,))
+        sources = fact_tables(conn, date_range=(month_start, float("inf")))
+    for fact in sources:
+        conn.execute(f"INSERT INTO {BASE_CUBE} " + _CUBE_SELECT.format(fact=fact, where="WHERE f.DateKey >= ?"),
+                     (month_start,))
+
+    for table, dims in AGGREGATES.items():
+        if table == BASE_CUBE:
+            continue
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(_rollup_sql(table, dims))
+    conn.commit()
+    sizes = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in AGGREGATES}
+    logging.info("Aggregate tables refreshed: " + ", ".join(f"{t} {n}" for t, n in sizes.items()))
+    return sizes
+
+
+def rollup(frame, group_by, measures=('TotalSales',)):
+    """Roll a finer-grained result up to ``group_by`` in memory (sorted by the group keys)."""
+    measures = list(measures)
+    if not group_by:
+        return frame[measures].sum().to_frame().T
+    return frame.groupby(list(group_by), sort=True, as_index=False)[measures].sum()
+
+
+class QueryRouter:
+    """
+    Answers roll-up / drill-down / slice queries from the smallest suitable aggregate.
+
+    With a ``cache`` (query_cache.QueryCache) results are served from disk
+    until the ETL records a new load.
+    """
+
+    def __init__(self, conn, cache=None):
+        self.conn = conn
+        self.cache = cache
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.available = {t: dims for t, dims in AGGREGATES.items() if t in existing}
+        if not self.available:
+            logging.info("No aggregate tables in the warehouse; all queries go to SalesFact")
+
+    def choose_table(self, group_by, filters=None, date_range=None, month_range=None):
+        """Aggregate table that can answer the query, or None for the fact table."""
+        if date_range is not None:
+            return None
+        needed = set(group_by) | set(filters or {})
+        if month_range is not None:
+            needed |= {'Year', 'Month'}
+        for table, dims in self.available.items():
+            if needed <= set(dims):
+                return table
+        return None
+
+    def build_sql(self, group_by, measures=('TotalSales',), filters=None, date_range=None,
+                  order_by=None, having_min=None, month_range=None):
+        """SQL text and parameters for a query, routed to an aggregate when possible."""
+        group_by = list(group_by)
+        unknown = (set(group_by) | set(filters or {})) - set(DIMENSIONS + FACT_ONLY_DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown dimension(s): {sorted(unknown)}")
+        table = self.choose_table(group_by, filters, date_range, month_range)
+
+        if table is not None:
+            dim_expr = {d: d for d in DIMENSIONS}
+            measure_expr = {m: f"SUM({m})" for m in MEASURES}
+            sources = [table]
+            joins = ""
+        else:
+            dim_expr = FACT_DIM_EXPR
+            measure_expr = FACT_MEASURE_EXPR
+            used = set(group_by) | set(filters or {})
+            if month_range is not None:
+                used |= {'Year', 'Month'}
+            # Partition pruning: only the months the time predicate can touch
+            # Nothing in range: an empty stand-in, not a scan of the whole view
+            sources = ([f"{fact} f" for fact in fact_tables(self.conn, date_range, month_range)]
+                       or [f"({EMPTY_FACT_SELECT}) f"])
+            joins = ""
+            if 'Country' in used:
+                joins += " JOIN CustomerDim c ON f.CustomerKey = c.CustomerKey"
+            if used & {'Year', 'Quarter', 'Month'}:
+                joins += " JOIN TimeDim t ON f.DateKey = t.DateKey"
+            if 'Segment' in used:
+                joins += " LEFT JOIN CustomerSegment s ON f.CustomerKey = s.CustomerKey"
+
+        select = [f"{dim_expr[d]} AS {d}" for d in group_by]
+        select += [f"{measure_expr[m]} AS {m}" for m in measures]
+        where, where_params = [], []
+        for dim, value in (filters or {}).items():
+            if isinstance(value, (list, tuple, set)):
+                value = list(value)
+                where.append(f"{dim_expr[dim]} IN ({', '.join('?' * len(value))})")
+                where_params.extend(value)
+            else:
+                where.append(f"{dim_expr[dim]} = ?")
+                where_params.append(value)
+        if date_range is not None:
+            where.append("f.DateKey BETWEEN ? AND ?")
+            where_params.extend(date_range)
+        if month_range is not None:
+            where.append(f"{dim_expr['Year']} * 100 + {dim_expr['Month']} BETWEEN ? AND ?")
+            where_params.extend(month_range)
+
+        branches = []
+        for source in sources:
+            branch = f"SELECT {', '.join(select)} FROM {source}{joins}"
+            if where:
+                branch += " WHERE " + " AND ".join(where)
+            if group_by:
+                branch += " GROUP BY " + ", ".join(dim_expr[d] for d in group_by)
+            branches.append(branch)
+        params = where_params * len(branches)
+
+        if len(branches) == 1:
+            sql = branches[0]
+        else:
+            # Aggregate each partition separately, then combine the partial sums
+            dim_expr = {d: d for d in DIMENSIONS + FACT_ONLY_DIMENSIONS}
+            measure_expr = {m: f"SUM({m})" for m in MEASURES}
+            outer = [*group_by, *(f"{measure_expr[m]} AS {m}" for m in measures)]
+            sql = f"SELECT {', '.join(outer)} FROM ({' UNION ALL '.join(branches)})"
+            if group_by:
+                sql += " GROUP BY " + ", ".join(group_by)
+        if having_min is not None:
+            sql += f" HAVING {measure_expr[measures[0]]} > ?"
+            params.append(having_min)
+        if order_by:
+            sql += " ORDER BY " + ", ".join(order_by)
+        return sql, params, table
+
+    def query(self, group_by, measures=('TotalSales',), filters=None, date_range=None,
+              order_by=None, having_min=None, month_range=None):
+        """
+        Aggregate ``measures`` by ``group_by``.
+
+        ``filters`` maps a dimension to a value or a list of values; ``date_range``
+        is an inclusive (start, end) pair of YYYYMMDD DateKeys and always reads SalesFact;
+        ``month_range`` is an inclusive (start, end) pair of YYYYMM months.
+        """
+        sql, params, table = self.build_sql(group_by, measures, filters, date_range, order_by,
+                                            having_min, month_range)
+        logging.debug(f"QueryRouter: {table or 'SalesFact'} <- {sql}")
+        if self.cache is not None:
+            return self.cache.read_sql(sql, self.conn, params=params)
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def query_grains(self, grains, measures=('TotalSales',), filters=None, date_range=None,
+                     month_range=None):
+        """
+        Aggregate ``measures`` at several grains with a single query.
+
+        The query runs once at the union of the grains (from the smallest
+        aggregate covering it, or one scan of SalesFact) and every grain is
+        rolled up from that result, so N grains cost one read instead of N.
+        Returns one DataFrame per grain, in order.
+        """
+        needed = set().union(*map(set, grains))
+        finest = [d for d in DIMENSIONS + FACT_ONLY_DIMENSIONS if d in needed]
+        base = self.query(finest, measures, filters=filters, date_range=date_range,
+                          month_range=month_range)
+        return [rollup(base, grain, measures) for grain in grains]
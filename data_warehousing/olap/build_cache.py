@@ -0,0 +1,70 @@
+# data_warehousing/olap/build_cache.py
+"""
+Content-hash build cache for dashboard artifacts.
+
+Each output file (chart PNG, dashboard HTML, PDF, olap_visuals.png) is
+fingerprinted by a hash of its inputs -- the query result it plots plus the
+figure spec and export settings.  The fingerprint of the last build is kept
+in a manifest next to the outputs; when it is unchanged and the file still
+exists the artifact is reused instead of re-rendered.
+"""
+import os
+import json
+import hashlib
+
+import pandas as pd
+
+MANIFEST_PATH = "data_warehousing/olap/.build_manifest.json"
+
+
+def _update(h, part):
+    if isinstance(part, pd.DataFrame):
+        h.update(json.dumps([str(c) for c in part.columns]).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+    elif isinstance(part, bytes):
+        h.update(part)
+    elif isinstance(part, str):
+        h.update(part.encode("utf-8"))
+    else:
+        h.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+    h.update(b"\x00")
+
+
+def fingerprint(*parts):
+    """SHA-256 over DataFrames, strings, bytes and JSON-serialisable specs, in order."""
+    h = hashlib.sha256()
+    for part in parts:
+        _update(h, part)
+    return h.hexdigest()
+
+
+class BuildCache:
+    """Manifest of artifact path -> fingerprint of the inputs it was last built from."""
+
+    def __init__(self, manifest_path=MANIFEST_PATH):
+        self.manifest_path = manifest_path
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+        self.reused, self.rebuilt = [], []
+
+    def is_fresh(self, path, fp):
+        """True when ``path`` exists and was built from inputs with fingerprint ``fp``."""
+        fresh = self.manifest.get(path) == fp and os.path.exists(path)
+        (self.reused if fresh else self.rebuilt).append(path)
+        return fresh
+
+    def record(self, path, fp):
+        self.manifest[path] = fp
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def summary(self):
+        return f"{len(self.rebuilt)} rebuilt, {len(self.reused)} reused"
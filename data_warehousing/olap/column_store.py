@@ -0,0 +1,314 @@
+# data_warehousing/olap/column_store.py
+"""
+Columnar, memory-mapped copy of SalesFact for ad-hoc OLAP work.
+
+``export_column_store`` streams SalesFact out of retail_dw.db into one .npy
+file per column.  Country and Category are dictionary-encoded to small
+integer codes (dictionaries sorted, so code order is string order), and
+Country is stored as a CustomerKey -> code lookup array rather than
+repeated per fact row.  Year / Quarter / Month are derived from the
+YYYYMMDD DateKey, so TimeDim is not exported at all.
+
+``ColumnStore.query`` has the same signature as ``QueryRouter.query`` and
+can stand in for it: it memory-maps only the columns a query touches, turns
+the group-by codes into one flat index and aggregates with ``np.bincount``.
+The store remembers the ETL load generation it was exported from;
+``is_current`` tells when it needs re-exporting.
+
+Run from the repository root:
+    python data_warehousing/olap/column_store.py [--export] [--benchmark] [--repeat N]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_warehousing.etl.load import DB_FILE_PATH
+from data_warehousing.olap.aggregates import DIMENSIONS, MEASURES, partition_sql
+from data_warehousing.olap.index_advisor import QUERY_FILES, load_queries
+from data_warehousing.olap.query_cache import load_generation
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+STORE_DIR = "data_warehousing/olap/.column_store"
+BENCHMARK_CSV = "data_warehousing/olap/column_store_timings.csv"
+EXPORT_CHUNK = 100_000
+META_FILE = "meta.json"
+
+FACT_COLUMNS = {
+    'DateKey': np.int32,
+    'CustomerKey': np.int32,
+    'Quantity': np.int64,
+    'UnitPrice': np.float64,
+    'TotalSales': np.float64,
+}
+CUSTOMER_COUNTRY = 'CustomerDim.Country'   # CustomerKey -> Country code
+
+# The queries in olap_queries.sql, in file order, as ColumnStore.query arguments
+OLAP_QUERY_SPECS = [
+    dict(group_by=['Country', 'Quarter'], order_by=['Country', 'Quarter']),
+    dict(group_by=['Year', 'Month'], filters={'Country': 'United Kingdom'}, order_by=['Year', 'Month']),
+    dict(group_by=['Year', 'Month'], filters={'Category': 'Electronics'}, order_by=['Year', 'Month']),
+    dict(group_by=['Country'], date_range=(20111001, 20111231), order_by=['TotalSales DESC']),
+]
+
+
+def _code_dtype(n):
+    return np.int8 if n < 2 ** 7 else np.int16 if n < 2 ** 15 else np.int32
+
+
+# ------------------------
+# Export
+# ------------------------
+def export_column_store(conn, store_dir=STORE_DIR, chunk_size=EXPORT_CHUNK):
+    """Write SalesFact (plus the Country dictionary) as memory-mappable columns; returns the row count."""
+    rows = conn.execute("SELECT COUNT(*) FROM SalesFact").fetchone()[0]
+    categories = [r[0] for r in conn.execute("SELECT DISTINCT Category FROM SalesFact ORDER BY Category")]
+    countries = [r[0] for r in conn.execute("SELECT DISTINCT Country FROM CustomerDim ORDER BY Country")]
+
+    tmp_dir = store_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    # Dimension: CustomerKey -> Country code (-1 for unused keys)
+    customers = pd.read_sql_query("SELECT CustomerKey, Country FROM CustomerDim", conn)
+    lookup = np.full(int(customers['CustomerKey'].max()) + 1 if len(customers) else 0, -1,
+                     dtype=_code_dtype(len(countries)))
+    lookup[customers['CustomerKey'].to_numpy()] = pd.Categorical(customers['Country'], categories=countries).codes
+    np.save(os.path.join(tmp_dir, f"{CUSTOMER_COUNTRY}.npy"), lookup)
+
+    # Fact columns, streamed chunk by chunk into preallocated memory maps
+    dtypes = dict(FACT_COLUMNS, Category=_code_dtype(len(categories)))
+    outputs = {name: np.lib.format.open_memmap(os.path.join(tmp_dir, f"{name}.npy"), mode="w+",
+                                               dtype=dtype, shape=(rows,))
+               for name, dtype in dtypes.items()}
+    # The SalesFact view streams its month partitions in order
+    cursor = conn.execute("SELECT DateKey, CustomerKey, Category, Quantity, UnitPrice, TotalSales "
+                          "FROM SalesFact")
+    names = [d[0] for d in cursor.description]
+    start = 0
+    while True:
+        batch = cursor.fetchmany(chunk_size)
+        if not batch:
+            break
+        end = start + len(batch)
+        for name, values in zip(names, zip(*batch)):
+            if name == 'Category':
+                values = pd.Categorical(values, categories=categories).codes
+            outputs[name][start:end] = values
+        start = end
+    for out in outputs.values():
+        out.flush()
+    del outputs
+
+    meta = {
+        "rows": rows,
+        "generation": load_generation(conn),
+        "exported_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "dictionaries": {"Country": countries, "Category": categories},
+        "columns": {name: np.dtype(dtype).name for name, dtype in dtypes.items()},
+    }
+    with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+    logging.info(f"Column store exported: {rows:,} fact rows, {len(countries)} countries, "
+                 f"{len(categories)} categories -> {store_dir}")
+    return rows
+
+
+# ------------------------
+# Query engine
+# ------------------------
+class ColumnStore:
+    """Group-by/filter engine over the exported columns (drop-in for ``QueryRouter.query``)."""
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.dictionaries = {k: np.asarray(v, dtype=object) for k, v in self.meta["dictionaries"].items()}
+        self._columns = {}
+
+    def is_current(self, conn):
+        return self.meta["generation"] == load_generation(conn)
+
+    def column(self, name):
+        """Memory-map one column on first use."""
+        if name not in self._columns:
+            self._columns[name] = np.load(os.path.join(self.store_dir, f"{name}.npy"), mmap_mode="r")
+        return self._columns[name]
+
+    def _take(self, name, rows):
+        col = self.column(name)
+        return col if rows is None else col[rows]
+
+    def _codes(self, dim, rows):
+        """Per-row integer codes for ``dim`` and the label of each code."""
+        if dim == 'Country':
+            return self.column(CUSTOMER_COUNTRY)[self._take('CustomerKey', rows)], self.dictionaries['Country']
+        if dim == 'Category':
+            return self._take('Category', rows), self.dictionaries['Category']
+        date_key = self._take('DateKey', rows)
+        if dim == 'Year':
+            years = date_key // 10000
+            first = int(years.min()) if len(years) else 0
+            last = int(years.max()) if len(years) else -1
+            return years - first, np.arange(first, last + 1)
+        month = date_key // 100 % 100
+        if dim == 'Month':
+            return month - 1, np.arange(1, 13)
+        if dim == 'Quarter':
+            return (month - 1) // 3, np.arange(1, 5)
+        raise ValueError(f"Unknown dimension: {dim}")
+
+    def _mask(self, filters, date_range, month_range):
+        mask = None
+
+        def both(m):
+            return m if mask is None else mask & m
+
+        for dim, value in (filters or {}).items():
+            wanted = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            if dim in self.dictionaries and not set(wanted) & set(self.dictionaries[dim]):
+                return np.empty(0, dtype=np.int64)   # no such member: nothing to scan
+            codes, labels = self._codes(dim, None)
+            lookup = {label: code for code, label in enumerate(labels)}
+            mask = both(np.isin(codes, [lookup[v] for v in wanted if v in lookup]))
+        if date_range is not None:
+            date_key = self.column('DateKey')
+            mask = both((date_key >= date_range[0]) & (date_key <= date_range[1]))
+        if month_range is not None:
+            month = self.column('DateKey') // 100
+            mask = both((month >= month_range[0]) & (month <= month_range[1]))
+        return None if mask is None else np.flatnonzero(mask)
+
+    def query(self, group_by, measures=('TotalSales',), filters=None, date_range=None,
+              order_by=None, having_min=None, month_range=None):
+        """Aggregate ``measures`` by ``group_by``; arguments as for ``QueryRouter.query``."""
+        group_by, measures = list(group_by), list(measures)
+        unknown = (set(group_by) | set(filters or {})) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown dimension(s): {sorted(unknown)}")
+        if set(measures) - set(MEASURES):
+            raise ValueError(f"Unknown measure(s): {sorted(set(measures) - set(MEASURES))}")
+        rows = self._mask(filters, date_range, month_range)
+
+        # One flat group index per row, in code (= sorted label) order
+        codes, labels = zip(*(self._codes(d, rows) for d in group_by)) if group_by else ((), ())
+        shape = tuple(len(lab) for lab in labels)
+        n_rows = self.meta["rows"] if rows is None else len(rows)
+        flat = (np.ravel_multi_index([c.astype(np.int64) for c in codes], shape) if group_by
+                else np.zeros(n_rows, dtype=np.int64))
+        size = int(np.prod(shape)) if group_by else 1
+        counts = np.bincount(flat, minlength=size)
+        present = np.flatnonzero(counts)
+
+        result = {}
+        for dim, lab, code in zip(group_by, labels, np.unravel_index(present, shape) if group_by else ()):
+            result[dim] = lab[code]
+        for m in measures:
+            if m == 'FactRows':
+                result[m] = counts[present]
+            else:
+                sums = np.bincount(flat, weights=self._take(m, rows), minlength=size)[present]
+                result[m] = sums.astype(np.int64) if m == 'Quantity' else sums
+        df = pd.DataFrame(result, columns=group_by + measures)
+        for dim in group_by:
+            if dim not in ('Country', 'Category'):
+                df[dim] = df[dim].astype(np.int64)
+
+        if having_min is not None:
+            df = df[df[measures[0]] > having_min]
+        if order_by:
+            cols = [o.split()[0] for o in order_by]
+            ascending = [not o.upper().endswith(" DESC") for o in order_by]
+            df = df.sort_values(cols, ascending=ascending, kind="stable")
+        return df.reset_index(drop=True)
+
+
+# ------------------------
+# Benchmark against SQLite
+# ------------------------
+def benchmark(conn, store, query_files=QUERY_FILES, repeat=5, csv_path=BENCHMARK_CSV):
+    """Time every olap_queries.sql statement on SQLite and on the column store and check the results agree."""
+    queries = [q for path in query_files for q in load_queries(path)]
+    if len(queries) != len(OLAP_QUERY_SPECS):
+        raise ValueError(f"{len(queries)} queries in {query_files} but {len(OLAP_QUERY_SPECS)} column-store specs")
+
+    def best_ms(fn):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+        return best * 1000, result
+
+    run_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = []
+    for (label, sql), spec in zip(queries, OLAP_QUERY_SPECS):
+        # Results are checked against the statement as written; SQLite is timed on its partition rewrite
+        expected = pd.read_sql_query(sql, conn)
+        rewritten = partition_sql(conn, sql)[0]
+        sqlite_ms, _ = best_ms(lambda: pd.read_sql_query(rewritten, conn))
+        column_ms, actual = best_ms(lambda: store.query(**spec))
+        try:
+            pd.testing.assert_frame_equal(expected, actual, check_exact=False, rtol=1e-9,
+                                          check_dtype=not expected.empty)
+            match = True
+        except AssertionError as e:
+            logging.warning(f"Column store result differs for '{label}': {e}")
+            match = False
+        rows.append({
+            "RunAt": run_at,
+            "Query": label,
+            "FactRows": store.meta["rows"],
+            "SqliteMs": round(sqlite_ms, 3),
+            "ColumnStoreMs": round(column_ms, 3),
+            "Speedup": round(sqlite_ms / column_ms, 2) if column_ms else None,
+            "ResultsMatch": match,
+        })
+    df = pd.DataFrame(rows)
+    df.to_csv(csv_path, mode="a", header=not os.path.exists(csv_path), index=False)
+    logging.info("Column store vs SQLite (best of %d):\n%s", repeat,
+                 df.drop(columns="RunAt").to_string(index=False))
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Columnar, memory-mapped OLAP backend for retail_dw.db")
+    parser.add_argument("--export", action="store_true", help="re-export even if the store is current")
+    parser.add_argument("--benchmark", action="store_true", help="compare olap_queries.sql against SQLite")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repetitions per query")
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(DB_FILE_PATH):
+        raise SystemExit(f"Database not found at {DB_FILE_PATH}. Run ETL to create it first.")
+    conn = sqlite3.connect(DB_FILE_PATH)
+    if args.export or not os.path.exists(os.path.join(args.store_dir, META_FILE)) \
+            or not ColumnStore(args.store_dir).is_current(conn):
+        export_column_store(conn, args.store_dir)
+    else:
+        logging.info(f"Column store at {args.store_dir} is current with the latest ETL load")
+    if args.benchmark:
+        benchmark(conn, ColumnStore(args.store_dir), repeat=args.repeat)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# data_warehousing/olap/connection_pool.py
+"""
+Pool of read-only SQLite connections for the live dashboard.
+
+Connections are opened with ``mode=ro`` (the ETL can keep writing; with the
+WAL journal readers never block it) and handed out one per request.  Each
+checkout carries a deadline enforced through SQLite's progress handler, so a
+runaway query is interrupted instead of tying up a worker.
+"""
+import time
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+POOL_SIZE = 4
+QUERY_TIMEOUT = 5.0       # seconds per request
+_PROGRESS_STEPS = 10_000  # VM instructions between deadline checks
+
+
+class QueryTimeout(TimeoutError):
+    """A pooled query ran past its deadline, or no connection became free in time."""
+
+
+class ReadOnlyPool:
+    """Fixed-size pool of ``mode=ro`` connections to one SQLite file."""
+
+    def __init__(self, db_path, size=POOL_SIZE, timeout=QUERY_TIMEOUT):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _checkout(self, wait):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                return self._open()
+        try:
+            return self._idle.get(timeout=wait)
+        except queue.Empty:
+            raise QueryTimeout(f"No free connection to {self.db_path} within {wait:g}s") from None
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Borrow a connection whose queries are interrupted after ``timeout`` seconds."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        conn = self._checkout(timeout)
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, _PROGRESS_STEPS)
+        try:
+            yield conn
+        except Exception as e:
+            # sqlite3 raises OperationalError("interrupted"); pandas re-wraps it as DatabaseError
+            if time.monotonic() > deadline and "interrupt" in str(e):
+                raise QueryTimeout(f"Query exceeded {timeout:g}s") from e
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._opened = 0
@@ -0,0 +1,362 @@
+# data_warehousing/olap/index_advisor.py
+"""
+Index advisor for the OLAP query workload.
+
+Runs EXPLAIN QUERY PLAN over every statement in the project's query files
+(aggregates over the SalesFact view are rewritten to read the month
+partitions directly where aggregates.partition_sql can combine them, and
+planned partition by partition; other statements run as written) and reports
+full table scans (scans of small dimension tables driving a join are listed
+but not counted as problems).  The "before" run is made on a warehouse
+without the secondary indexes (--keep-indexes profiles it as it is).
+
+For every scanned table a covering index is derived from how the query uses
+it: equality filters first, then one range filter, then join and GROUP BY
+columns, then every other column the query reads, so the plan can seek on
+the filters and never touch the table rows.  A recommendation that one of
+the managed indexes in etl/load.py (SECONDARY_INDEXES) covers -- same
+leading column, all columns present -- is created under that name; any
+other becomes an idx_advisor_* index.  SalesFact indexes are created on
+every month partition.  The queries are then re-planned and re-timed to
+confirm the scans are gone, and the managed indexes are restored.  Results
+go to index_report.md and are appended to index_timings.csv so timings can
+be compared run over run.
+
+Run from the repository root:
+    python data_warehousing/olap/index_advisor.py [--keep-indexes] [--repeat N] [sql files...]
+"""
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_warehousing.etl.load import (DB_FILE_PATH, SECONDARY_INDEXES, create_indexes, drop_indexes,
+                                       managed_indexes)
+from data_warehousing.etl.partitions import FACT_VIEW, is_partition_table
+from data_warehousing.olap.aggregates import partition_sql
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+# ------------------------
+# Config
+# ------------------------
+QUERY_FILES = ["data_warehousing/olap/olap_queries.sql"]
+OUT_DIR = "data_warehousing/olap"
+REPORT_PATH = os.path.join(OUT_DIR, "index_report.md")
+TIMINGS_CSV = os.path.join(OUT_DIR, "index_timings.csv")
+
+# Dimension tables at or below this many rows may be scanned (e.g. a calendar
+# driving a join); a scan of a fact table (or a SalesFact_YYYYMM month
+# partition behind the SalesFact view) is always reported.
+SMALL_TABLE_ROWS = 5000
+FACT_TABLES = {"SalesFact"}
+ADVISOR_PREFIX = "idx_advisor_"
+
+
+def is_fact_table(name):
+    return name in FACT_TABLES or is_partition_table(name)
+
+# "SCAN f" / "SCAN SalesFact" (SQLite < 3.36: "SCAN TABLE SalesFact AS f") without
+# an index is a full table scan; "SCAN f USING COVERING INDEX ..." only reads
+# the (narrower) index.
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_KEYWORDS = {"ON", "WHERE", "JOIN", "GROUP", "ORDER", "INNER", "LEFT", "CROSS", "USING", "LIMIT", "HAVING"}
+_CLAUSE = re.compile(r"\b(SELECT|FROM|WHERE|GROUP\s+BY|ORDER\s+BY|LIMIT)\b", re.IGNORECASE)
+_COLUMN_REF = re.compile(r"\b(?:(\w+)\.)?(\w+)\b")
+_PREDICATE = re.compile(r"^\(?\s*(?:(\w+)\.)?(\w+)\s*(=|IN\b|BETWEEN\b|<=|>=|<|>)\s*(.*?)\)?$",
+                        re.IGNORECASE | re.DOTALL)
+
+
+def load_queries(path):
+    """(label, sql) pairs from a .sql file; the label is the comment line above each statement."""
+    queries, label, lines = [], None, []
+    with open(path, encoding="utf-8") as f:
+        for raw in f:
+            line = raw.strip()
+            if line.startswith("--"):
+                if not lines:
+                    label = line.lstrip("- ").strip()
+                continue
+            if not line:
+                continue
+            lines.append(line)
+            if line.endswith(";"):
+                sql = " ".join(lines).rstrip(";")
+                queries.append((label or f"{os.path.basename(path)} #{len(queries) + 1}", sql))
+                label, lines = None, []
+    return queries
+
+
+def explain(conn, sql):
+    """EXPLAIN QUERY PLAN detail lines for ``sql``."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def table_aliases(sql):
+    """Map of alias (or bare table name) -> table name for the FROM/JOIN clauses of ``sql``."""
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        aliases[table] = table
+        if alias and alias.upper() not in _KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def full_scans(plan, aliases=None):
+    """Tables read by a full scan in a query plan."""
+    aliases = aliases or {}
+    return [aliases.get(m.group(1), m.group(1)) for m in (_FULL_SCAN.match(step) for step in plan) if m]
+
+
+def table_columns(conn, tables):
+    return {t: {row[1] for row in conn.execute(f'PRAGMA table_info("{t}")')} for t in tables}
+
+
+def _clauses(sql):
+    """{keyword: text} of the clauses of a single-level SELECT."""
+    parts = _CLAUSE.split(sql)
+    return {re.sub(r"\s+", " ", kw).upper(): text.strip() for kw, text in zip(parts[1::2], parts[2::2])}
+
+
+def index_candidate(sql, table, columns):
+    """
+    Key columns of a covering index for ``table`` in the single-level query ``sql``.
+
+    Equality filters first, then one range filter, join columns, GROUP BY
+    columns and every other column the query reads from ``table``.
+    ``columns`` maps each table of the query to its column names (bare
+    column names are resolved through it).  None when nothing can be derived.
+    """
+    if re.search(r"\(\s*SELECT\b", sql, re.IGNORECASE):
+        return None
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    aliases = table_aliases(sql)
+    own = {alias for alias, t in aliases.items() if t == table}
+
+    def is_own(alias, col):
+        if alias:
+            return alias in own and col in columns.get(table, ())
+        return [t for t in set(aliases.values()) if col in columns.get(t, ())] == [table]
+
+    def refs(text):
+        return [col for alias, col in _COLUMN_REF.findall(text) if is_own(alias, col)]
+
+    def any_refs(text):
+        return [col for alias, col in _COLUMN_REF.findall(text)
+                if alias in aliases or any(col in cols for cols in columns.values())]
+
+    clauses = _clauses(sql)
+    equality, ranges, joins = [], [], []
+    where = re.sub(r"\bBETWEEN\s+(\S+)\s+AND\s+", r"BETWEEN \1 ", clauses.get("WHERE", ""), flags=re.IGNORECASE)
+    if where and not re.search(r"\bOR\b", where, re.IGNORECASE):
+        for predicate in re.split(r"\s+AND\s+", where, flags=re.IGNORECASE):
+            m = _PREDICATE.match(predicate.strip())
+            if m is None or not is_own(m.group(1), m.group(2)):
+                continue
+            if any_refs(m.group(4)):
+                joins.append(m.group(2))
+            elif m.group(3) == "=" or m.group(3).upper() == "IN":
+                equality.append(m.group(2))
+            else:
+                ranges.append(m.group(2))
+    for condition in re.findall(r"\bON\s+(.+?)(?=\b(?:LEFT|INNER|CROSS)?\s*JOIN\b|$)", clauses.get("FROM", ""),
+                                re.IGNORECASE | re.DOTALL):
+        joins += refs(condition)
+    key = list(dict.fromkeys(equality + ranges[:1] + joins + refs(clauses.get("GROUP BY", "")) + refs(sql)))
+    return key or None
+
+
+def recommend(table, key):
+    """(index name, table, columns) for a derived key; a managed index covering it keeps its name."""
+    table = FACT_VIEW if is_partition_table(table) else table
+    for name, (managed_table, cols) in SECONDARY_INDEXES.items():
+        managed = [c.strip() for c in cols.split(",")]
+        if managed_table == table and managed[0] == key[0] and set(key) <= set(managed):
+            return name, table, cols
+    return f"{ADVISOR_PREFIX}{table.lower()}_{'_'.join(c.lower() for c in key)}", table, ", ".join(key)
+
+
+def recommend_indexes(conn, results):
+    """{index name: (table, columns)} covering the full scans found by ``profile_workload``."""
+    indexes = {}
+    for r in results:
+        for branch, scanned in r["branch_scans"]:
+            if not scanned:
+                continue
+            columns = table_columns(conn, set(table_aliases(branch).values()))
+            for table in scanned:
+                key = index_candidate(branch, table, columns)
+                if key is None:
+                    logging.warning(f"No index derived for the scan of {table} in '{r['label']}'")
+                    continue
+                name, logical, cols = recommend(table, key)
+                indexes.setdefault(name, (logical, cols))
+    return indexes
+
+
+def advisor_indexes(conn):
+    """Indexes created by earlier advisor runs that are not managed by etl/load.py."""
+    return [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE ?", (ADVISOR_PREFIX + "%",))]
+
+
+def table_sizes(conn):
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    return {t: conn.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0] for t in tables}
+
+
+def time_query(conn, sql, repeat=3):
+    """(best-of-``repeat`` wall time in milliseconds, rows returned), fetching every row."""
+    best, rows = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(conn.execute(sql).fetchall())
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, rows
+
+
+def profile_workload(conn, queries, repeat, sizes):
+    results = []
+    for label, sql in queries:
+        # Every partition branch reuses the fact alias, so each one is planned on its own
+        sql, branches = partition_sql(conn, sql)
+        try:
+            plan = explain(conn, sql)
+            branch_scans = [full_scans(explain(conn, branch), table_aliases(branch)) for branch in branches]
+        except sqlite3.Error as e:
+            logging.warning(f"Skipping '{label}': {e}")
+            continue
+        scans = list(dict.fromkeys(t for found in branch_scans for t in found if t in sizes))
+        small = [t for t in scans if not is_fact_table(t) and sizes.get(t, 0) <= SMALL_TABLE_ROWS]
+        ms, rows = time_query(conn, sql, repeat)
+        results.append({
+            "label": label,
+            "plan": plan,
+            "full_scans": [t for t in scans if t not in small],
+            "small_scans": small,
+            "branch_scans": [(branch, [t for t in dict.fromkeys(found) if t in scans and t not in small])
+                             for branch, found in zip(branches, branch_scans)],
+            "ms": ms,
+            "rows": rows,
+        })
+    return results
+
+
+def write_report(before, after, recommended, created, report_path=REPORT_PATH, csv_path=TIMINGS_CSV):
+    run_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # Keyed by query, so a query skipped in one profile does not shift the others
+    after_by_label = {a["label"]: a for a in after}
+    rows = []
+    for b in before:
+        a = after_by_label.get(b["label"])
+        if a is None:
+            logging.warning(f"No 'after' profile for '{b['label']}'; left out of the report")
+            continue
+        rows.append({
+            "RunAt": run_at,
+            "Query": b["label"],
+            "BeforeMs": round(b["ms"], 3),
+            "AfterMs": round(a["ms"], 3),
+            "Speedup": round(b["ms"] / a["ms"], 2) if a["ms"] else None,
+            "FullScansBefore": ";".join(b["full_scans"]),
+            "FullScansAfter": ";".join(a["full_scans"]),
+        })
+    df = pd.DataFrame(rows)
+    df.to_csv(csv_path, mode="a", header=not os.path.exists(csv_path), index=False)
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write("# Index Advisor Report\n\n")
+        f.write(f"Generated: {run_at}\n\n")
+        f.write("Recommended indexes (SalesFact ones are created on every month partition as <name>_YYYYMM):\n\n")
+        for name, (table, cols) in recommended.items():
+            new = any(c == name or c.startswith(name + "_") for c in created)
+            f.write(f"- `{name}` ON {table} ({cols})" + ("" if new else " -- already present") + "\n")
+        if not recommended:
+            f.write("- none (no full scans)\n")
+        f.write("\n")
+        f.write("| Query | Before (ms) | After (ms) | Speedup | Full scans before | Full scans after |\n")
+        f.write("|-------|-------------|------------|---------|-------------------|------------------|\n")
+        for r in rows:
+            f.write(f"| {r['Query']} | {r['BeforeMs']} | {r['AfterMs']} | {r['Speedup']} | "
+                    f"{r['FullScansBefore'] or '-'} | {r['FullScansAfter'] or '-'} |\n")
+        small = sorted({t for a in after for t in a["small_scans"]})
+        if small:
+            f.write(f"\nScans of small dimension tables (<= {SMALL_TABLE_ROWS} rows) driving a join are not counted: "
+                    + ", ".join(small) + "\n")
+        f.write("\n## Query plans after indexing\n")
+        for a in after:
+            f.write(f"\n### {a['label']}\n```\n" + "\n".join(a["plan"]) + "\n```\n")
+        f.write(f"\nRun history is appended to [`{os.path.basename(csv_path)}`]"
+                f"({os.path.basename(csv_path)}).\n")
+    logging.info(f"Index report written to {report_path}")
+
+
+def run(db_path=DB_FILE_PATH, query_files=QUERY_FILES, keep_indexes=False, repeat=3):
+    if not os.path.exists(db_path):
+        raise SystemExit(f"Database not found at {db_path}. Run ETL to create it first.")
+    conn = sqlite3.connect(db_path)
+    queries = [q for path in query_files for q in load_queries(path)]
+    try:
+        if not keep_indexes:
+            # "Before" is the unindexed warehouse, so every index the workload needs shows up
+            drop_indexes(conn)
+            for name in advisor_indexes(conn):
+                conn.execute(f"DROP INDEX {name}")
+            conn.commit()
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+        sizes = table_sizes(conn)
+        before = profile_workload(conn, queries, repeat, sizes)
+        for r in before:
+            if r["full_scans"]:
+                logging.info(f"Full scan(s) of {', '.join(r['full_scans'])} in '{r['label']}'")
+
+        recommended = recommend_indexes(conn, before)
+        for name, (table, cols) in recommended.items():
+            logging.info(f"Recommended index {name} ON {table} ({cols})")
+        created = [name for name, _, _ in managed_indexes(conn, recommended) if name not in existing]
+        create_indexes(conn, recommended)
+        conn.execute("ANALYZE")
+        conn.commit()
+
+        after = profile_workload(conn, queries, repeat, sizes)
+        remaining = [r for r in after if r["full_scans"]]
+        for r in remaining:
+            logging.warning(f"Still scanning {', '.join(r['full_scans'])} in '{r['label']}'")
+        if not remaining:
+            logging.info("No full table scans left in the workload.")
+
+        write_report(before, after, recommended, created)
+    finally:
+        # The loaders and the dashboards rely on the managed indexes being present
+        create_indexes(conn)
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.close()
+    return before, after
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EXPLAIN-based index advisor for retail_dw.db")
+    parser.add_argument("sql_files", nargs="*", default=QUERY_FILES)
+    parser.add_argument("--keep-indexes", action="store_true",
+                        help="profile 'before' with the existing indexes instead of an unindexed warehouse")
+    parser.add_argument("--repeat", type=int, default=3, help="timing repetitions per query")
+    args = parser.parse_args(argv)
+    run(query_files=args.sql_files, keep_indexes=args.keep_indexes, repeat=args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# data_warehousing/olap/live_dashboard.py
+"""
+Live, server-side cross-filtering OLAP dashboard.
+
+Unlike olap_dashboard.py nothing is loaded at import time: every filter
+change (countries, categories, month range) is pushed down into
+parameterised SQL, answered from the ETL's aggregate tables where possible
+(QueryRouter) over a pool of read-only connections with a per-request
+timeout.  The layout is rebuilt on each page load, so new ETL loads show up
+without restarting the server.  Clicking a bar in the country or category
+chart toggles that member in the corresponding filter.
+
+Run from the repository root:
+    python data_warehousing/olap/live_dashboard.py
+"""
+import os
+import sys
+import logging
+
+import dash
+from dash import dcc, html, dash_table
+import plotly.express as px
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_warehousing.olap.aggregates import QueryRouter
+from data_warehousing.olap.connection_pool import QueryTimeout, ReadOnlyPool
+
+DB_FILE_PATH = "data_warehousing/etl/retail_dw.db"
+TOP_N_COUNTRIES = 15
+
+pool = ReadOnlyPool(DB_FILE_PATH)
+
+
+def month_to_ordinal(yyyymm):
+    return (yyyymm // 100) * 12 + yyyymm % 100 - 1
+
+
+def ordinal_to_month(ordinal):
+    return (ordinal // 12) * 100 + ordinal % 12 + 1
+
+
+def load_members():
+    """Filter options straight from the (small) dimension and aggregate tables."""
+    with pool.connection() as conn:
+        countries = [r[0] for r in conn.execute("SELECT DISTINCT Country FROM CustomerDim ORDER BY Country")]
+        router = QueryRouter(conn)
+        categories = sorted(router.query(['Category'])['Category'])
+        months = router.query(['Year', 'Month'], order_by=['Year', 'Month'])
+    months = (months['Year'] * 100 + months['Month']).tolist()
+    return countries, categories, months
+
+
+def serve_layout():
+    countries, categories, months = load_members()
+    lo, hi = (month_to_ordinal(months[0]), month_to_ordinal(months[-1])) if months else (0, 0)
+    marks = {month_to_ordinal(m): f"{m // 100}-{m % 100:02d}" for m in months[::3]}
+    return html.Div([
+        html.H1("💹 Live OLAP Sales Dashboard",
+                style={"textAlign": "center", "color": "#2E86C1", "marginBottom": "20px"}),
+
+        html.Div([
+            html.Div([
+                html.Label("Countries", style={"fontWeight": "bold", "color": "#34495E"}),
+                dcc.Dropdown(id="live-country", options=countries, value=[], multi=True,
+                             placeholder="All countries"),
+            ], style={"width": "48%", "display": "inline-block"}),
+            html.Div([
+                html.Label("Categories", style={"fontWeight": "bold", "color": "#34495E"}),
+                dcc.Dropdown(id="live-category", options=categories, value=[], multi=True,
+                             placeholder="All categories"),
+            ], style={"width": "48%", "display": "inline-block", "float": "right"}),
+        ], style={"marginBottom": "20px"}),
+
+        html.Label("Months", style={"fontWeight": "bold", "color": "#34495E"}),
+        dcc.RangeSlider(id="live-months", min=lo, max=hi, step=1, value=[lo, hi], marks=marks),
+        html.Div(id="live-status", style={"color": "#C0392B", "margin": "10px 0"}),
+
+        html.Div([
+            dcc.Graph(id="live-country-chart", style={"width": "50%", "display": "inline-block"}),
+            dcc.Graph(id="live-category-chart", style={"width": "50%", "display": "inline-block"}),
+        ]),
+        dcc.Graph(id="live-trend-chart"),
+        dash_table.DataTable(
+            id="live-table",
+            columns=[{"name": c, "id": c} for c in ["Country", "Category", "TotalSales", "Quantity"]],
+            page_size=15,
+            sort_action="native",
+            style_table={"overflowX": "auto", "border": "1px solid #ddd"},
+            style_header={"backgroundColor": "#2E86C1", "fontWeight": "bold", "color": "white"},
+            style_cell={"textAlign": "left", "padding": "8px"},
+        ),
+    ], style={"margin": "20px", "fontFamily": "Arial"})
+
+
+app = dash.Dash(__name__)
+app.title = "Live OLAP Dashboard"
+app.layout = serve_layout
+
+
+def _filters(countries, categories):
+    filters = {}
+    if countries:
+        filters['Country'] = countries
+    if categories:
+        filters['Category'] = categories
+    return filters
+
+
+@app.callback(
+    [dash.Output("live-country-chart", "figure"),
+     dash.Output("live-category-chart", "figure"),
+     dash.Output("live-trend-chart", "figure"),
+     dash.Output("live-table", "data"),
+     dash.Output("live-status", "children")],
+    [dash.Input("live-country", "value"),
+     dash.Input("live-category", "value"),
+     dash.Input("live-months", "value")]
+)
+def update_live(countries, categories, month_values):
+    month_range = (ordinal_to_month(month_values[0]), ordinal_to_month(month_values[1]))
+    filters = _filters(countries, categories)
+    try:
+        with pool.connection() as conn:
+            router = QueryRouter(conn)
+            by_country = router.query(['Country'], filters=filters, month_range=month_range,
+                                      order_by=['TotalSales DESC'])
+            by_category = router.query(['Category'], filters=filters, month_range=month_range,
+                                       order_by=['TotalSales DESC'])
+            trend = router.query(['Year', 'Month'], filters=filters, month_range=month_range,
+                                 order_by=['Year', 'Month'])
+            table = router.query(['Country', 'Category'], measures=('TotalSales', 'Quantity'),
+                                 filters=filters, month_range=month_range,
+                                 order_by=['TotalSales DESC'])
+    except QueryTimeout as e:
+        logging.warning(f"Live dashboard query timed out: {e}")
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, f"Query timed out: {e}"
+
+    fig_country = px.bar(by_country.head(TOP_N_COUNTRIES), x="Country", y="TotalSales",
+                         title=f"Top {TOP_N_COUNTRIES} Countries (click to filter)",
+                         color_discrete_sequence=px.colors.qualitative.Bold)
+    fig_category = px.bar(by_category, x="Category", y="TotalSales",
+                          title="Sales by Category (click to filter)",
+                          color_discrete_sequence=px.colors.qualitative.Safe)
+    trend["Month"] = trend["Year"].astype(str) + "-" + trend["Month"].map("{:02d}".format)
+    fig_trend = px.line(trend, x="Month", y="TotalSales", markers=True, title="Monthly Sales Trend")
+    for fig in (fig_country, fig_category, fig_trend):
+        fig.update_layout(plot_bgcolor="white", paper_bgcolor="white", title_x=0.5)
+
+    return fig_country, fig_category, fig_trend, table.round(2).to_dict("records"), ""
+
+
+def _toggle(click, current):
+    if not click:
+        return dash.no_update
+    member = click["points"][0]["x"]
+    current = list(current or [])
+    return [m for m in current if m != member] if member in current else current + [member]
+
+
+@app.callback(dash.Output("live-country", "value"),
+              dash.Input("live-country-chart", "clickData"),
+              dash.State("live-country", "value"))
+def cross_filter_country(click, current):
+    return _toggle(click, current)
+
+
+@app.callback(dash.Output("live-category", "value"),
+              dash.Input("live-category-chart", "clickData"),
+              dash.State("live-category", "value"))
+def cross_filter_category(click, current):
+    return _toggle(click, current)
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
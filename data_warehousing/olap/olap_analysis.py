@@ -1,31 +1,43 @@
+import os
+import sys
 import sqlite3
-import pandas as pd
 import matplotlib.pyplot as plt
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_warehousing.olap.aggregates import QueryRouter
+from data_warehousing.olap.build_cache import BuildCache, fingerprint
+from data_warehousing.olap.query_cache import QueryCache
+
 DB_FILE_PATH = "data_warehousing/etl/retail_dw.db"
+VISUALS_PATH = "data_warehousing/OLAP/olap_visuals.png"
+PLOT_SPEC = {"kind": "bar", "color": "skyblue", "figsize": (10, 6),
+             "title": "Total Sales by Country", "ylabel": "Total Sales"}
 
 # Connect to database
 conn = sqlite3.connect(DB_FILE_PATH)
+router = QueryRouter(conn, cache=QueryCache())
 
-# Roll-up: Total sales by Country and Quarter
-rollup_query = """
-SELECT c.Country, t.Quarter, SUM(f.TotalSales) AS TotalSales
-FROM SalesFact f
-JOIN CustomerDim c ON f.CustomerKey = c.CustomerKey
-JOIN TimeDim t ON f.DateKey = t.DateKey
-GROUP BY c.Country, t.Quarter
-ORDER BY c.Country, t.Quarter;
-"""
-rollup_df = pd.read_sql_query(rollup_query, conn)
+# Roll-up: Total sales by Country and Quarter (served from the aggregate tables when present)
+rollup_df = router.query(['Country', 'Quarter'], order_by=['Country', 'Quarter'])
 
 # Bar chart of sales by Country
 summary_df = rollup_df.groupby('Country')['TotalSales'].sum().sort_values(ascending=False)
-plt.figure(figsize=(10,6))
-summary_df.plot(kind='bar', color='skyblue')
-plt.title("Total Sales by Country")
-plt.ylabel("Total Sales")
-plt.tight_layout()
-plt.savefig("data_warehousing/OLAP/olap_visuals.png")
-plt.show()
+
+# Only redraw when the roll-up or the plot spec changed since the last saved PNG
+build = BuildCache()
+visuals_fp = fingerprint(rollup_df, PLOT_SPEC)
+if build.is_fresh(VISUALS_PATH, visuals_fp):
+    print("olap_visuals.png is up to date:", VISUALS_PATH)
+else:
+    plt.figure(figsize=PLOT_SPEC["figsize"])
+    summary_df.plot(kind=PLOT_SPEC["kind"], color=PLOT_SPEC["color"])
+    plt.title(PLOT_SPEC["title"])
+    plt.ylabel(PLOT_SPEC["ylabel"])
+    plt.tight_layout()
+    plt.savefig(VISUALS_PATH)
+    build.record(VISUALS_PATH, visuals_fp)
+    build.save()
+    plt.show()
 
 conn.close()
@@ -1,26 +1,65 @@
+import os
+import sys
+import atexit
+import threading
+from functools import lru_cache
 import dash
 from dash import dcc, html, dash_table
-import pandas as pd
 import sqlite3
 import plotly.express as px
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from instrumentation import StageRecorder
+from data_warehousing.olap.aggregates import QueryRouter
+from data_warehousing.olap.query_cache import QueryCache
+
 DB_FILE_PATH = "data_warehousing/etl/retail_dw.db"
 
-# Connect to DB and load aggregated data
-conn = sqlite3.connect(DB_FILE_PATH)
-df = pd.read_sql("""
-SELECT c.Country, f.Category, SUM(f.TotalSales) AS TotalSales
-FROM SalesFact f
-JOIN CustomerDim c ON f.CustomerKey = c.CustomerKey
-GROUP BY c.Country, f.Category
-HAVING TotalSales > 0
-""", conn)
-conn.close()
+# Startup stages plus every uncached callback payload; written when the server exits.
+# StageRecorder is not thread-safe and Dash runs callbacks on several threads, so
+# callbacks enter their stage under STAGES_LOCK.
+STAGES = StageRecorder("olap_dashboard")
+STAGES_LOCK = threading.Lock()
+
+
+@atexit.register
+def close_stages():
+    with STAGES_LOCK:
+        STAGES.close()
+
+
+# Connect to DB and load aggregated data (AggSales_CountryCategory when the ETL built it;
+# cached on disk until the next ETL load)
+with STAGES.stage("query") as stage:
+    conn = sqlite3.connect(DB_FILE_PATH)
+    df = QueryRouter(conn, cache=QueryCache()).query(['Country', 'Category'], having_min=0)
+    conn.close()
+    stage.add_rows(rows_out=len(df))
 
 # Get only countries with data
 countries = sorted(df["Country"].unique())
 categories = sorted(df["Category"].unique())
 
+# Row positions per selection, built once: a callback is a dict lookup plus an
+# iloc take of the matching rows, never a copy or a boolean scan of the frame.
+with STAGES.stage("row_index", rows_in=len(df)):
+    ROW_INDEX = {
+        (True, True): df.groupby(["Country", "Category"]).indices,
+        (True, False): df.groupby("Country").indices,
+        (False, True): df.groupby("Category").indices,
+    }
+PAYLOAD_CACHE_SIZE = 256
+
+
+def select_rows(country, category):
+    """Rows for a (country, category) selection; either part may be empty (= all)."""
+    if not country and not category:
+        return df
+    index = ROW_INDEX[(bool(country), bool(category))]
+    key = (country, category) if country and category else (country or category)
+    return df.iloc[index.get(key, [])]
+
 app = dash.Dash(__name__)
 app.title = "OLAP Dashboard"
 
@@ -72,24 +111,27 @@ app.layout = html.Div([
      dash.Input("category-filter", "value")]
 )
 def update_dashboard(selected_country, selected_category):
-    filtered_df = df.copy()
-
-    if selected_country:
-        filtered_df = filtered_df[filtered_df["Country"] == selected_country]
-    if selected_category:
-        filtered_df = filtered_df[filtered_df["Category"] == selected_category]
-
-    fig = px.bar(
-        filtered_df,
-        x="Category",
-        y="TotalSales",
-        color="Country",
-        title=f"Total Sales in {selected_country} - {selected_category}",
-        color_discrete_sequence=px.colors.qualitative.Bold
-    )
-    fig.update_layout(plot_bgcolor="white", paper_bgcolor="white")
+    return build_payload(selected_country, selected_category)
+
+
+@lru_cache(maxsize=PAYLOAD_CACHE_SIZE)
+def build_payload(selected_country, selected_category):
+    """Figure and table rows for one selection, memoised per (country, category)."""
+    with STAGES_LOCK, STAGES.stage("payload") as stage:
+        filtered_df = select_rows(selected_country, selected_category)
+        stage.add_rows(rows_out=len(filtered_df))
+
+        fig = px.bar(
+            filtered_df,
+            x="Category",
+            y="TotalSales",
+            color="Country",
+            title=f"Total Sales in {selected_country} - {selected_category}",
+            color_discrete_sequence=px.colors.qualitative.Bold
+        )
+        fig.update_layout(plot_bgcolor="white", paper_bgcolor="white")
 
-    return fig, filtered_df.to_dict("records")
+        return fig.to_dict(), filtered_df.to_dict("records")
 
 if __name__ == "__main__":
     app.run_server(debug=True)
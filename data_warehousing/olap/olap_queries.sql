@@ -22,3 +22,11 @@ JOIN TimeDim t ON f.DateKey = t.DateKey
 WHERE f.Category = 'Electronics'
 GROUP BY t.Year, t.Month
 ORDER BY t.Year, t.Month;
+
+-- Slice by time range: Q4 2011 sales by country (DateKey is YYYYMMDD, so no TimeDim join is needed)
+SELECT c.Country, SUM(f.TotalSales) AS TotalSales
+FROM SalesFact f
+JOIN CustomerDim c ON f.CustomerKey = c.CustomerKey
+WHERE f.DateKey BETWEEN 20111001 AND 20111231
+GROUP BY c.Country
+ORDER BY TotalSales DESC;
@@ -0,0 +1,184 @@
+# data_warehousing/olap/query_cache.py
+"""
+On-disk cache of OLAP query results, shared by the dashboards.
+
+Entries are keyed by the resolved database file plus the whitespace-normalised
+SQL text and its parameters, and stamped with the ETL load generation
+(database file and latest EtlLoadLog row), so two warehouses never share
+results.  Reading the generation only touches EtlLoadLog, so a warm dashboard
+start never reads SalesFact.  When the ETL records a new load (or another
+warehouse is queried) every entry stamped with another generation is evicted;
+total size is bounded by ``max_bytes`` with LRU eviction.  In-memory databases
+are not cached.  Every entry records the tables its SQL reads, so a job that
+rewrites a table outside the ETL (e.g. the customer segments) evicts only the
+entries that read it (``evict_tables``).
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+
+import pandas as pd
+
+CACHE_DIR = "data_warehousing/olap/.query_cache"
+MAX_BYTES = 64 * 1024 * 1024
+INDEX_FILE = "index.json"
+
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)", re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    """Collapse whitespace and drop a trailing semicolon so formatting changes do not miss the cache."""
+    return re.sub(r"\s+", " ", sql).strip().rstrip(";").strip()
+
+
+def referenced_tables(sql):
+    """Names after FROM / JOIN in ``sql`` (tables and views), sorted."""
+    return sorted(set(_TABLE_REF.findall(sql)))
+
+
+def database_file(conn):
+    """Resolved path of the connection's main database, or None when it is in memory."""
+    for _, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main":
+            return os.path.realpath(path) if path else None
+    return None
+
+
+def load_generation(conn):
+    """Identifier of the latest ETL load of this database file, or None without EtlLoadLog."""
+    try:
+        row = conn.execute(
+            "SELECT LoadId, FinishedAt FROM EtlLoadLog ORDER BY LoadId DESC LIMIT 1").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return f"{database_file(conn) or ':memory:'}#{row[0]}@{row[1]}" if row else None
+
+
+class QueryCache:
+    """LRU-bounded, generation-stamped cache of query result DataFrames."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index_path = os.path.join(cache_dir, INDEX_FILE)
+        self._index = self._read_index()
+        self.hits = self.misses = 0
+
+    # ------------------------
+    # Index bookkeeping
+    # ------------------------
+    def _read_index(self):
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"generation": None, "entries": {}}
+
+    def _write_index(self):
+        tmp = self._index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self._index_path)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _evict(self, key):
+        self._index["entries"].pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def total_bytes(self):
+        return sum(e["bytes"] for e in self._index["entries"].values())
+
+    # ------------------------
+    # Invalidation
+    # ------------------------
+    def sync_generation(self, generation):
+        """Evict every entry from an older ETL generation; returns the number evicted."""
+        if generation == self._index.get("generation"):
+            return 0
+        stale = [k for k, e in self._index["entries"].items() if e["generation"] != generation]
+        for key in stale:
+            self._evict(key)
+        self._index["generation"] = generation
+        self._write_index()
+        if stale:
+            logging.info(f"Query cache: evicted {len(stale)} entries from an older ETL load")
+        return len(stale)
+
+    def evict_tables(self, tables):
+        """Evict every entry whose SQL reads one of ``tables``; returns the number evicted."""
+        tables = set(tables)
+        # Entries written before the tables were recorded might read them too
+        stale = [k for k, e in self._index["entries"].items() if "tables" not in e or tables & set(e["tables"])]
+        for key in stale:
+            self._evict(key)
+        self._write_index()
+        if stale:
+            logging.info(f"Query cache: evicted {len(stale)} entries reading {', '.join(sorted(tables))}")
+        return len(stale)
+
+    def clear(self):
+        for key in list(self._index["entries"]):
+            self._evict(key)
+        self._write_index()
+
+    # ------------------------
+    # Lookup
+    # ------------------------
+    @staticmethod
+    def make_key(sql, params=None, database=None):
+        payload = json.dumps([database, normalize_sql(sql), list(params or [])], default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def read_sql(self, sql, conn, params=None):
+        """``pd.read_sql_query`` with caching for the current ETL generation."""
+        database = database_file(conn)
+        generation = load_generation(conn)
+        if database is None or generation is None:
+            return pd.read_sql_query(sql, conn, params=params)
+        self.sync_generation(generation)
+
+        key = self.make_key(sql, params, database)
+        entry = self._index["entries"].get(key)
+        if entry is not None:
+            try:
+                df = pd.read_pickle(self._path(key))
+            except (OSError, ValueError, EOFError):
+                self._evict(key)
+            else:
+                entry["last_used"] = time.time()
+                self._write_index()
+                self.hits += 1
+                return df
+
+        self.misses += 1
+        df = pd.read_sql_query(sql, conn, params=params)
+        df.to_pickle(self._path(key))
+        self._index["entries"][key] = {
+            "generation": generation,
+            "bytes": os.path.getsize(self._path(key)),
+            "last_used": time.time(),
+            "sql": normalize_sql(sql)[:200],
+            "tables": referenced_tables(sql),
+        }
+        self._enforce_limit()
+        self._write_index()
+        return df
+
+    def _enforce_limit(self):
+        entries = self._index["entries"]
+        if self.total_bytes() <= self.max_bytes:
+            return
+        for key in sorted(entries, key=lambda k: entries[k]["last_used"]):
+            self._evict(key)
+            if self.total_bytes() <= self.max_bytes:
+                break
@@ -0,0 +1,114 @@
+# data_warehousing/olap/static_html.py
+"""
+Self-contained HTML export for Plotly figures (no CDN, works air-gapped).
+
+``fig.to_html(include_plotlyjs=...)`` either points at the CDN or inlines
+the 4.5 MB library once per figure.  Here the library is inlined once for
+the whole page, numeric trace arrays are shipped as base64 typed arrays
+(``{"dtype": "f8", "bdata": ...}``, decoded natively by plotly.js >= 2.28)
+instead of decimal JSON lists, and each figure is only drawn by
+``Plotly.newPlot`` when its container scrolls into view.
+"""
+import json
+import base64
+import html
+
+import numpy as np
+import plotly.offline
+from plotly.utils import PlotlyJSONEncoder
+
+MIN_TYPED_LENGTH = 8   # shorter arrays are cheaper as plain JSON
+
+# numpy dtype -> plotly.js typed-array code (no 64-bit integers in plotly.js)
+_TYPED_CODES = {
+    "float64": "f8", "float32": "f4",
+    "int32": "i4", "uint32": "u4", "int16": "i2", "uint16": "u2", "int8": "i1", "uint8": "u1",
+}
+
+_LAZY_LOADER = """
+(function () {
+  function draw(el) {
+    if (el.dataset.drawn) return;
+    el.dataset.drawn = "1";
+    var spec = JSON.parse(document.getElementById(el.id + "-spec").textContent);
+    Plotly.newPlot(el, spec.data, spec.layout, {responsive: true});
+  }
+  var figures = document.querySelectorAll("div.lazy-plotly");
+  if (!("IntersectionObserver" in window)) { figures.forEach(draw); return; }
+  var observer = new IntersectionObserver(function (entries) {
+    entries.forEach(function (entry) {
+      if (entry.isIntersecting) { observer.unobserve(entry.target); draw(entry.target); }
+    });
+  }, {rootMargin: "200px"});
+  figures.forEach(function (el) { observer.observe(el); });
+})();
+"""
+
+
+def typed_array(values):
+    """Encode a numeric array as a plotly.js typed array, or None if it is not numeric."""
+    arr = np.asarray(values)
+    if arr.dtype.kind not in "iuf" or arr.ndim != 1:
+        return None
+    if arr.dtype.kind in "iu" and arr.dtype.name not in _TYPED_CODES:
+        # int64/uint64: narrow to int32 when lossless, otherwise ship as float64
+        info = np.iinfo(np.int32)
+        arr = arr.astype(np.int32 if arr.size == 0 or (arr.min() >= info.min and arr.max() <= info.max)
+                         else np.float64)
+    code = _TYPED_CODES.get(arr.dtype.name)
+    if code is None:
+        return None
+    data = np.ascontiguousarray(arr, dtype=arr.dtype.newbyteorder("<")).tobytes()
+    return {"dtype": code, "bdata": base64.b64encode(data).decode("ascii")}
+
+
+def pack_arrays(obj):
+    """Recursively replace long numeric arrays in a figure dict with typed arrays."""
+    if isinstance(obj, dict):
+        return {k: pack_arrays(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        if len(obj) >= MIN_TYPED_LENGTH and all(
+                isinstance(v, (int, float)) and not isinstance(v, bool) for v in obj):
+            return typed_array(obj) or list(obj)
+        return [pack_arrays(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        packed = typed_array(obj) if obj.size >= MIN_TYPED_LENGTH else None
+        return packed if packed is not None else obj
+    return obj
+
+
+def figure_json(fig):
+    """Compact JSON spec (data + layout) for one figure."""
+    spec = pack_arrays(fig.to_dict())
+    text = json.dumps({"data": spec["data"], "layout": spec["layout"]},
+                      cls=PlotlyJSONEncoder, separators=(",", ":"))
+    # Keep the payload inert inside a <script> element
+    return text.replace("</", "<\\/")
+
+
+def render_page(figures, title, header_html="", footer_html="", height=500):
+    """One self-contained HTML page for ``[(fig, caption), ...]``."""
+    parts = []
+    for i, (fig, caption) in enumerate(figures):
+        div_id = f"fig-{i}"
+        fig_height = fig.layout.height or height
+        parts.append(f"<h2 style='font-family:Arial; color:#2E86C1; text-align:center'>{html.escape(caption)}</h2>")
+        parts.append(f'<div id="{div_id}" class="lazy-plotly" style="height:{fig_height}px; width:100%;"></div>')
+        parts.append(f'<script type="application/json" id="{div_id}-spec">{figure_json(fig)}</script>')
+
+    return f"""<html>
+<head>
+  <meta charset="utf-8" />
+  <title>{html.escape(title)}</title>
+  <script type="text/javascript">{plotly.offline.get_plotlyjs()}</script>
+</head>
+<body style="font-family: Arial; margin: 20px; background-color:#F7F9FB">
+{header_html}
+  <div style="max-width:1200px; margin: 0 auto;">
+{chr(10).join(parts)}
+  </div>
+{footer_html}
+  <script type="text/javascript">{_LAZY_LOADER}</script>
+</body>
+</html>
+"""
@@ -0,0 +1,149 @@
+# data_warehousing/olap/test_aggregates.py
+"""
+QueryRouter and partition_sql: routed answers match the fact table, partitions are pruned.
+
+Run from the repository root:
+    python -m pytest data_warehousing/olap/test_aggregates.py
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_warehousing.etl.partitions import list_partitions, partition_table
+from data_warehousing.olap.aggregates import MEASURES, QueryRouter, partition_sql
+from data_warehousing.olap.index_advisor import QUERY_FILES, load_queries, table_aliases
+
+OLAP_QUERIES_PATH = os.path.join(os.path.dirname(__file__), "..", "..", QUERY_FILES[0])
+
+QUERIES = [
+    dict(group_by=['Country']),
+    dict(group_by=['Year', 'Month'], filters={'Category': 'Electronics'}),
+    dict(group_by=['Country', 'Category'], filters={'Country': ['United Kingdom', 'France']}),
+    dict(group_by=['Category', 'Quarter'], month_range=(201103, 201106)),
+    dict(group_by=[]),
+]
+
+
+def fact_router(conn):
+    """A router that ignores the aggregate tables."""
+    router = QueryRouter(conn)
+    router.available = {}
+    return router
+
+
+def answer(router, query):
+    result = router.query(measures=MEASURES, order_by=query['group_by'] or None, **query)
+    return result.reset_index(drop=True)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_aggregates_answer_like_the_fact_table(warehouse, query):
+    routed = QueryRouter(warehouse)
+    assert routed.choose_table(query['group_by'], query.get('filters'),
+                               month_range=query.get('month_range')) is not None
+    pd.testing.assert_frame_equal(answer(routed, query), answer(fact_router(warehouse), query),
+                                  check_dtype=False)
+
+
+def test_router_picks_the_smallest_covering_aggregate(warehouse):
+    router = QueryRouter(warehouse)
+    assert router.choose_table(['Country']) == 'AggSales_Country'
+    assert router.choose_table(['Month'], {'Category': 'Toys'}) == 'AggSales_CategoryMonth'
+    assert router.choose_table(['Country'], month_range=(201101, 201102)) == 'AggSales_CountryMonth'
+    assert router.choose_table(['Segment']) is None
+    assert router.choose_table(['Country'], date_range=(20110101, 20110131)) is None
+    with pytest.raises(ValueError, match="Unknown dimension"):
+        router.build_sql(['Weather'])
+
+
+def test_date_range_reads_only_its_partitions(warehouse):
+    router = QueryRouter(warehouse)
+    sql, _, table = router.build_sql(['Country'], date_range=(20110115, 20110220))
+    assert table is None
+    read = [partition_table(m) for m in list_partitions(warehouse) if partition_table(m) in sql]
+    assert read == ['SalesFact_201101', 'SalesFact_201102']
+
+    result = router.query(['Country'], date_range=(20110115, 20110220), order_by=['Country'])
+    expected = pd.read_sql_query(
+        "SELECT c.Country, SUM(f.TotalSales) AS TotalSales FROM SalesFact f "
+        "JOIN CustomerDim c ON f.CustomerKey = c.CustomerKey "
+        "WHERE f.DateKey BETWEEN 20110115 AND 20110220 GROUP BY c.Country ORDER BY c.Country", warehouse)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_empty_prune_gives_an_empty_result(warehouse):
+    router = QueryRouter(warehouse)
+    sql, _, _ = router.build_sql(['Country'], date_range=(20200101, 20201231))
+    assert "SalesFact" not in sql
+    assert router.query(['Country'], date_range=(20200101, 20201231)).empty
+
+
+def test_query_grains_match_separate_queries(warehouse):
+    router = QueryRouter(warehouse)
+    grains = [['Country'], ['Category'], []]
+    for grain, result in zip(grains, router.query_grains(grains, filters={'Year': 2011})):
+        expected = router.query(grain, filters={'Year': 2011}, order_by=grain or None)
+        pd.testing.assert_frame_equal(result.reset_index(drop=True), expected, check_dtype=False)
+
+
+def olap_queries():
+    return [sql for _, sql in load_queries(OLAP_QUERIES_PATH)]
+
+
+@pytest.mark.parametrize("index", range(4))
+def test_partition_sql_matches_the_view(warehouse, index):
+    sql = olap_queries()[index]
+    rewritten, branches = partition_sql(warehouse, sql)
+    assert "SalesFact " not in rewritten and "SalesFact\n" not in rewritten
+    pd.testing.assert_frame_equal(pd.read_sql_query(rewritten, warehouse), pd.read_sql_query(sql, warehouse))
+
+
+def test_partition_sql_prunes_on_the_date_range(warehouse):
+    q4 = olap_queries()[3]
+    _, branches = partition_sql(warehouse, q4)
+    read = {table for branch in branches for table in table_aliases(branch).values()}
+    assert sorted(t for t in read if t.startswith("SalesFact")) == \
+        ['SalesFact_201110', 'SalesFact_201111', 'SalesFact_201112']
+
+    empty = q4.replace("20111001 AND 20111231", "20200101 AND 20201231")
+    rewritten, _ = partition_sql(warehouse, empty)
+    assert "SalesFact" not in rewritten
+    assert warehouse.execute(rewritten).fetchall() == []
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT Category, SUM(TotalSales) AS s FROM SalesFact GROUP BY Category HAVING SUM(TotalSales) > 0",
+    "SELECT Category, AVG(TotalSales) AS a FROM SalesFact GROUP BY Category",
+    "SELECT COUNT(DISTINCT InvoiceNo) AS n FROM SalesFact",
+    "SELECT MAX(DateKey) FROM SalesFact",
+])
+def test_partition_sql_leaves_other_statements_alone(warehouse, sql):
+    assert partition_sql(warehouse, sql) == (sql, [sql])
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT Category FROM SalesFact",
+    "SELECT f.CustomerKey, f.Category FROM SalesFact f WHERE f.Quantity > 100",
+    "SELECT SUM(f.TotalSales)/COUNT(*) AS AvgLine FROM SalesFact f",
+    "SELECT f.Category, MAX(f.UnitPrice) - MIN(f.UnitPrice) AS PriceRange FROM SalesFact f GROUP BY f.Category",
+    "SELECT SUM(TotalSales) AS s FROM SalesFact GROUP BY Category",
+    "SELECT Category, COUNT(*) AS n FROM SalesFact",
+])
+def test_partition_sql_leaves_uncombinable_statements_alone(warehouse, sql):
+    assert partition_sql(warehouse, sql) == (sql, [sql])
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT f.Category, SUM(f.TotalSales) AS s, MAX(f.UnitPrice) AS top FROM SalesFact f "
+    "GROUP BY f.Category ORDER BY f.Category",
+    "SELECT Category AS c FROM SalesFact GROUP BY Category ORDER BY c",
+    "SELECT COUNT(*) AS n, MIN(DateKey) AS first FROM SalesFact",
+])
+def test_partition_sql_rewrites_combinable_statements(warehouse, sql):
+    rewritten, branches = partition_sql(warehouse, sql)
+    assert len(branches) == len(list_partitions(warehouse)) > 1
+    pd.testing.assert_frame_equal(pd.read_sql_query(rewritten, warehouse), pd.read_sql_query(sql, warehouse))
@@ -0,0 +1,80 @@
+# data_warehousing/olap/test_column_store.py
+"""
+ColumnStore: the exported columns answer every olap_queries.sql spec like SQLite.
+
+Run from the repository root:
+    python -m pytest data_warehousing/olap/test_column_store.py
+"""
+import os
+import sys
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_warehousing.olap.aggregates import MEASURES, QueryRouter
+from data_warehousing.olap.column_store import (
+    META_FILE, OLAP_QUERY_SPECS, ColumnStore, benchmark, export_column_store,
+)
+from data_warehousing.olap.index_advisor import QUERY_FILES, load_queries
+
+OLAP_QUERIES_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", QUERY_FILES[0]))
+
+
+@pytest.fixture(scope="module")
+def store_dir(warehouse_path, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("column_store") / "store")
+    conn = sqlite3.connect(warehouse_path)
+    try:
+        export_column_store(conn, path, chunk_size=700)     # several chunks, one partial
+    finally:
+        conn.close()
+    return path
+
+
+def test_export_writes_every_fact_row(warehouse, store_dir):
+    store = ColumnStore(store_dir)
+    rows = warehouse.execute("SELECT COUNT(*) FROM SalesFact").fetchone()[0]
+    assert store.meta["rows"] == rows == len(store.column('TotalSales'))
+    np.testing.assert_allclose(store.column('TotalSales').sum(),
+                               warehouse.execute("SELECT SUM(TotalSales) FROM SalesFact").fetchone()[0])
+    assert store.is_current(warehouse)
+    assert not os.path.exists(store_dir + ".tmp") and os.path.exists(os.path.join(store_dir, META_FILE))
+
+
+@pytest.mark.parametrize("index", range(len(OLAP_QUERY_SPECS)))
+def test_specs_match_the_olap_queries(warehouse, store_dir, index):
+    label, sql = load_queries(OLAP_QUERIES_PATH)[index]
+    expected = pd.read_sql_query(sql, warehouse)
+    assert not expected.empty, label
+    actual = ColumnStore(store_dir).query(**OLAP_QUERY_SPECS[index])
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize("query", [
+    dict(group_by=['Category', 'Quarter'], filters={'Country': ['France', 'Germany']}),
+    dict(group_by=['Year'], month_range=(201103, 201106)),
+    dict(group_by=[]),
+])
+def test_measures_match_the_router(warehouse, store_dir, query):
+    order_by = query['group_by'] or None
+    actual = ColumnStore(store_dir).query(measures=MEASURES, order_by=order_by, **query)
+    expected = QueryRouter(warehouse).query(measures=MEASURES, order_by=order_by, **query)
+    pd.testing.assert_frame_equal(actual, expected.reset_index(drop=True), check_exact=False, rtol=1e-9,
+                                  check_dtype=False)
+
+
+def test_unknown_members_and_dimensions(store_dir):
+    store = ColumnStore(store_dir)
+    assert store.query(['Country'], filters={'Country': 'Atlantis'}).empty
+    with pytest.raises(ValueError, match="Unknown dimension"):
+        store.query(['Weather'])
+
+
+def test_benchmark_results_match(warehouse, store_dir, tmp_path):
+    timings = benchmark(warehouse, ColumnStore(store_dir), query_files=[OLAP_QUERIES_PATH], repeat=1,
+                        csv_path=str(tmp_path / "timings.csv"))
+    assert timings['ResultsMatch'].all() and len(timings) == len(OLAP_QUERY_SPECS)
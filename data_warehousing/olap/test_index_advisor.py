@@ -0,0 +1,130 @@
+# data_warehousing/olap/test_index_advisor.py
+"""
+Index advisor: scan detection, derived covering indexes and the before/after run.
+
+Run from the repository root:
+    python -m pytest data_warehousing/olap/test_index_advisor.py
+"""
+import os
+import sys
+import shutil
+import sqlite3
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_warehousing.etl.load import managed_indexes
+from data_warehousing.olap import index_advisor
+from data_warehousing.olap.aggregates import partition_sql
+from data_warehousing.olap.index_advisor import (
+    QUERY_FILES, full_scans, index_candidate, load_queries, recommend, table_aliases, table_columns,
+)
+
+OLAP_QUERIES_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", QUERY_FILES[0]))
+
+
+def test_full_scans_in_old_and_new_plan_formats():
+    aliases = {'f': 'SalesFact_201101'}
+    plan = ["SCAN f", "SCAN TABLE SalesFact_201102 AS f", "SCAN TABLE TimeDim",
+            "SCAN TABLE CustomerDim AS c USING COVERING INDEX idx_customerdim_country",
+            "SCAN f USING COVERING INDEX idx_salesfact_date_cust_sales_201101",
+            "SEARCH t USING INTEGER PRIMARY KEY (rowid=?)"]
+    assert full_scans(plan, aliases) == ['SalesFact_201101', 'SalesFact_201102', 'TimeDim']
+
+
+def test_candidates_follow_the_query_shape(warehouse):
+    derived = {}
+    for label, sql in load_queries(OLAP_QUERIES_PATH):
+        branch = partition_sql(warehouse, sql)[1][0]
+        fact = table_aliases(branch)['f']
+        columns = table_columns(warehouse, set(table_aliases(branch).values()))
+        derived[label.split(':')[0]] = (index_candidate(branch, fact, columns),
+                                        index_candidate(branch, 'CustomerDim', columns))
+    assert derived['Roll-up'] == (['CustomerKey', 'DateKey', 'TotalSales'], ['CustomerKey', 'Country'])
+    assert derived['Drill-down'] == (['CustomerKey', 'DateKey', 'TotalSales'], ['Country', 'CustomerKey'])
+    assert derived['Slice'] == (['Category', 'DateKey', 'TotalSales'], None)
+    assert derived['Slice by time range'] == (['DateKey', 'CustomerKey', 'TotalSales'], ['CustomerKey', 'Country'])
+
+    sql = ("SELECT StockCode, SUM(TotalSales) AS s FROM SalesFact_201101 "
+           "WHERE Quantity > 5 AND Category IN ('Toys', 'Electronics') AND DateKey BETWEEN 20110101 AND 20110110 "
+           "GROUP BY StockCode")
+    assert index_candidate(sql, 'SalesFact_201101', table_columns(warehouse, ['SalesFact_201101'])) == \
+        ['Category', 'Quantity', 'StockCode', 'TotalSales', 'DateKey']
+
+
+def test_recommendations_reuse_covering_managed_indexes():
+    assert recommend('SalesFact_201101', ['CustomerKey', 'DateKey', 'TotalSales'])[0] == \
+        'idx_salesfact_cust_date_cat_sales'
+    assert recommend('CustomerDim', ['Country', 'CustomerKey'])[0] == 'idx_customerdim_country'
+    assert recommend('SalesFact_201101', ['StockCode', 'TotalSales']) == \
+        ('idx_advisor_salesfact_stockcode_totalsales', 'SalesFact', 'StockCode, TotalSales')
+
+
+@pytest.fixture
+def advisor_workdir(warehouse_path, tmp_path, monkeypatch):
+    """A copy of the shared warehouse, with the advisor's report paths under tmp_path."""
+    db_path = str(tmp_path / "retail_dw.db")
+    shutil.copyfile(warehouse_path, db_path)
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(index_advisor.OUT_DIR)
+    return db_path
+
+
+def index_names(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    finally:
+        conn.close()
+
+
+def conn_rows(db_path, sql):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_run_profiles_unindexed_then_clears_every_scan(advisor_workdir):
+    before, after = index_advisor.run(advisor_workdir, [OLAP_QUERIES_PATH], repeat=1)
+    assert all(r['full_scans'] for r in before)
+    assert not any(r['full_scans'] for r in after)
+    assert all(r['plan'] for r in after)
+
+    conn = sqlite3.connect(advisor_workdir)
+    managed = {name for name, _, _ in managed_indexes(conn)}
+    conn.close()
+    assert managed <= index_names(advisor_workdir)          # restored for the loaders
+    report = open(index_advisor.REPORT_PATH, encoding="utf-8").read()
+    assert "`idx_salesfact_date_cust_sales` ON SalesFact (DateKey, CustomerKey, TotalSales)" in report
+
+    # With --keep-indexes nothing scans before either, so nothing is recommended
+    before, _ = index_advisor.run(advisor_workdir, [OLAP_QUERIES_PATH], keep_indexes=True, repeat=1)
+    assert not any(r['full_scans'] for r in before)
+
+
+def test_detail_selects_are_profiled_on_every_row(advisor_workdir, tmp_path):
+    detail = "SELECT f.CustomerKey, f.Category FROM SalesFact f WHERE f.Quantity > 10"
+    path = tmp_path / "detail.sql"
+    path.write_text(f"-- Detail: large lines\n{detail};\n", encoding="utf-8")
+    expected = len(conn_rows(advisor_workdir, detail))
+
+    before, after = index_advisor.run(advisor_workdir, [str(path)], repeat=1)
+    assert [r['rows'] for r in before] == [r['rows'] for r in after] == [expected]
+    assert expected > len(set(conn_rows(advisor_workdir, detail)))      # duplicates are kept
+
+
+def test_report_matches_before_and_after_by_query(tmp_path):
+    def profile(label, ms):
+        return {"label": label, "ms": ms, "rows": 1, "plan": ["SCAN f"], "full_scans": [], "small_scans": []}
+
+    before = [profile("A", 4.0), profile("B", 9.0), profile("C", 6.0)]
+    after = [profile("A", 2.0), profile("C", 3.0)]          # B was skipped after indexing
+    csv_path = tmp_path / "timings.csv"
+    index_advisor.write_report(before, after, {}, [], report_path=str(tmp_path / "report.md"),
+                               csv_path=str(csv_path))
+    timings = pd.read_csv(csv_path)
+    assert timings[['Query', 'BeforeMs', 'AfterMs']].values.tolist() == [['A', 4.0, 2.0], ['C', 6.0, 3.0]]
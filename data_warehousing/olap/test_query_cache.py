@@ -0,0 +1,93 @@
+# data_warehousing/olap/test_query_cache.py
+"""
+QueryCache: hits, ETL-generation invalidation, per-database keys and the size bound.
+
+Run from the repository root:
+    python -m pytest data_warehousing/olap/test_query_cache.py
+"""
+import os
+import sys
+import sqlite3
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from data_warehousing.etl.load import ensure_schema
+from data_warehousing.olap.query_cache import QueryCache, database_file, load_generation
+
+SQL = "SELECT Country, COUNT(*) AS Customers FROM CustomerDim GROUP BY Country ORDER BY Country"
+
+
+def make_db(path, countries, finished_at="2026-01-01 00:00:00"):
+    conn = sqlite3.connect(path)
+    ensure_schema(conn)
+    conn.executemany("INSERT INTO CustomerDim (CustomerID, Country) VALUES (?, ?)",
+                     enumerate(countries))
+    record(conn, finished_at)
+    return conn
+
+
+def record(conn, finished_at):
+    conn.execute("INSERT INTO EtlLoadLog (Mode, FinishedAt, RowsLoaded) VALUES ('full', ?, 0)", (finished_at,))
+    conn.commit()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return QueryCache(str(tmp_path / "cache"))
+
+
+def test_reformatted_sql_hits_until_the_next_load(tmp_path, cache):
+    conn = make_db(str(tmp_path / "a.db"), ['France', 'Spain'])
+    first = cache.read_sql(SQL, conn)
+    again = cache.read_sql("  " + SQL.replace(" ", "\n  ") + ";", conn)
+    pd.testing.assert_frame_equal(first, again)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    conn.execute("INSERT INTO CustomerDim (CustomerID, Country) VALUES (9, 'Spain')")
+    record(conn, "2026-01-02 00:00:00")
+    assert cache.read_sql(SQL, conn)['Customers'].tolist() == [1, 2]
+    assert cache.misses == 2 and len(cache._index["entries"]) == 1
+
+
+def test_two_warehouses_never_share_results(tmp_path, cache):
+    # Same SQL, same LoadId and FinishedAt: only the database file differs
+    a = make_db(str(tmp_path / "a.db"), ['France'])
+    b = make_db(str(tmp_path / "b.db"), ['Spain', 'Spain'])
+    assert load_generation(a) != load_generation(b)
+    assert database_file(a) == os.path.realpath(str(tmp_path / "a.db"))
+    assert cache.read_sql(SQL, a).values.tolist() == [['France', 1]]
+    assert cache.read_sql(SQL, b).values.tolist() == [['Spain', 2]]
+    assert cache.read_sql(SQL, a).values.tolist() == [['France', 1]]
+    assert QueryCache.make_key(SQL, database="a") != QueryCache.make_key(SQL, database="b")
+
+
+def test_in_memory_databases_are_not_cached(cache):
+    conn = make_db(":memory:", ['France'])
+    assert database_file(conn) is None
+    cache.read_sql(SQL, conn)
+    assert cache._index["entries"] == {} and cache.misses == 0
+
+
+def test_size_bound_evicts_the_least_recently_used(tmp_path):
+    conn = make_db(str(tmp_path / "a.db"), ['France', 'Spain'])
+    cache = QueryCache(str(tmp_path / "cache"), max_bytes=1)
+    cache.read_sql(SQL, conn)
+    cache.read_sql(SQL + " LIMIT 1", conn)
+    assert len(cache._index["entries"]) <= 1
+    reopened = QueryCache(str(tmp_path / "cache"))
+    assert reopened._index["entries"].keys() == cache._index["entries"].keys()
+
+
+def test_evict_tables_drops_only_the_readers(tmp_path, cache):
+    conn = make_db(str(tmp_path / "a.db"), ['France'])
+    cache.read_sql(SQL, conn)
+    cache.read_sql("SELECT c.Country, s.Segment FROM CustomerDim c "
+                   "LEFT JOIN CustomerSegment s ON c.CustomerKey = s.CustomerKey", conn)
+    assert sorted(e["tables"] for e in cache._index["entries"].values()) == \
+        [['CustomerDim'], ['CustomerDim', 'CustomerSegment']]
+    assert cache.evict_tables(['CustomerSegment', 'SegmentDim']) == 1
+    cache.read_sql(SQL, conn)
+    assert cache.hits == 1
@@ -0,0 +1,245 @@
+# instrumentation.py
+"""
+Stage-level timing, memory and row-count instrumentation shared by the ETL,
+OLAP and data-mining scripts.
+
+A script creates one ``StageRecorder`` and wraps each named step in
+``recorder.stage(name)``.  Entering the same stage several times (e.g. once
+per ETL batch) accumulates into one record, and ``recorder.iterate`` times
+the ``next()`` calls of a generator such as the batch extractor.  When the
+recorder is closed it appends one JSON line per stage, plus a ``total`` line
+for the whole run, to stage_metrics.jsonl:
+
+    {"run_id": ..., "script": "run_etl", "stage": "load", "calls": 11,
+     "wall_s": 0.41, "cpu_s": 0.39, "rows_in": 15947, "rows_out": 15947,
+     "rows_per_s": 38895.1, "rss_mb": 182.3, "rss_peak_mb": 190.0,
+     "rss_peak_delta_mb": 4.1, "py_peak_mb": null, "profile": null, ...}
+
+  - wall_s / cpu_s: perf_counter and process_time spent inside the stage
+    (CPU of worker processes is not included),
+  - rss_mb: resident set size when the stage last finished; rss_peak_mb the
+    process high-water mark at that point and rss_peak_delta_mb how much the
+    stage raised it,
+  - py_peak_mb: peak Python allocation above the stage's starting point, from
+    tracemalloc -- only with STAGE_TRACEMALLOC=1, since tracing slows every
+    allocation down.
+
+Environment switches, so that module-level scripts need no CLI changes:
+    STAGE_METRICS_PATH=path     write to another JSON-lines file
+    STAGE_PROFILE=1             cProfile every stage (or a comma-separated
+                                list of stage names) and dump one .prof per
+                                stage to stage_profiles/
+    STAGE_TRACEMALLOC=1         record py_peak_mb
+
+Nested stages are timed independently; only the outermost profiled stage
+runs a profiler, because Python allows one active profiler at a time, and an
+enclosing stage's py_peak_mb only covers what follows its last nested stage.
+Inspect a dump with ``python -m pstats stage_profiles/<script>.<stage>.prof``.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+METRICS_PATH = "stage_metrics.jsonl"
+PROFILE_DIR = "stage_profiles"
+MB = 1024 * 1024
+
+
+def _env_flag(name):
+    return os.environ.get(name, "").strip().lower() not in ("", "0", "false", "no")
+
+
+def current_rss_mb():
+    """Resident set size of this process, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / MB
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_mb():
+    """High-water RSS of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / MB if sys.platform == "darwin" else peak / 1024
+
+
+class Stage:
+    """Accumulated measurements of one named stage; set rows_in / rows_out inside the block."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.wall = self.cpu = 0.0
+        self.rows_in = self.rows_out = None
+        self.rss = self.rss_peak = None
+        self.rss_peak_delta = 0.0
+        self.py_peak = None
+        self.profiler = None
+        self.started = None
+
+    def add_rows(self, rows_in=None, rows_out=None):
+        if rows_in is not None:
+            self.rows_in = (self.rows_in or 0) + rows_in
+        if rows_out is not None:
+            self.rows_out = (self.rows_out or 0) + rows_out
+
+    def record(self):
+        rows = self.rows_out if self.rows_out is not None else self.rows_in
+        return {
+            "stage": self.name,
+            "started": self.started,
+            "calls": self.calls,
+            "wall_s": round(self.wall, 6),
+            "cpu_s": round(self.cpu, 6),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "rows_per_s": round(rows / self.wall, 1) if rows and self.wall > 0 else None,
+            "rss_mb": _round(self.rss),
+            "rss_peak_mb": _round(self.rss_peak),
+            "rss_peak_delta_mb": _round(self.rss_peak_delta),
+            "py_peak_mb": _round(self.py_peak),
+        }
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+class StageRecorder:
+    """Collects per-stage metrics for one script run and appends them to a JSON-lines file."""
+
+    def __init__(self, script, path=None, profile=None, trace_memory=None, profile_dir=PROFILE_DIR):
+        self.script = script
+        self.path = path or os.environ.get("STAGE_METRICS_PATH") or METRICS_PATH
+        if profile is None:
+            profile = os.environ.get("STAGE_PROFILE", "")
+        if isinstance(profile, str):
+            profile = (True if profile.strip().lower() in ("1", "true", "yes", "all")
+                       else {p.strip() for p in profile.split(",") if p.strip()})
+        self.profile = profile
+        self.trace_memory = _env_flag("STAGE_TRACEMALLOC") if trace_memory is None else trace_memory
+        self.profile_dir = profile_dir
+        self.run_id = uuid.uuid4().hex[:12]
+        self.stages = {}
+        self.extra = {}
+        self._profiling = False
+        self._closed = False
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        self._started = datetime.now().isoformat(timespec="seconds")
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _profiles(self, name):
+        return self.profile is True or (bool(self.profile) and name in self.profile)
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Time the block as stage ``name``; the yielded Stage takes rows via add_rows()."""
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = Stage(name)
+            stage.started = datetime.now().isoformat(timespec="seconds")
+        stage.add_rows(rows_in=rows_in)
+
+        profiler = None
+        if self._profiles(name) and not self._profiling:
+            profiler = stage.profiler = stage.profiler or cProfile.Profile()
+            self._profiling = True
+        if self.trace_memory:
+            traced_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        peak_start = peak_rss_mb()
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield stage
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+            stage.wall += time.perf_counter() - wall
+            stage.cpu += time.process_time() - cpu
+            stage.calls += 1
+            stage.rss = current_rss_mb()
+            stage.rss_peak = peak_rss_mb()
+            if peak_start is not None:
+                stage.rss_peak_delta += stage.rss_peak - peak_start
+            if self.trace_memory:
+                # The peak is reset per entry, so this is the stage's largest excursion
+                py_peak = (tracemalloc.get_traced_memory()[1] - traced_start) / MB
+                stage.py_peak = max(stage.py_peak or 0.0, py_peak)
+
+    def iterate(self, name, iterable, rows=len):
+        """Yield from ``iterable``, timing each next() as stage ``name`` and counting ``rows(item)``."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name) as stage:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                stage.add_rows(rows_out=rows(item) if rows is not None else None)
+            yield item
+
+    def annotate(self, **fields):
+        """Extra key/values copied into every record of this run (e.g. mode, chunk size)."""
+        self.extra.update(fields)
+
+    def records(self):
+        base = {"run_id": self.run_id, "script": self.script, **self.extra}
+        out = [{**base, **stage.record(), "profile": self._dump_profile(stage)}
+               for stage in self.stages.values()]
+        out.append({
+            **base, "stage": "total", "started": self._started, "calls": 1,
+            "wall_s": round(time.perf_counter() - self._start_wall, 6),
+            "cpu_s": round(time.process_time() - self._start_cpu, 6),
+            "rows_in": None, "rows_out": None, "rows_per_s": None,
+            "rss_mb": _round(current_rss_mb()), "rss_peak_mb": _round(peak_rss_mb()),
+            "rss_peak_delta_mb": None, "py_peak_mb": None, "profile": None,
+        })
+        return out
+
+    def _dump_profile(self, stage):
+        if stage.profiler is None:
+            return None
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"{self.script}.{stage.name}.prof")
+        stage.profiler.dump_stats(path)
+        return path
+
+    def close(self):
+        """Append this run's records to the metrics file (once)."""
+        if self._closed:
+            return
+        self._closed = True
+        records = self.records()
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps(rec, default=str) + "\n")
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()